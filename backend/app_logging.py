@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import queue
+import random
+import logging
+import logging.handlers
+from typing import Any, Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Longest message or field value written; longer ones are cut
+LOG_MAX_CHARS = int(os.getenv("LOG_MAX_CHARS", "1000"))
+# Fraction of records below WARNING kept per category, e.g. "session=0.1,sql=0.5"
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Set by router.py on the worker processes it starts; every record of a worker names it
+WORKER_ID = os.getenv("WORKER_ID")
+
+ROOT = "byedb"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(category: str) -> logging.Logger:
+    """
+    Logger of one category (agent, sql, llm, session, api, ingest...). Structured fields go in
+    extra={"fields": {...}}; payloads such as query results should only be logged at DEBUG, behind
+    logger.isEnabledFor(logging.DEBUG) so they are not even built otherwise.
+    """
+    return logging.getLogger(f"{ROOT}.{category}")
+
+
+def _truncate(value: Any, limit: int) -> Any:
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}... ({len(value)} chars)"
+    return value
+
+
+def _parse_sampling(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            category, rate = item.split("=", 1)
+            rates[category.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records below WARNING of each sampled category."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(record.name.rsplit(".", 1)[-1])
+        return rate is None or random.random() < rate
+
+
+class TruncatingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Runs in the logging thread (usually the event loop): only merges the message arguments and cuts
+    long values, leaving formatting and writing to the listener thread. Drops records when the queue
+    is full instead of blocking.
+    """
+
+    def __init__(self, log_queue: queue.Queue, max_chars: int):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = _truncate(record.getMessage(), self.max_chars)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _truncate(logging.Formatter().formatException(record.exc_info), self.max_chars * 4)
+            record.exc_info = None
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {key: _truncate(value if isinstance(value, (str, int, float, bool)) or value is None
+                                            else json.dumps(value, default=str), self.max_chars)
+                             for key, value in fields.items()}
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, category, message and the record's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "category": record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name,
+            "msg": record.msg,
+        }
+        if WORKER_ID is not None:
+            entry["worker"] = f"worker-{WORKER_ID}"
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging(level: str = LOG_LEVEL):
+    """Routes the backend's loggers through a bounded queue to a JSON stdout writer thread. Idempotent."""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = TruncatingQueueHandler(log_queue, LOG_MAX_CHARS)
+    handler.addFilter(SamplingFilter(_parse_sampling(LOG_SAMPLING)))
+
+    root = logging.getLogger(ROOT)
+    root.setLevel(level)
+    root.addHandler(handler)
+    root.propagate = False
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flushes the queued records and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,195 @@
+import io
+import os
+import json
+import asyncio
+import zipfile
+import datetime
+from decimal import Decimal
+from typing import Any, Iterator, List, Optional, Tuple
+
+from db_sqlite import LocalSQLiteDatabase
+
+# Parquet/Arrow support is optional; pyarrow is imported by require_pyarrow on first use
+pa = None
+pq = None
+
+ARROW_BATCH_ROWS = int(os.getenv("ARROW_BATCH_ROWS", "50000"))
+
+PARQUET_EXTENSIONS = (".parquet",)
+IPC_EXTENSIONS = (".feather", ".arrow", ".arrows", ".ipc")
+ARROW_EXTENSIONS = PARQUET_EXTENSIONS + IPC_EXTENSIONS
+
+EXPORT_FORMATS = {
+    "parquet": ".parquet",
+    "feather": ".feather",
+}
+
+
+def require_pyarrow():
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet and Arrow files require pyarrow. Install it with `pip install pyarrow`.") from None
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+# ---- Import: Arrow record batches -> SQLite rows ----
+
+def sqlite_type(arrow_type) -> str:
+    if pa.types.is_integer(arrow_type) or pa.types.is_boolean(arrow_type):
+        return "INTEGER"
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "REAL"
+    if pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type) or pa.types.is_fixed_size_binary(arrow_type):
+        return "BLOB"
+    return "TEXT"
+
+
+def _to_sqlite_value(value: Any) -> Any:
+    """Values SQLite cannot bind directly: dates become ISO strings, nested values JSON."""
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, Decimal):
+        return float(value)
+    return json.dumps(value, default=str)
+
+
+def _needs_conversion(arrow_type) -> bool:
+    return not (pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_boolean(arrow_type)
+                or pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+                or pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type))
+
+
+def batch_rows(batch) -> List[tuple]:
+    columns = []
+    for field, column in zip(batch.schema, batch.columns):
+        values = column.to_pylist()
+        if pa.types.is_dictionary(field.type):
+            field_type = field.type.value_type
+        else:
+            field_type = field.type
+        if _needs_conversion(field_type):
+            values = [_to_sqlite_value(v) for v in values]
+        columns.append(values)
+    return list(zip(*columns))
+
+
+def open_arrow_file(path: str, filename: str) -> Tuple[Any, Iterator, int]:
+    """Returns (schema, record batch iterator, total rows or 0 if unknown) for a Parquet or Arrow IPC file."""
+    require_pyarrow()
+    if filename.lower().endswith(PARQUET_EXTENSIONS):
+        parquet_file = pq.ParquetFile(path)
+        return (parquet_file.schema_arrow, parquet_file.iter_batches(batch_size=ARROW_BATCH_ROWS),
+                parquet_file.metadata.num_rows)
+
+    source = pa.memory_map(path, "r")
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        return reader.schema, batches, 0
+    except pa.ArrowInvalid:
+        # Arrow IPC stream format (.arrows) has no footer
+        source.seek(0)
+        reader = pa.ipc.open_stream(source)
+        return reader.schema, iter(reader), 0
+
+
+# ---- Export: SQLite cursor chunks -> Arrow record batches ----
+
+def arrow_type(declared_type: str):
+    """Maps a declared SQLite type to an Arrow type using SQLite's affinity rules."""
+    declared = declared_type.upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("CHAR", "CLOB", "TEXT")) or not declared:
+        return pa.string()
+    if "BLOB" in declared:
+        return pa.binary()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+async def _export_schema(db: LocalSQLiteDatabase, table: str):
+    """
+    Arrow schema for a table. SQLite does not enforce declared types, so typed columns holding
+    values of another storage class are exported as strings instead.
+    """
+    columns = await db.get_column_types(table)
+    types = {name: arrow_type(declared) for name, declared in columns}
+    allowed = {pa.int64(): "'integer'", pa.float64(): "'real', 'integer'", pa.binary(): "'blob'"}
+    typed = [name for name, t in types.items() if t in allowed]
+    if typed:
+        checks = ", ".join(
+            f"SUM(typeof(\"{name}\") NOT IN ({allowed[types[name]]}, 'null')) AS \"{name}\"" for name in typed
+        )
+        result = await db.query_sql(f"SELECT {checks} FROM {table}", internal=True)
+        mismatched = result["data"][0] if result["success"] and result["data"] else {}
+        for name in typed:
+            if mismatched.get(name):
+                types[name] = pa.string()
+    return pa.schema([(name, types[name]) for name, _ in columns])
+
+
+def _rows_to_batch(schema, rows: List[tuple]):
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        if pa.types.is_string(field.type):
+            values = [v if v is None or isinstance(v, str) else (v.hex() if isinstance(v, bytes) else str(v))
+                      for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _TableWriter:
+    def __init__(self, sink, schema, file_type: str):
+        if file_type == "parquet":
+            self.writer = pq.ParquetWriter(sink, schema)
+        else:
+            self.writer = pa.ipc.new_file(sink, schema)
+        self.schema = schema
+        self.file_type = file_type
+
+    def write_rows(self, rows: List[tuple]):
+        batch = _rows_to_batch(self.schema, rows)
+        if self.file_type == "parquet":
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write(batch)
+
+    def close(self):
+        self.writer.close()
+
+
+async def export_tables(db: LocalSQLiteDatabase, file_type: str, tables: Optional[List[str]] = None) -> io.BytesIO:
+    """Writes every table as a Parquet or Feather (Arrow IPC) file into a zip, batch by batch from cursor chunks."""
+    require_pyarrow()
+    tables = tables if tables is not None else await db.get_table_names()
+    zip_buffer = io.BytesIO()
+    # Both formats are already compressed/binary, so the zip only stores them
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_STORED) as zip_file:
+        for table in tables:
+            schema = await _export_schema(db, table)
+            sink = io.BytesIO()
+            writer = _TableWriter(sink, schema, file_type)
+            async for rows in db.iter_table_rows(table, ARROW_BATCH_ROWS):
+                await asyncio.to_thread(writer.write_rows, rows)
+            await asyncio.to_thread(writer.close)
+            zip_file.writestr(f"{table}{EXPORT_FORMATS[file_type]}", sink.getvalue())
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+def arrow_import_columns(schema) -> List[Tuple[str, str]]:
+    return [(field.name, sqlite_type(field.type.value_type if pa.types.is_dictionary(field.type) else field.type))
+            for field in schema]
+
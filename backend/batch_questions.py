@@ -0,0 +1,66 @@
+import os
+import time
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from db_sqlite import LocalSQLiteDatabase
+from llm_sql_agent import SQLAgent
+from question_cache import QuestionCache
+from llm_centralised import llmCentral
+from app_logging import get_logger
+
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "50"))
+# Questions answered at once in a batch; 0 allows BATCH_PER_KEY per configured LLM key
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "0"))
+BATCH_PER_KEY = int(os.getenv("BATCH_PER_KEY", "2"))
+
+log = get_logger("agent")
+
+
+def batch_concurrency() -> int:
+    if BATCH_CONCURRENCY:
+        return BATCH_CONCURRENCY
+    return max(1, llmCentral.total_models) * BATCH_PER_KEY
+
+
+async def answer_batch(db: LocalSQLiteDatabase, questions: List[str], mode: str = "agent",
+                       result_format: str = "rows", concurrency: Optional[int] = None,
+                       question_cache: Optional[QuestionCache] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Answers each question with its own read-only agent (no shared conversation memory) against the
+    same database, at most `concurrency` (capped by batch_concurrency) at a time, and yields the
+    results in completion order. The agents share `question_cache`, usually the session's.
+    Closing the iterator early cancels the questions still running.
+    """
+    limit = batch_concurrency()
+    semaphore = asyncio.Semaphore(min(concurrency, limit) if concurrency else limit)
+
+    async def answer(index: int, question: str) -> Dict[str, Any]:
+        async with semaphore:
+            agent = SQLAgent(db, question_cache)
+            agent.mode = mode
+            agent.result_format = result_format
+            agent.read_only = True
+            start = time.perf_counter()
+            result = await agent.generate_sql_response(question)
+        return {
+            "index": index,
+            "question": question,
+            "success": result.get("success", False),
+            "response": result.get("response"),
+            "error": result.get("error"),
+            "meta": result,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    tasks = [asyncio.create_task(answer(i, question)) for i, question in enumerate(questions)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        log.info("batch finished", extra={"fields": {"questions": len(questions),
+                                                     "answered": sum(task.done() and not task.cancelled()
+                                                                     for task in tasks)}})
@@ -0,0 +1,152 @@
+"""
+Offline benchmark of the SQLAgent loop.
+
+Drives generate_sql_response / continue_sql_respond through the LLMReplay backend, so agent-side
+overhead can be measured without API quota or provider latency noise.
+
+Usage:
+    python bench_agent.py [--transcript bench_transcript.json] [--rows 50000] [--rounds 5] [--latency-ms 0]
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+
+DEFAULT_TRANSCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_transcript.json")
+
+
+class Timings:
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, name: str, seconds: float):
+        self.totals[name] += seconds
+        self.counts[name] += 1
+
+    def reset(self):
+        self.totals.clear()
+        self.counts.clear()
+
+
+def instrument(agent, db, timings: Timings):
+    """Wrap the agent's prompt building, response parsing and SQL execution with timers."""
+    build_messages = agent.build_messages_with_memory
+    parse_response = agent._parse_llm_response
+
+    def timed_build(context):
+        start = time.perf_counter()
+        prompt = build_messages(context)
+        timings.add("prompt", time.perf_counter() - start)
+        timings.totals["prompt_chars"] += len(prompt)
+        return prompt
+
+    def timed_parse(text):
+        start = time.perf_counter()
+        parsed = parse_response(text)
+        timings.add("parse", time.perf_counter() - start)
+        return parsed
+
+    def timed_sql(run_sql):
+        async def timed(sql_query, *args, **kwargs):
+            start = time.perf_counter()
+            result = await run_sql(sql_query, *args, **kwargs)
+            timings.add("sql", time.perf_counter() - start)
+            return result
+        return timed
+
+    agent.build_messages_with_memory = timed_build
+    agent._parse_llm_response = timed_parse
+    db.execute_sql = timed_sql(db.execute_sql)
+    db.query_sql = timed_sql(db.query_sql)
+
+
+async def seed_orders(db, rows: int):
+    rng = random.Random(42)
+    regions = ["North", "South", "East", "West", "Central"]
+    products = ["Laptop", "Phone", "Tablet", "Monitor", "Keyboard", "Mouse"]
+    await db.conn.execute(
+        "CREATE TABLE orders (id INTEGER PRIMARY KEY, region TEXT, product TEXT, amount REAL, order_date TEXT)"
+    )
+    await db.conn.executemany(
+        "INSERT INTO orders (region, product, amount, order_date) VALUES (?, ?, ?, ?)",
+        [
+            (rng.choice(regions), rng.choice(products), round(rng.uniform(5, 2500), 2),
+             f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+            for _ in range(rows)
+        ]
+    )
+    await db.conn.commit()
+
+
+async def ask(agent, question: str) -> dict:
+    response = await agent.generate_sql_response(question)
+    while response.get("requires_approval"):
+        response = await agent.continue_sql_respond()
+    return response
+
+
+async def run(args):
+    # The replay backend must be selected before llm_centralised builds its global client
+    os.environ["LLM_BACKEND"] = "replay"
+    os.environ["LLM_REPLAY_FILE"] = args.transcript
+    os.environ["LLM_REPLAY_LATENCY_MS"] = str(args.latency_ms)
+
+    from db_sqlite import LocalSQLiteDatabase
+    from llm_sql_agent import SQLAgent
+    from llm_centralised import llmCentral
+    from question_cache import QuestionCache
+
+    questions = list(llmCentral.models[0].transcripts)
+    db = LocalSQLiteDatabase()
+    await db.connect()
+    await seed_orders(db, args.rows)
+
+    # Every round asks the same questions: reuse would skip the loop being measured
+    agent = SQLAgent(db, QuestionCache(size=0))
+    timings = Timings()
+    instrument(agent, db, timings)
+
+    stats = defaultdict(lambda: defaultdict(float))
+    for _ in range(args.rounds):
+        agent.clear_memory()
+        for question in questions:
+            timings.reset()
+            tokens_before = llmCentral.total_token_used
+            start = time.perf_counter()
+            response = await ask(agent, question)
+            elapsed = time.perf_counter() - start
+
+            row = stats[question]
+            row["total"] += elapsed
+            row["prompt"] += timings.totals["prompt"]
+            row["parse"] += timings.totals["parse"]
+            row["sql"] += timings.totals["sql"]
+            row["llm_calls"] += timings.counts["prompt"]
+            row["prompt_chars"] += timings.totals["prompt_chars"]
+            row["tokens"] += llmCentral.total_token_used - tokens_before
+            row["failures"] += 0 if response.get("success") else 1
+
+    await db.close()
+
+    header = f"{'question':<48} {'total ms':>9} {'prompt ms':>9} {'parse ms':>9} {'sql ms':>9} {'calls':>6} {'chars':>8} {'tokens':>8}"
+    print(f"\nrows={args.rows} rounds={args.rounds} simulated latency={args.latency_ms}ms\n")
+    print(header)
+    print("-" * len(header))
+    for question, row in stats.items():
+        n = args.rounds
+        print(f"{question[:48]:<48} {row['total'] / n * 1000:>9.2f} {row['prompt'] / n * 1000:>9.3f} "
+              f"{row['parse'] / n * 1000:>9.3f} {row['sql'] / n * 1000:>9.2f} {row['llm_calls'] / n:>6.1f} "
+              f"{row['prompt_chars'] / n:>8.0f} {row['tokens'] / n:>8.0f}"
+              + (f"  ({int(row['failures'])} failed)" if row["failures"] else ""))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark SQLAgent overhead with a replayed LLM.")
+    parser.add_argument("--transcript", default=DEFAULT_TRANSCRIPT, help="Scripted (.json) or recorded (.jsonl) transcript")
+    parser.add_argument("--rows", type=int, default=50000, help="Rows seeded into the orders table")
+    parser.add_argument("--rounds", type=int, default=5, help="Times each question is asked")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated LLM latency per call")
+    asyncio.run(run(parser.parse_args()))
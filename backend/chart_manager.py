@@ -1,14 +1,19 @@
 import random
 import asyncio
 from itertools import cycle, islice
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 from typing import List, Dict, Any
 import os
 import time
 
 
+def _pyplot():
+    """matplotlib takes a noticeable part of startup, so it is imported on first use (or by warm_up)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
 class ChartManager:
     def __init__(self, output_dir: str = "charts", max_files: int = 10):
         self.output_dir = output_dir
@@ -41,6 +46,7 @@ class ChartManager:
             i += 1
 
     def _save_plot(self, path: str):
+        plt = _pyplot()
         plt.tight_layout(pad=2)
         plt.savefig(path, bbox_inches="tight", transparent=True, dpi=300)
         plt.close()
@@ -81,6 +87,7 @@ class ChartManager:
     def _plot_bar_chart_sync(self, title: str, data: List[Dict[str, Any]]) -> str:
         labels, values, label_col, value_col = self._extract_columns(data)
         palette = self._get_color_palette(len(labels))
+        plt = _pyplot()
         width = max(6.0, min(14.0, 0.6 * len(labels)))
 
         plt.figure(figsize=(width, 7), facecolor='none')
@@ -104,6 +111,7 @@ class ChartManager:
     def _plot_pie_chart_sync(self, title: str, data: List[Dict[str, Any]]) -> str:
         labels, values, label_col, value_col = self._extract_columns(data)
         palette = self._get_color_palette(len(labels))
+        plt = _pyplot()
 
         plt.figure(figsize=(7, 7), facecolor='none')
         plt.rcParams.update({
@@ -127,6 +135,12 @@ class ChartManager:
         full_path = self._save_plot(self._generate_filename("pie_chart"))
         return self._get_name(full_path)
 
+    def warm_up(self):
+        """Imports pyplot and loads the font cache ahead of the first chart."""
+        _pyplot()
+        from matplotlib import font_manager
+        font_manager.findfont("DejaVu Sans")
+
     async def plot_bar_chart(self, title: str, data: List[Dict[str, Any]]) -> str:
         async with self._lock:
             return await asyncio.to_thread(self._plot_bar_chart_sync, title, data)
@@ -0,0 +1,186 @@
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from app_logging import get_logger
+from sketches import SKETCHES_ENABLED, ColumnSketch, TableSketch
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = get_logger("ingest")
+
+PROFILE_TOP_VALUES = int(os.getenv("PROFILE_TOP_VALUES", "5"))
+# Distinct values counted exactly per column; past this only the most frequent are kept
+PROFILE_MAX_DISTINCT = int(os.getenv("PROFILE_MAX_DISTINCT", "10000"))
+PROFILE_PROMPT_CHARS = int(os.getenv("PROFILE_PROMPT_CHARS", "4000"))
+
+_TYPE_ORDER = ["integer", "real", "text"]
+_DATE_PATTERN = r'^\d{4}[-/]\d{1,2}[-/]\d{1,2}(?:[ T]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?'
+
+
+def _plain(value: Any) -> Any:
+    """JSON-friendly scalar: numpy numbers become Python numbers, long text and blobs are shortened."""
+    if type(value).__module__ == "numpy":
+        value = value.item()
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > 60:
+        return value[:57] + "..."
+    return value
+
+
+def _merge_type(current: Optional[str], new: str) -> str:
+    if current is None or current == new:
+        return new
+    if current in _TYPE_ORDER and new in _TYPE_ORDER:
+        return max(current, new, key=_TYPE_ORDER.index)
+    return "text"
+
+
+def _chunk_type(values: "pd.Series") -> tuple:
+    """Detected type of the non-null values of one chunk, with the numeric view when there is one."""
+    import pandas as pd
+    if values.dtype == object and isinstance(values.iloc[0], (bytes, bytearray)):
+        return "blob", None
+    if pd.api.types.is_bool_dtype(values):
+        return "boolean", values.astype(int)
+    numeric = pd.to_numeric(values, errors="coerce")
+    if numeric.notna().all():
+        if (numeric % 1 == 0).all():
+            return "integer", numeric
+        return "real", numeric
+    text = values.astype(str)
+    if text.str.match(_DATE_PATTERN).all():
+        return "date", None
+    return "text", None
+
+
+class ColumnProfile:
+    def __init__(self, name: str, sketch: bool = False):
+        self.name = name
+        self.sketch: Optional[ColumnSketch] = ColumnSketch(name) if sketch else None
+        self.count = 0
+        self.nulls = 0
+        self.type: Optional[str] = None
+        self.numeric_min = None
+        self.numeric_max = None
+        self.text_min = None
+        self.text_max = None
+        self.counts: Dict[Any, int] = {}
+        self.distinct_exact = True
+
+    def add(self, values: "pd.Series"):
+        self.count += len(values)
+        present = values.dropna()
+        self.nulls += len(values) - len(present)
+        if present.empty:
+            return
+
+        chunk_type, numeric = _chunk_type(present)
+        self.type = _merge_type(self.type, chunk_type)
+        if chunk_type == "blob":
+            self.sketch = None
+            return
+        if numeric is not None:
+            low, high = numeric.min(), numeric.max()
+            self.numeric_min = low if self.numeric_min is None else min(self.numeric_min, low)
+            self.numeric_max = high if self.numeric_max is None else max(self.numeric_max, high)
+        text = present.astype(str)
+        low, high = text.min(), text.max()
+        self.text_min = low if self.text_min is None else min(self.text_min, low)
+        self.text_max = high if self.text_max is None else max(self.text_max, high)
+
+        counts = present.value_counts(sort=False)
+        if self.sketch is not None:
+            self.sketch.add(counts, numeric)
+        for value, count in counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        if len(self.counts) > PROFILE_MAX_DISTINCT:
+            self.distinct_exact = False
+            top = sorted(self.counts.items(), key=lambda item: -item[1])[:PROFILE_MAX_DISTINCT // 2]
+            self.counts = dict(top)
+
+    def to_dict(self) -> Dict[str, Any]:
+        numeric = self.type in ("integer", "real", "boolean")
+        top = sorted(self.counts.items(), key=lambda item: -item[1])[:PROFILE_TOP_VALUES]
+        return {
+            "column": self.name,
+            "type": self.type or "empty",
+            "nulls": self.nulls,
+            "null_ratio": round(self.nulls / self.count, 4) if self.count else 0.0,
+            "distinct": len(self.counts),
+            "distinct_exact": self.distinct_exact,
+            "min": _plain(self.numeric_min if numeric else self.text_min),
+            "max": _plain(self.numeric_max if numeric else self.text_max),
+            "top_values": [[_plain(value), int(count)] for value, count in top],
+        }
+
+
+class TableProfiler:
+    """
+    Accumulates column statistics over the chunks of a table as it is loaded. Each chunk is
+    processed with vectorized pandas operations; memory per column is bounded by PROFILE_MAX_DISTINCT.
+    """
+
+    def __init__(self, table: str, columns: List[str], sketches: bool = SKETCHES_ENABLED):
+        self.table = table
+        self.columns = [ColumnProfile(name, sketches) for name in columns]
+        self.rows = 0
+        self.error: Optional[str] = None
+
+    def add_frame(self, df: "pd.DataFrame"):
+        self.rows += len(df)
+        for i, column in enumerate(self.columns):
+            column.add(df.iloc[:, i])
+
+    def add_rows(self, rows: List[tuple]):
+        """Profiles a chunk of row tuples. A failure only disables the profile, never the load."""
+        if not rows or self.error:
+            return
+        try:
+            import pandas as pd
+            self.add_frame(pd.DataFrame.from_records(rows, columns=range(len(self.columns)), coerce_float=False))
+        except Exception as e:
+            self.error = str(e)
+            log.warning("profiling of table %s stopped: %s", self.table, e)
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        if self.error:
+            return None
+        return {
+            "table": self.table,
+            "rows": self.rows,
+            "profiled_at": time.time(),
+            "columns": [column.to_dict() for column in self.columns],
+        }
+
+    def sketch(self) -> Optional[TableSketch]:
+        """Sketches of the columns that could be sketched, see sketches."""
+        if self.error:
+            return None
+        columns = {column.name: column.sketch for column in self.columns if column.sketch is not None}
+        return TableSketch(self.table, columns, self.rows) if columns else None
+
+
+def profile_prompt(profiles: Dict[str, Dict[str, Any]], max_chars: int = PROFILE_PROMPT_CHARS) -> str:
+    """Compact text rendering of table profiles for the agent prompt, cut at max_chars."""
+    lines = []
+    for profile in profiles.values():
+        lines.append(f"Table {profile['table']} ({profile['rows']} rows):")
+        for col in profile["columns"]:
+            line = f"- {col['column']}: {col['type']}"
+            if col["nulls"]:
+                line += f", {col['null_ratio']:.0%} null"
+            if col["type"] != "blob":
+                distinct = col["distinct"] if col["distinct_exact"] else f">{col['distinct']}"
+                line += f", {distinct} distinct"
+            if col["min"] is not None:
+                line += f", range {col['min']} .. {col['max']}"
+            if col["top_values"] and (not col["distinct_exact"] or col["distinct"] < profile["rows"]):
+                line += ", top: " + ", ".join(f"{value} ({count})" for value, count in col["top_values"])
+            lines.append(line)
+    text = "\n".join(lines)
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit("\n", 1)[0] + "\n(profile truncated)"
+    return text
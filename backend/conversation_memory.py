@@ -0,0 +1,119 @@
+import os
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Prompt bytes the memory of one session may take; the oldest summaries are dropped past it
+MEMORY_MAX_BYTES = int(os.getenv("MEMORY_MAX_BYTES", "8000"))
+# Most recent turns kept in full (question, final SQL, answer); older ones are summarized
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "3"))
+MEMORY_ANSWER_CHARS = int(os.getenv("MEMORY_ANSWER_CHARS", "1500"))
+MEMORY_SUMMARY_CHARS = int(os.getenv("MEMORY_SUMMARY_CHARS", "240"))
+
+SQL_FUNCTIONS = ("query_sql", "execute_sql", "plot_bar", "plot_pie")
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit - 3] + "..."
+
+
+def final_sql(function_called: List[Dict[str, Any]]) -> Optional[str]:
+    """SQL text of the last SQL function call of a turn."""
+    for call in reversed(function_called):
+        if call.get("call") in SQL_FUNCTIONS:
+            text = (call.get("args") or {}).get("text")
+            if text:
+                return text
+    return None
+
+
+class Turn:
+    __slots__ = ("question", "sql", "answer", "text")
+
+    def __init__(self, question: str, sql: Optional[str], answer: str):
+        self.question = question
+        self.sql = sql
+        self.answer = answer
+        self.text = self._render()
+
+    def _render(self) -> str:
+        text = f"user: {self.question}\n"
+        if self.sql:
+            text += f"sql: {self.sql}\n"
+        return text + f"assistant: {self.answer}\n"
+
+    def summary(self) -> str:
+        """One line standing in for the turn once it is no longer recent."""
+        line = f"Q: {self.question}"
+        if self.sql:
+            line += f" | SQL: {self.sql}"
+        line += f" | A: {self.answer}"
+        return _shorten(line, MEMORY_SUMMARY_CHARS)
+
+
+class ConversationMemory:
+    """
+    Per-session conversation memory for the agent prompt. Only the question, the final SQL and the
+    answer of each turn are kept (never function results); turns older than MEMORY_RECENT_TURNS are
+    reduced to one-line summaries, and summaries are dropped oldest first to stay under max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = MEMORY_MAX_BYTES, recent_turns: int = MEMORY_RECENT_TURNS):
+        self.max_bytes = max_bytes
+        self.recent_turns = recent_turns
+        self.turns: deque = deque()
+        self.summaries: deque = deque()
+        self.size_bytes = 0
+        self.dropped = 0
+
+    def add(self, question: str, function_called: List[Dict[str, Any]], answer: str):
+        sql = final_sql(function_called)
+        turn = Turn(_shorten(question, MEMORY_ANSWER_CHARS),
+                    sql[:MEMORY_ANSWER_CHARS] if sql else None,
+                    answer[:MEMORY_ANSWER_CHARS])
+        self.turns.append(turn)
+        while len(self.turns) > self.recent_turns:
+            self.summaries.append(self.turns.popleft().summary())
+        self._enforce_cap()
+
+    def _enforce_cap(self):
+        self.size_bytes = len(self.render().encode("utf-8"))
+        while self.size_bytes > self.max_bytes and (self.summaries or len(self.turns) > 1):
+            if self.summaries:
+                self.summaries.popleft()
+                self.dropped += 1
+            else:
+                self.summaries.append(self.turns.popleft().summary())
+            self.size_bytes = len(self.render().encode("utf-8"))
+
+    def render(self) -> str:
+        """Prompt section with the summaries of older turns, then the recent turns in full."""
+        if not self.turns and not self.summaries:
+            return ""
+        prompt = ""
+        if self.summaries:
+            prompt += "Earlier conversation (summarized):\n" + "\n".join(self.summaries) + "\n\n"
+        for i, turn in enumerate(self.turns):
+            prompt += f"Conversation {i + 1}:\n{turn.text}\n"
+        return prompt
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return [{"summary": summary} for summary in self.summaries] + [
+            {"question": turn.question, "sql": turn.sql, "answer": turn.answer} for turn in self.turns
+        ]
+
+    def clear(self):
+        self.turns.clear()
+        self.summaries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "turns": len(self.turns),
+            "summaries": len(self.summaries),
+            "dropped": self.dropped,
+        }
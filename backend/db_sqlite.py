@@ -1,74 +1,822 @@
 import io
 import os
+import re
+import time
+import sqlite3
 import tempfile
+from contextlib import contextmanager
 
 import aiosqlite
 import asyncio
-import sqlparse
-import pandas as pd
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, AsyncIterator, Tuple
+
+from json_stream import infer_sqlite_type, record_value
+from column_profile import TableProfiler
+from index_advisor import IndexAdvisor, index_name, plan_candidates, table_aliases
+from table_samples import SAMPLES_SCHEMA, TableSamples
+from sketches import SKETCH_MIN_ROWS, TableSketch
+from schema_index import SchemaIndex
+from fts_index import FTS_AUTO, FTS_MIN_WORDS, SEARCH_SCHEMA, FullTextIndexes, fts_name, text_candidates
+from query_cost import SQL_AUTO_LIMIT_ROWS, SQL_COST_MAX_ROWS, add_limit, estimate_cost, is_select, review
+from app_logging import get_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+log = get_logger("db")
+
+INSERT_BATCH_ROWS = 5000
+# Read-only connections per session serving query_sql and exports (0 runs reads on the writer connection)
+SQL_READERS = int(os.getenv("SQL_READERS", "2"))
+# Wait before retrying an advised index while the writer is inside another transaction
+INDEX_RETRY_SECONDS = 0.05
+
+# How uploads treat an existing table: drop and recreate it, add rows to it, or insert-or-update by key
+LOAD_MODES = ("replace", "append", "upsert")
+
+_COMMENT_ONLY = re.compile(r'(?:\s|--[^\n]*(?:\n|$)|/\*.*?\*/)*', re.DOTALL)
+
+
+def _to_text(value) -> Optional[str]:
+    """Uploaded values are stored as TEXT; missing values become NULL instead of 'nan'/'None'."""
+    if value is None or (isinstance(value, float) and value != value) or type(value).__name__ == "NaTType":
+        return None
+    return str(value)
+
+
+def _dataframe_rows(df: "pd.DataFrame") -> List[tuple]:
+    return [tuple(_to_text(v) for v in row) for row in df.itertuples(index=False, name=None)]
+
+
+def _row_keys(rows: List[Dict[str, Any]]) -> List[str]:
+    """Keys of a batch of row dicts, in first-seen order; keys differing only in case count once, like SQLite columns."""
+    keys: Dict[str, str] = {}
+    for row in rows:
+        for key in row:
+            keys.setdefault(key.lower(), key)
+    return list(keys.values())
+
+
+def _rows_with_columns(rows: List[Dict[str, Any]], columns: List[str]) -> List[Dict[str, Any]]:
+    """Rows whose keys differ in case from the table's column names, with the column names as keys."""
+    if all(key in columns for row in rows for key in row):
+        return rows
+    names = {name.lower(): name for name in columns}
+    return [{names.get(key.lower(), key): value for key, value in row.items()} for row in rows]
+
+
+def _insert_query(table: str, columns: List[str], key: Optional[List[str]] = None) -> str:
+    """INSERT of the given columns; with key columns, rows whose key exists update the other columns."""
+    quoted = ", ".join([f'"{name}"' for name in columns])
+    query = f"INSERT INTO {table} ({quoted}) VALUES ({', '.join(['?' for _ in columns])})"
+    if key:
+        conflict = ", ".join([f'"{name}"' for name in key])
+        updates = ", ".join([f'"{name}" = excluded."{name}"' for name in columns if name not in key])
+        query += f" ON CONFLICT ({conflict}) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING")
+    return query
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Splits a script into statements with SQLite's own tokenizer: a ';' ends a statement only where
+    sqlite3.complete_statement agrees, so semicolons in strings, comments and trigger bodies are kept.
+    """
+    sql = sql.strip()
+    if ";" not in sql.rstrip(";"):
+        return [sql] if not _COMMENT_ONLY.fullmatch(sql.rstrip(";")) else []
+
+    statements = []
+    start = 0
+    end = sql.find(";")
+    while end != -1:
+        candidate = sql[start:end + 1]
+        if sqlite3.complete_statement(candidate):
+            statement = candidate.strip()
+            if not _COMMENT_ONLY.fullmatch(statement.rstrip(";")):
+                statements.append(statement)
+            start = end + 1
+        end = sql.find(";", end + 1)
+    rest = sql[start:].strip()
+    if not _COMMENT_ONLY.fullmatch(rest):
+        statements.append(rest)
+    return statements
+
+
+async def _single_chunk(df: "pd.DataFrame"):
+    yield df
+
+
+class QueryLimits:
+    """Per-session budgets for statements run through execute_sql. A value of 0 disables the limit."""
+
+    def __init__(self, timeout_seconds: float = 10.0, max_vm_steps: int = 2_000_000_000,
+                 max_result_rows: int = 10_000, max_expr_depth: int = 100, max_length: int = 10_000_000):
+        self.timeout_seconds = timeout_seconds
+        self.max_vm_steps = max_vm_steps
+        self.max_result_rows = max_result_rows
+        self.max_expr_depth = max_expr_depth
+        self.max_length = max_length
+
+    @classmethod
+    def from_env(cls) -> "QueryLimits":
+        return cls(
+            timeout_seconds=float(os.getenv("SQL_TIMEOUT_SECONDS", "10")),
+            max_vm_steps=int(os.getenv("SQL_MAX_VM_STEPS", "2000000000")),
+            max_result_rows=int(os.getenv("SQL_MAX_RESULT_ROWS", "10000")),
+            max_expr_depth=int(os.getenv("SQL_MAX_EXPR_DEPTH", "100")),
+            max_length=int(os.getenv("SQL_MAX_LENGTH", "10000000")),
+        )
+
+
+class QueryGuard:
+    """
+    SQLite progress handler enforcing the wall-clock and VM-step budget of the running statement.
+    It is called on the connection thread every PROGRESS_INTERVAL VM instructions; returning
+    non-zero makes SQLite abort the statement with an "interrupted" error.
+    """
+
+    PROGRESS_INTERVAL = 1000
+
+    def __init__(self):
+        self.limits: Optional[QueryLimits] = None
+        self.deadline: Optional[float] = None
+        self.ticks_left: Optional[int] = None
+        self.reason: Optional[str] = None
+
+    def arm(self, limits: QueryLimits):
+        self.limits = limits
+        self.reason = None
+        self.deadline = time.monotonic() + limits.timeout_seconds if limits.timeout_seconds else None
+        self.ticks_left = max(limits.max_vm_steps // self.PROGRESS_INTERVAL, 1) if limits.max_vm_steps else None
+
+    def disarm(self):
+        self.deadline = None
+        self.ticks_left = None
+
+    def __call__(self) -> int:
+        if self.ticks_left is not None:
+            self.ticks_left -= 1
+            if self.ticks_left <= 0:
+                self.reason = "steps"
+                return 1
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = "timeout"
+            return 1
+        return 0
+
+    def describe(self) -> str:
+        advice = ("Rewrite the query to touch less data: filter with WHERE, aggregate, add a LIMIT, "
+                  "make sure every JOIN has an ON condition (a missing one produces a cross join) "
+                  "and that recursive CTEs terminate.")
+        if self.reason == "timeout":
+            return f"Query interrupted: it exceeded the {self.limits.timeout_seconds:g}s time limit. {advice}"
+        if self.reason == "steps":
+            return f"Query interrupted: it exceeded the budget of {self.limits.max_vm_steps} execution steps. {advice}"
+        return "Query cancelled because the request was cancelled or the client disconnected."
 
 
 class LocalSQLiteDatabase:
-    def __init__(self, db_path: str = ':memory:'):
+    def __init__(self, db_path: str = ':memory:', limits: Optional[QueryLimits] = None,
+                 readers: int = SQL_READERS):
         self.db_path = db_path
+        # Temporary file backing a ':memory:' session that has readers, removed on close
+        self._snapshot_file: Optional[str] = None
         self.conn: Optional[aiosqlite.Connection] = None
+        self.limits = limits or QueryLimits.from_env()
+        self._guard = QueryGuard()
+        self.index_advisor = IndexAdvisor()
+        # Advised indexes waiting for the writer, created one at a time by _index_task
+        self._pending_indexes: List[Tuple[str, Tuple[str, ...], str]] = []
+        self._index_task: Optional[asyncio.Task] = None
+        # Column statistics computed while tables are loaded, {table: profile}, see column_profile
+        self.table_profiles: Dict[str, Dict[str, Any]] = {}
+        # Column sketches of large tables for approximate answers, {table: TableSketch}, see sketches
+        self.table_sketches: Dict[str, TableSketch] = {}
+        self.reader_count = readers
+        self._readers: List[Tuple[aiosqlite.Connection, QueryGuard]] = []
+        self._idle_readers: Optional[asyncio.Queue] = None
+        # Bumped whenever committed data or schema may have changed; keys caches of derived artifacts
+        self.data_version = 0
+        # Open write transaction, see _begin and rollback
+        self._changes_at_begin: Optional[int] = None
+        self._load_open = False
+        self.table_samples = TableSamples()
+        self.text_indexes = FullTextIndexes()
+        # BM25 index over table and column names and sample values, picks the tables for each prompt
+        self.schema_index = SchemaIndex()
+        # Shared in-memory databases every connection attaches, {schema: URI}
+        self._shadow_targets = {
+            schema: f"file:byedb-{schema}-{id(self):x}-{time.monotonic_ns()}?mode=memory&cache=shared"
+            for schema in (SAMPLES_SCHEMA, SEARCH_SCHEMA)
+        }
+        # Table row counts for query cost estimates, valid for _row_counts_version
+        self._row_counts: Dict[str, int] = {}
+        self._row_counts_version = -1
+
+    def _connect_target(self) -> str:
+        """Path the connections open."""
+        if self.db_path == ":memory:" and self.reader_count:
+            # Readers of a memory database would see uncommitted rows (shared cache has no snapshots),
+            # so a session with readers keeps its data in a temporary file in WAL mode instead
+            fd, self._snapshot_file = tempfile.mkstemp(prefix="byedb-", suffix=".sqlite")
+            os.close(fd)
+            return self._snapshot_file
+        return self.db_path
 
     async def connect(self):
-        self.conn = await aiosqlite.connect(self.db_path)
+        target = self._connect_target()
+        self.conn = await aiosqlite.connect(target)
         self.conn.row_factory = aiosqlite.Row
-        print(f"Connected to SQLite database: {self.db_path}")
+        await self.conn.set_progress_handler(self._guard, QueryGuard.PROGRESS_INTERVAL)
+        await self._apply_connection_limits(self.conn)
+        await self._attach_shadow_schemas(self.conn)
+        if self.reader_count:
+            # WAL lets readers see the last committed state while a write is in progress
+            await self.conn.execute("PRAGMA journal_mode=WAL")
+            if self._snapshot_file:
+                # The file does not outlive the session, so there is nothing to keep durable
+                await self.conn.execute("PRAGMA synchronous=OFF")
+            await self._open_readers(target)
+        log.info("database connected", extra={"fields": {"path": self.db_path, "readers": len(self._readers)}})
+
+    async def _open_readers(self, target: str):
+        self._idle_readers = asyncio.Queue()
+        for _ in range(self.reader_count):
+            reader = await aiosqlite.connect(target)
+            reader.row_factory = aiosqlite.Row
+            guard = QueryGuard()
+            await reader.set_progress_handler(guard, QueryGuard.PROGRESS_INTERVAL)
+            await self._apply_connection_limits(reader)
+            await self._attach_shadow_schemas(reader)
+            await reader.execute("PRAGMA query_only = ON")
+            # Only the attached samples and text indexes are shared-cache; readers would otherwise
+            # take table locks there that make the writer fail (the main schema reads a WAL snapshot)
+            await reader.execute("PRAGMA read_uncommitted = ON")
+            self._readers.append((reader, guard))
+            self._idle_readers.put_nowait((reader, guard))
+
+    async def _on_connection_thread(self, fn, *args, conn: Optional[aiosqlite.Connection] = None):
+        # aiosqlite has no public hook for running a callable on its connection thread; this keeps
+        # multi-step work (arming the guard, executing, fetching) in one job no other coroutine can split
+        return await (conn or self.conn)._execute(fn, *args)
+
+    async def _apply_connection_limits(self, conn: aiosqlite.Connection):
+        raw_conn = conn._conn
+        if self.limits.max_expr_depth:
+            await self._on_connection_thread(raw_conn.setlimit, sqlite3.SQLITE_LIMIT_EXPR_DEPTH, self.limits.max_expr_depth, conn=conn)
+        if self.limits.max_length:
+            await self._on_connection_thread(raw_conn.setlimit, sqlite3.SQLITE_LIMIT_LENGTH, self.limits.max_length, conn=conn)
+
+    async def _attach_shadow_schemas(self, conn: aiosqlite.Connection):
+        """
+        Every connection sees the table samples and full-text indexes, kept in shared in-memory
+        databases outside the exported data.
+        """
+        for schema, target in self._shadow_targets.items():
+            await conn.execute(f"ATTACH DATABASE ? AS {schema}", (target,))
+
+    async def _sync_derived_tables(self, tables: Optional[List[str]] = None, reset: bool = False,
+                                   statements: Optional[List[str]] = None):
+        """
+        Brings the table samples, schema index and full-text indexes up to date after a committed
+        write. Samples and schema index: of the given tables (all tables when None), sampled again from
+        scratch with reset, or of those the statements may have written. Full-text indexes of recreated
+        tables are rebuilt, and the given tables get automatic ones (see fts_index).
+        """
+        if not self.conn:
+            return
+
+        def sync(raw_conn: sqlite3.Connection):
+            if statements is not None:
+                touched = self.table_samples.touched(raw_conn, statements, known=self.schema_index.docs)
+            else:
+                touched = {table: reset for table in (tables or self.table_samples.all_tables(raw_conn))}
+            if self.table_samples.enabled:
+                self.table_samples.sync(raw_conn, touched)
+            self.schema_index.update(raw_conn, None if tables is None and statements is None else list(touched),
+                                     SAMPLES_SCHEMA if self.table_samples.enabled else None)
+            self.text_indexes.sync(raw_conn)
+            if FTS_AUTO:
+                for table in tables or []:
+                    self._auto_text_index(raw_conn, table)
+
+        try:
+            await self._on_connection_thread(sync, self.conn._conn)
+        except sqlite3.Error as e:
+            log.warning("derived table sync error: %s", e)
+
+    def _text_columns(self, raw_conn: sqlite3.Connection, table: str, candidates: List[str]) -> List[str]:
+        """Runs on the connection thread: the candidates whose values average FTS_MIN_WORDS words."""
+        words = self.text_indexes.average_words(raw_conn, table, candidates,
+                                                SAMPLES_SCHEMA if self.table_samples.enabled else None)
+        return [column for column in candidates if words[column] >= FTS_MIN_WORDS]
+
+    def _index_name_taken(self, raw_conn: sqlite3.Connection, table: str) -> bool:
+        # Trigger bodies refer to the index unqualified, so a main table of that name would shadow it
+        return raw_conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = ?", (fts_name(table),)).fetchone() is not None
+
+    def _auto_text_index(self, raw_conn: sqlite3.Connection, table: str):
+        """Runs on the connection thread: indexes the free-text columns of a freshly loaded, profiled table."""
+        profile = self.table_profiles.get(table)
+        if profile is None or table in self.text_indexes.indexes or self._index_name_taken(raw_conn, table):
+            return
+        candidates = text_candidates(profile)
+        columns = self._text_columns(raw_conn, table, candidates) if candidates else []
+        if columns:
+            start = time.perf_counter()
+            self.text_indexes.build(raw_conn, table, columns)
+            log.info("full-text index created", extra={"fields": {
+                "table": table, "columns": columns, "seconds": round(time.perf_counter() - start, 3)}})
+
+    async def create_text_index(self, table: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Builds, or rebuilds, the full-text index of a table over the given text columns; by default
+        over its text columns averaging FTS_MIN_WORDS words per value.
+        """
+        if not self.conn:
+            return {"success": False, "error": "Database not connected."}
+
+        def build(raw_conn: sqlite3.Connection) -> Dict[str, Any]:
+            existing = {row[1]: (row[2] or "").upper() for row in
+                        raw_conn.execute("SELECT * FROM main.pragma_table_info(?)", (table,))}
+            if not existing:
+                return {"success": False, "error": f"Table {table} not found."}
+            if self._index_name_taken(raw_conn, table):
+                return {"success": False, "error": f"A table named {fts_name(table)} already exists."}
+            missing = [column for column in columns or [] if column not in existing]
+            if missing:
+                return {"success": False, "error": f"Column(s) {', '.join(missing)} not found in {table}."}
+            chosen = columns or self._text_columns(
+                raw_conn, table, [name for name, declared in existing.items() if declared in ("", "TEXT")])
+            if not chosen:
+                return {"success": False, "error": f"{table} has no free-text columns; name the columns to index."}
+            self.text_indexes.build(raw_conn, table, chosen)
+            return {"success": True, "table": table, "index": fts_name(table), "columns": chosen}
+
+        try:
+            return await self._on_connection_thread(build, self.conn._conn)
+        except sqlite3.Error as e:
+            return {"success": False, "error": str(e)}
+
+    async def drop_text_index(self, table: str) -> Dict[str, Any]:
+        if table not in self.text_indexes.indexes:
+            return {"success": False, "error": f"{table} has no full-text index."}
+        await self._on_connection_thread(self.text_indexes.drop, self.conn._conn, table)
+        return {"success": True, "table": table}
+
+    async def set_limits(self, limits: QueryLimits):
+        self.limits = limits
+        if self.conn:
+            for conn in [self.conn] + [reader for reader, _ in self._readers]:
+                await self._apply_connection_limits(conn)
+
+    async def _begin(self, load: bool = False):
+        """
+        Opens a write transaction. A load keeps it open across awaits, while other work (exports
+        among it) runs on the writer; execute_sql runs its whole script in one connection job.
+        """
+        await self.conn.execute("BEGIN")
+        self._changes_at_begin = self.conn.total_changes
+        self._load_open = load
+
+    async def rollback(self):
+        """
+        Rolls back the open transaction. When it was a load or changed rows, the data version moves
+        too: an export built on the writer while the transaction was open may hold its rows, and
+        must not be served from the cache. A failed statement that wrote nothing keeps the caches.
+        """
+        wrote = self._load_open or self.conn.total_changes != self._changes_at_begin
+        await self.conn.rollback()
+        self._load_open = False
+        if wrote:
+            self.data_version += 1
+
+    async def abort(self):
+        """Interrupts the running statement and rolls back the open transaction."""
+        await self.interrupt()
+        await asyncio.shield(self.rollback())
+
+    async def interrupt(self):
+        """Aborts the statement currently running on the connection thread."""
+        if self.conn:
+            self._guard.reason = "cancelled"
+            await self.conn.interrupt()
 
     async def close(self):
+        if self._index_task:
+            self._index_task.cancel()
+            await asyncio.gather(self._index_task, return_exceptions=True)
+        for reader, _ in self._readers:
+            await reader.close()
+        self._readers = []
         if self.conn:
             await self.conn.close()
-            print(f"Disconnected from SQLite database: {self.db_path}")
-
-    async def execute_sql(self, sql_query: str) -> Dict[str, Any]:
+            log.info("database disconnected", extra={"fields": {"path": self.db_path}})
+        if self._snapshot_file:
+            for path in (self._snapshot_file, self._snapshot_file + "-wal", self._snapshot_file + "-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._snapshot_file = None
+
+    async def execute_sql(self, sql_query: str, internal: bool = False, columnar: bool = False) -> Dict[str, Any]:
+        """
+        Executes one or more statements in a transaction.
+        Internal callers (exports, schema listing) are not subject to the session's query limits.
+        Rows are returned as dicts in "data", or with columnar=True as "columns" plus "rows" value
+        lists, which does not repeat the column names in every row.
+        """
         if not self.conn:
             return {"success": False, "error": "Database not connected."}
 
+        limits = None if internal else self.limits
+        self._guard.reason = None
         try:
-            statements = sqlparse.split(sql_query)
-            results = []
+            await self._begin()
+            results, truncated, modifying = await self._on_connection_thread(
+                self._run_script, self.conn._conn, self._guard, sql_query, limits)
+            await self.conn.commit()
+            if modifying:
+                self.data_version += 1
+                await self._sync_derived_tables(statements=modifying)
+            self._forget_profiles(modifying)
+            if not internal:
+                await self._advise_indexes(self.conn, results)
+            return await self._script_result(results, truncated, limits, internal, columnar)
+
+        except asyncio.CancelledError:
+            # Stop the statement still running on the connection thread, then release its transaction
+            await self.abort()
+            raise
 
-            async with self.conn.execute("BEGIN"):
-                for statement in statements:
-                    statement = statement.strip()
-                    if not statement:
-                        continue
+        except Exception as e:
+            await self.rollback()
+            if isinstance(e, sqlite3.OperationalError) and self._guard.reason:
+                return {"success": False, "error": self._guard.describe(), "interrupted": self._guard.reason}
+            return {"success": False, "error": str(e)}
 
-                    upper_stmt = statement.upper()
-                    async with self.conn.execute(statement) as cursor:
-                        if upper_stmt.startswith("SELECT"):
-                            rows = await cursor.fetchall()
-                            data = [dict(row) for row in rows]
-                            results.append({
-                                "statement": statement,
-                                "type": "SELECT",
-                                "data": data
-                            })
-                        else:
-                            results.append({
-                                "statement": statement,
-                                "type": "NON-SELECT",
-                                "message": "Executed successfully."
-                            })
-                await self.conn.commit()
-
-            data = [row for r in results if r["type"] == "SELECT" for row in r["data"]]
-            return {"success": True, "message": "Executed multiple statements.", "data": data, "results": results}
+    async def query_sql(self, sql_query: str, internal: bool = False, columnar: bool = False) -> Dict[str, Any]:
+        """
+        Read-only counterpart of execute_sql: no transaction, and statements that would write fail.
+        Runs on an idle reader connection, so reads and exports run in parallel with each other and
+        with writes; falls back to the writer connection when the data is locked by a write in progress.
+        """
+        if not self.conn:
+            return {"success": False, "error": "Database not connected."}
+
+        limits = None if internal else self.limits
+        if self._readers:
+            reader, guard = await self._idle_readers.get()
+            try:
+                return await self._query_on(reader, guard, sql_query, limits, internal, columnar)
+            except sqlite3.OperationalError:
+                pass  # a write to the shared-cache samples holds a lock; read through the writer instead
+            finally:
+                self._idle_readers.put_nowait((reader, guard))
+        return await self._query_on(self.conn, self._guard, sql_query, limits, internal, columnar)
+
+    async def _query_on(self, conn: aiosqlite.Connection, guard: QueryGuard, sql_query: str,
+                        limits: Optional[QueryLimits], internal: bool, columnar: bool) -> Dict[str, Any]:
+        """Runs a read-only script on one connection; shared-cache lock errors are raised for the caller to retry."""
+        guard.reason = None
+        try:
+            results, truncated, _ = await self._on_connection_thread(
+                self._run_read_only, conn._conn, guard, sql_query, limits, conn is self.conn, conn=conn)
+            if not internal:
+                await self._advise_indexes(conn, results)
+            return await self._script_result(results, truncated, limits, internal, columnar)
+
+        except asyncio.CancelledError:
+            guard.reason = "cancelled"
+            await conn.interrupt()
+            raise
 
         except Exception as e:
-            await self.conn.rollback()
+            if conn is not self.conn and isinstance(e, sqlite3.OperationalError) and "locked" in str(e):
+                raise
+            if isinstance(e, sqlite3.OperationalError) and guard.reason:
+                return {"success": False, "error": guard.describe(), "interrupted": guard.reason}
+            if "readonly" in str(e) or "read-only" in str(e):
+                return {"success": False, "error": f"{e}. query_sql is read-only; use execute_sql to modify the database."}
             return {"success": False, "error": str(e)}
 
+    async def _script_result(self, results: List[Dict[str, Any]], truncated: bool, limits: Optional[QueryLimits],
+                             internal: bool, columnar: bool) -> Dict[str, Any]:
+        """
+        Builds the response of execute_sql/query_sql. Each SELECT result carries its "columns" and
+        either "data" (row dicts) or, when columnar, "rows" (value lists). Top-level "columns" are those
+        of the last result set; top-level "data" concatenates the row dicts of every result set.
+        """
+        selects = [r for r in results if r["type"] == "SELECT"]
+
+        result = {"success": True, "message": "Executed multiple statements.",
+                  "columns": selects[-1]["columns"] if selects else []}
+        if not columnar:
+            for r in selects:
+                columns = r["columns"]
+                r["data"] = [dict(zip(columns, row)) for row in r.pop("rows")]
+            result["data"] = [row for r in selects for row in r["data"]]
+        result["results"] = results
+        if truncated:
+            result["truncated"] = True
+            result["message"] = (f"Result truncated to the first {limits.max_result_rows} rows. "
+                                 "Aggregate the data or add a LIMIT to see a specific part of it.")
+        return result
+
+    @staticmethod
+    @contextmanager
+    def _main_snapshot(raw_conn: sqlite3.Connection):
+        """
+        Runs on the connection thread: holds one read snapshot, opened by reading the main schema. A
+        statement only revalidates the schemas it reads, so a reader could otherwise resolve a table
+        created since its last read to the copy in the attached samples. A connection already inside
+        a transaction reads that transaction's state.
+        """
+        if raw_conn.in_transaction:
+            yield
+            return
+        raw_conn.execute("BEGIN")
+        try:
+            raw_conn.execute("SELECT count(*) FROM main.sqlite_master").fetchone()
+            yield
+        finally:
+            raw_conn.rollback()
+
+    @classmethod
+    def _run_read_only(cls, raw_conn: sqlite3.Connection, guard: QueryGuard, sql_query: str,
+                       limits: Optional[QueryLimits], writer: bool) -> Tuple[List[Dict[str, Any]], bool, List[str]]:
+        """
+        Runs on the connection thread. Readers are always query_only, and run the script on one
+        snapshot (see _main_snapshot); the writer is only query_only for this script.
+        """
+        if not writer:
+            with cls._main_snapshot(raw_conn):
+                return cls._run_script(raw_conn, guard, sql_query, limits)
+        raw_conn.execute("PRAGMA query_only = ON")
+        try:
+            return cls._run_script(raw_conn, guard, sql_query, limits)
+        finally:
+            raw_conn.execute("PRAGMA query_only = OFF")
+
+    @classmethod
+    def _run_script(cls, raw_conn: sqlite3.Connection, guard: QueryGuard, sql_query: str,
+                    limits: Optional[QueryLimits]) -> Tuple[List[Dict[str, Any]], bool, List[str]]:
+        """
+        Runs on the connection thread: splits the script and executes its statements in one job.
+        A statement returning columns (SELECT, WITH ... SELECT, PRAGMA, RETURNING) is reported as
+        "SELECT" with its rows, any other as "NON-SELECT". Also returns the statements that may have
+        modified the database.
+        """
+        results = []
+        modifying = []
+        truncated = False
+        for statement in split_statements(sql_query):
+            if guard.reason == "cancelled":
+                raise sqlite3.OperationalError("interrupted")
+            changes = raw_conn.total_changes
+            columns, rows, statement_truncated = cls._run_statement(raw_conn, guard, statement, limits)
+            truncated = truncated or statement_truncated
+            if columns is None:
+                results.append({"statement": statement, "type": "NON-SELECT", "message": "Executed successfully."})
+                modifying.append(statement)
+            else:
+                results.append({"statement": statement, "type": "SELECT", "columns": columns, "rows": rows})
+                if raw_conn.total_changes != changes:
+                    modifying.append(statement)
+        return results, truncated, modifying
+
+    @staticmethod
+    def _run_statement(raw_conn: sqlite3.Connection, guard: QueryGuard, statement: str, limits: Optional[QueryLimits]
+                       ) -> Tuple[Optional[List[str]], Optional[List[tuple]], bool]:
+        """
+        Runs on the connection thread, with the guard armed for this statement only.
+        Returns the column names and plain row tuples, or (None, None) for statements without a result set.
+        """
+        if limits:
+            guard.arm(limits)
+        try:
+            cursor = raw_conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(statement)
+            if cursor.description is None:
+                return None, None, False
+            columns = [col[0] for col in cursor.description]
+            if limits and limits.max_result_rows:
+                rows = cursor.fetchmany(limits.max_result_rows + 1)
+                if len(rows) > limits.max_result_rows:
+                    return columns, rows[:limits.max_result_rows], True
+            else:
+                rows = cursor.fetchall()
+            return columns, rows, False
+        finally:
+            guard.disarm()
+
+    def _forget_profiles(self, statements: List[str]):
+        """
+        Profiles and sketches describe the data as loaded; statements that may have changed a table
+        invalidate both.
+        """
+        for table in set(self.table_profiles) | set(self.table_sketches):
+            pattern = re.compile(rf'\b{re.escape(table)}\b', re.IGNORECASE)
+            if any(pattern.search(statement) for statement in statements):
+                self.table_profiles.pop(table, None)
+                self.table_sketches.pop(table, None)
+
+    def _keep_profile(self, table: str, profiler: Optional[TableProfiler]):
+        """Publishes the profile and sketch of a table, replacing those of its previous contents."""
+        self.table_profiles.pop(table, None)
+        self.table_sketches.pop(table, None)
+        if profiler is None or not profiler.result():
+            return
+        self.table_profiles[table] = profiler.result()
+        sketch = profiler.sketch()
+        if sketch is not None and sketch.rows >= SKETCH_MIN_ROWS:
+            self.table_sketches[table] = sketch
+
+    async def _profile_table(self, table: str) -> Optional[TableProfiler]:
+        """
+        Profiles and sketches a table from its committed rows, read in chunks on a reader (the writer
+        without readers). Appends and upserts change the table beyond the rows they load, so their
+        tables are profiled again in full.
+        """
+        def profile(raw_conn: sqlite3.Connection) -> TableProfiler:
+            names = [row[1] for row in raw_conn.execute("SELECT * FROM pragma_table_info(?, 'main')", (table,))]
+            profiler = TableProfiler(table, names)
+            quoted = ", ".join([f'"{name}"' for name in names])
+            cursor = raw_conn.execute(f'SELECT {quoted} FROM main."{table}"')
+            while rows := cursor.fetchmany(INSERT_BATCH_ROWS):
+                profiler.add_rows(rows)
+            return profiler
+
+        try:
+            if not self._readers:
+                return await self._on_connection_thread(profile, self.conn._conn)
+            reader, guard = await self._idle_readers.get()
+            try:
+                return await self._on_connection_thread(profile, reader._conn, conn=reader)
+            finally:
+                self._idle_readers.put_nowait((reader, guard))
+        except sqlite3.Error as e:
+            log.warning("profiling of table %s failed: %s", table, e)
+            return None
+
+    @classmethod
+    def _query_plan(cls, raw_conn: sqlite3.Connection, statement: str) -> Tuple[List[str], Dict[str, List[str]]]:
+        """Runs on the connection thread: EXPLAIN QUERY PLAN details and the columns of the tables the statement reads."""
+        with cls._main_snapshot(raw_conn):
+            plan = [row[3] for row in raw_conn.execute(f"EXPLAIN QUERY PLAN {statement}")]
+            table_columns = {}
+            for table in set(table_aliases(statement).values()):
+                columns = [row[1] for row in raw_conn.execute("SELECT * FROM pragma_table_info(?, 'main')", (table,))]
+                if columns and not table.startswith("sqlite_"):
+                    table_columns[table] = columns
+        return plan, table_columns
+
+    @classmethod
+    def _plan_and_row_counts(cls, raw_conn: sqlite3.Connection, statement: str, known: Dict[str, int]
+                             ) -> Tuple[List[Tuple[int, int, int, str]], Dict[str, int]]:
+        """Runs on the connection thread: the EXPLAIN QUERY PLAN rows and the row counts of the tables read."""
+        with cls._main_snapshot(raw_conn):
+            plan = [tuple(row) for row in raw_conn.execute(f"EXPLAIN QUERY PLAN {statement}")]
+            counts = {}
+            for table in set(table_aliases(statement).values()):
+                if table in known:
+                    counts[table] = known[table]
+                elif raw_conn.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                                      (table,)).fetchone():
+                    counts[table] = raw_conn.execute(f'SELECT count(*) FROM main."{table}"').fetchone()[0]
+        return plan, counts
+
+    async def plan_query(self, sql_query: str) -> Dict[str, Any]:
+        """
+        Reviews an agent's read query before it runs (see query_cost): estimates its row visits from
+        EXPLAIN QUERY PLAN and the table row counts, adds a LIMIT to unbounded row listings, and
+        refuses queries that are too expensive. Returns the "sql" to run, whether it is "allowed",
+        and the estimates and "issues" to hand back to the model. Scripts of several statements and
+        queries that fail to plan are passed through unchanged; running them reports their errors.
+        """
+        result = {"sql": sql_query, "allowed": True, "issues": []}
+        statements = split_statements(sql_query)
+        if not self.conn or not SQL_COST_MAX_ROWS or len(statements) != 1 or not is_select(statements[0]):
+            return result
+        statement = statements[0]
+
+        if self._row_counts_version != self.data_version:
+            self._row_counts = {}
+            self._row_counts_version = self.data_version
+        known = {**self._row_counts,
+                 **{table: profile["rows"] for table, profile in self.table_profiles.items() if "rows" in profile}}
+        reader = None
+        if self._readers:
+            reader = await self._idle_readers.get()
+        try:
+            conn = reader[0] if reader else self.conn
+            plan, counts = await self._on_connection_thread(self._plan_and_row_counts, conn._conn, statement,
+                                                            known, conn=conn)
+        except sqlite3.Error:
+            return result
+        finally:
+            if reader:
+                self._idle_readers.put_nowait(reader)
+        self._row_counts.update(counts)
+
+        estimate = estimate_cost(plan, statement, counts)
+        result["allowed"], result["issues"] = review(estimate)
+        result["estimated_row_visits"] = estimate.row_visits
+        result["estimated_rows"] = estimate.output_rows
+        limited = add_limit(statement, estimate.output_rows) if result["allowed"] else None
+        if limited:
+            result["sql"] = limited
+            result["limit_added"] = SQL_AUTO_LIMIT_ROWS
+        if result["issues"] or limited:
+            log.info("query cost reviewed", extra={"fields": {
+                "allowed": result["allowed"], "row_visits": estimate.row_visits,
+                "issues": [issue["issue"] for issue in result["issues"]], "limit_added": result.get("limit_added")}})
+        return result
+
+    async def _advise_indexes(self, conn: aiosqlite.Connection, results: List[Dict[str, Any]]):
+        """
+        Records the full scans and automatic indexes of the SELECTs a connection just ran, explaining
+        them on that same connection, and queues the indexes that became due for the writer.
+        """
+        if not self.index_advisor.enabled:
+            return
+        try:
+            for r in results:
+                if r["type"] != "SELECT":
+                    continue
+                plan, table_columns = await self._on_connection_thread(self._query_plan, conn._conn, r["statement"], conn=conn)
+                for candidate in self.index_advisor.record(plan_candidates(plan, r["statement"], table_columns)):
+                    if candidate not in self._pending_indexes:
+                        self._pending_indexes.append(candidate)
+        except sqlite3.Error as e:
+            log.warning("index advisor error: %s", e)
+        if self._pending_indexes and (self._index_task is None or self._index_task.done()):
+            self._index_task = asyncio.create_task(self._create_pending_indexes())
+
+    async def _create_pending_indexes(self):
+        """Background task: creates the queued indexes on the writer, waiting out transactions in progress."""
+        while self._pending_indexes:
+            table, columns, reason = self._pending_indexes[0]
+            try:
+                outcome = await self._on_connection_thread(self._create_advised_index, self.conn._conn, table, columns)
+            except sqlite3.Error as e:
+                log.warning("index advisor error: %s", e)
+                outcome = ("skipped", 0)
+            if outcome[0] == "busy":
+                await asyncio.sleep(INDEX_RETRY_SECONDS)
+                continue
+            self._pending_indexes.pop(0)
+            status, detail = outcome
+            if status == "rejected":
+                self.index_advisor.reject(table, columns, detail)
+            elif status == "created":
+                self.index_advisor.add(table, columns, reason, detail)
+                self.data_version += 1  # .db and .sql exports include the index
+                log.info("index created", extra={"fields": {"index": index_name(table, columns), "bytes": detail,
+                                                            "reason": reason}})
+
+    def _create_advised_index(self, raw_conn: sqlite3.Connection, table: str, columns: Tuple[str, ...]
+                              ) -> Tuple[str, Any]:
+        """
+        Runs on the writer's connection thread as one job, so it never interleaves with a load:
+        ("busy", 0) while another transaction is open, ("created", bytes), ("rejected", reason) or
+        ("skipped", 0).
+        """
+        if raw_conn.in_transaction:
+            return "busy", 0
+        self.index_advisor.forget([name for (name,) in raw_conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type='index'")])
+        name = index_name(table, columns)
+        if name in self.index_advisor.created:
+            return "skipped", 0
+        if raw_conn.execute("SELECT 1 FROM pragma_index_list(?, 'main') il JOIN pragma_index_info(il.name, 'main') ii "
+                            "WHERE ii.seqno = 0 AND ii.name = ?", (table, columns[0])).fetchone():
+            return "rejected", "an existing index already starts with this column"
+        if raw_conn.execute(f"SELECT count(*) FROM main.{table}").fetchone()[0] < self.index_advisor.min_rows:
+            return "skipped", 0
+
+        page_size = raw_conn.execute("PRAGMA main.page_size").fetchone()[0]
+        pages_before = raw_conn.execute("PRAGMA main.page_count").fetchone()[0]
+        raw_conn.execute("BEGIN")
+        try:
+            quoted = ", ".join([f'"{col}"' for col in columns])
+            raw_conn.execute(f'CREATE INDEX main."{name}" ON {table} ({quoted})')
+            size = (raw_conn.execute("PRAGMA main.page_count").fetchone()[0] - pages_before) * page_size
+            if self.index_advisor.bytes_used + size > self.index_advisor.budget_bytes:
+                raw_conn.rollback()
+                return "rejected", f"index of {size} bytes exceeds the session's index budget"
+            raw_conn.commit()
+        except BaseException:
+            raw_conn.rollback()
+            raise
+        return "created", size
+
     async def list_tables(self) -> Dict[str, Any]:
         sql = "SELECT name FROM sqlite_master WHERE type='table' AND name != 'sqlite_sequence';"
-        return await self.execute_sql(sql)
+        return await self.query_sql(sql, internal=True)
 
     async def get_table_info(self, table_name: str) -> Dict[str, Any]:
-        return await self.execute_sql(f"PRAGMA table_info('{table_name}')")
+        return await self.query_sql(f"PRAGMA table_info('{table_name}')", internal=True)
 
     async def clear_database(self) -> Dict[str, Any]:
         if not self.conn:
@@ -91,6 +839,11 @@ class LocalSQLiteDatabase:
                     errors.append({"table": table, "error": str(e)})
 
             await self.conn.commit()
+            self.data_version += 1
+            self.index_advisor.reset()
+            self.table_profiles.clear()
+            self.table_sketches.clear()
+            await self._sync_derived_tables()
 
             return {
                 "success": not errors,
@@ -100,7 +853,7 @@ class LocalSQLiteDatabase:
             }
 
         except Exception as e:
-            await self.conn.rollback()
+            await self.rollback()
             return {"success": False, "error": str(e)}
 
     async def export_all_data(self) -> Dict[str, Any]:
@@ -116,7 +869,7 @@ class LocalSQLiteDatabase:
             export_data = {}
 
             for table in tables:
-                result = await self.execute_sql(f"SELECT * FROM {table};")
+                result = await self.query_sql(f"SELECT * FROM {table};", internal=True)
                 if result["success"]:
                     export_data[table] = result["data"]
                 else:
@@ -127,31 +880,131 @@ class LocalSQLiteDatabase:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    async def load_all_data(self, data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    @staticmethod
+    def _check_load_mode(mode: str, key: Optional[List[str]], columns: List[str]):
+        if mode not in LOAD_MODES:
+            raise ValueError(f"Unknown load mode '{mode}', expected one of {', '.join(LOAD_MODES)}.")
+        if mode == "upsert":
+            if not key:
+                raise ValueError("Upsert needs the key columns that identify a row.")
+            missing = [name for name in key if name not in columns]
+            if missing:
+                raise ValueError(f"Key column(s) {', '.join(missing)} not found in the uploaded data.")
+
+    async def _ensure_key_index(self, table: str, key: List[str]):
+        """Unique index ON CONFLICT resolves against; created once, then kept up to date by SQLite."""
+        name = f"upsert_{table}_{'_'.join(key)}"
+        quoted = ", ".join([f'"{column}"' for column in key])
+        try:
+            await self.conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "{name}" ON {table} ({quoted})')
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Cannot upsert into {table} by ({', '.join(key)}): "
+                             f"its existing rows have duplicate keys.") from None
+
+    async def _prepare_table(self, table: str, columns: List[Tuple[str, str]], mode: str, key: Optional[List[str]]):
+        """
+        Inside a load transaction: replaces or creates the table, adds incoming columns the table
+        does not have yet and, for upserts, makes sure the key is unique.
+        """
+        if mode == "replace":
+            await self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        existing = {name.lower() for name, _ in await self.get_column_types(table)}
+        if not existing:
+            col_defs = ", ".join([f'"{name}" {col_type}' for name, col_type in columns])
+            await self.conn.execute(f"CREATE TABLE {table} ({col_defs})")
+        for name, col_type in columns:
+            if existing and name.lower() not in existing:
+                await self.conn.execute(f'ALTER TABLE {table} ADD COLUMN "{name}" {col_type}')
+        if mode == "upsert":
+            await self._ensure_key_index(table, key)
+
+    async def load_all_data(self, data: Dict[str, List[Dict[str, Any]]], progress=None) -> Dict[str, Any]:
+        """Loads {table: [row, ...]}, see load_json_batches."""
+        async def batches():
+            for table, rows in data.items():
+                if not isinstance(rows, list):
+                    yield table, None
+                    continue
+                for start in range(0, len(rows), INSERT_BATCH_ROWS):
+                    yield table, rows[start:start + INSERT_BATCH_ROWS]
+                if not rows:
+                    yield table, []
+
+        return await self.load_json_batches(batches(), progress=progress)
+
+    async def load_json_batches(self, batches: AsyncIterator[Tuple[str, Optional[List[Dict[str, Any]]]]],
+                                progress=None, mode: str = "append", key: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Loads a stream of (table, [row dict, ...]) batches, as produced by json_stream.JSONBatchReader,
+        inside a single transaction. Batches of the same table must be consecutive.
+        Missing tables are created with column types inferred from their first batch, and keys not
+        seen before are added as columns. `progress` is an optional ingest.IngestProgress.
+        mode: see LOAD_MODES; an upsert only sets the columns present in each batch.
+        """
         if not self.conn:
             return {"success": False, "error": "Database not connected."}
 
         errors = []
         loaded_tables = []
+        table = None
+        columns: List[str] = []
 
         try:
-            for table, rows in data.items():
-                if not isinstance(rows, list) or not rows:
-                    errors.append({"table": table, "error": "Invalid or empty row data."})
-                    continue
-
-                columns = list(rows[0].keys())
-
-                placeholders = ", ".join(["?" for _ in columns])
-                insert_query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
-
-                for row in rows:
-                    values = [row.get(col) for col in columns]
-                    await self.conn.execute(insert_query, values)
-
+            await self._begin(load=True)
+            async for batch_table, rows in batches:
+                if batch_table != table:
+                    if table is not None and columns:
+                        loaded_tables.append(table)
+                        if progress:
+                            progress.table_done(table)
+                    table = batch_table
+                    columns = []
+                    if not rows:
+                        errors.append({"table": table, "error": "Invalid or empty row data."})
+                        continue
+                    self._check_load_mode(mode, key, _row_keys(rows))
+                    if mode == "replace":
+                        await self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    columns = [name for name, _ in await self.get_column_types(table)]
+                    if not columns:
+                        col_defs = ", ".join([f'"{name}" {infer_sqlite_type(row.get(name) for row in rows)}'
+                                              for name in _row_keys(rows)])
+                        await self.conn.execute(f"CREATE TABLE {table} ({col_defs})")
+                        columns = _row_keys(rows)
+                    if mode == "upsert":
+                        await self._ensure_key_index(table, key)
+
+                known = {name.lower() for name in columns}
+                for name in _row_keys(rows):
+                    if name.lower() not in known:
+                        col_type = infer_sqlite_type(row.get(name) for row in rows)
+                        await self.conn.execute(f'ALTER TABLE {table} ADD COLUMN "{name}" {col_type}')
+                        columns.append(name)
+                        known.add(name.lower())
+                rows = _rows_with_columns(rows, columns)
+
+                if mode == "upsert":
+                    batch_columns = list(dict.fromkeys(key + _row_keys(rows)))
+                    insert_query = _insert_query(table, batch_columns, key)
+                else:
+                    batch_columns = columns
+                    insert_query = _insert_query(table, columns)
+                await self.conn.executemany(insert_query, [[record_value(row.get(col)) for col in batch_columns]
+                                                           for row in rows])
+                if progress:
+                    progress.add_rows(len(rows))
+
+            if table is not None and columns:
                 loaded_tables.append(table)
+                if progress:
+                    progress.table_done(table)
 
             await self.conn.commit()
+            self.data_version += 1
+            for loaded in loaded_tables:
+                self.table_profiles.pop(loaded, None)
+                self.table_sketches.pop(loaded, None)
+            await self._sync_derived_tables(loaded_tables, reset=mode == "replace")
 
             return {
                 "success": not errors,
@@ -159,30 +1012,119 @@ class LocalSQLiteDatabase:
                 "errors": errors
             }
 
+        except asyncio.CancelledError:
+            await self.abort()
+            raise
+
         except Exception as e:
-            await self.conn.rollback()
-            return {"success": False, "error": str(e)}
+            await self.rollback()
+            return {"success": False, "loaded_tables": [], "errors": [{"table": table, "error": str(e)}]}
+
+    async def load_dataframe(self, df: "pd.DataFrame", table_name: str, mode: str = "replace", progress=None,
+                             key: Optional[List[str]] = None) -> Dict[str, Any]:
+        return await self.load_dataframe_chunks(_single_chunk(df), table_name, mode=mode, progress=progress, key=key)
 
-    async def load_dataframe(self, df: pd.DataFrame, table_name: str) -> Dict[str, Any]:
+    async def load_dataframe_chunks(self, chunks: AsyncIterator["pd.DataFrame"], table_name: str,
+                                    mode: str = "replace", progress=None, key: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Loads a stream of DataFrames into one TEXT-typed table, see load_rows."""
         if not self.conn:
             return {"success": False, "error": "Database not connected."}
 
         try:
-            await self.conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-            columns = ", ".join([f'"{col}" TEXT' for col in df.columns])
-            await self.conn.execute(f"CREATE TABLE {table_name} ({columns})")
+            first = await anext(chunks, None)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        if first is None:
+            return {"success": True, "table": table_name}
 
-            insert_query = f"INSERT INTO {table_name} ({', '.join(df.columns)}) VALUES ({', '.join(['?' for _ in df.columns])})"
-            for _, row in df.iterrows():
-                await self.conn.execute(insert_query, tuple(row.astype(str)))
+        async def row_chunks():
+            df = first
+            while df is not None:
+                yield await asyncio.to_thread(_dataframe_rows, df)
+                df = await anext(chunks, None)
+
+        columns = [(str(col), "TEXT") for col in first.columns]
+        return await self.load_rows(table_name, columns, row_chunks(), mode=mode, progress=progress, key=key)
+
+    async def load_rows(self, table_name: str, columns: List[Tuple[str, str]], row_chunks: AsyncIterator[List[tuple]],
+                        mode: str = "replace", progress=None, key: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Loads a stream of row batches into one table inside a single transaction, so a failed or
+        cancelled load leaves the previous table untouched.
+        columns: (name, declared SQLite type) pairs.
+        mode: "replace" drops and recreates the table, "append" adds rows to it and "upsert" inserts
+        rows or, when a row with the same `key` columns exists, updates it. Both create the table if
+        needed and add incoming columns it lacks, so they cost time in the new rows only.
+        """
+        if not self.conn:
+            return {"success": False, "error": "Database not connected."}
+
+        try:
+            names = [name for name, _ in columns]
+            self._check_load_mode(mode, key, names)
+            await self._begin(load=True)
+            await self._prepare_table(table_name, columns, mode, key)
+            insert_query = _insert_query(table_name, names, key if mode == "upsert" else None)
+
+            # A replaced table is profiled as it loads; appends and upserts once committed
+            profiler = TableProfiler(table_name, names) if mode == "replace" else None
+            async for rows in row_chunks:
+                # Profiling runs on a worker thread while the connection thread inserts the chunk
+                profiling = asyncio.create_task(asyncio.to_thread(profiler.add_rows, rows)) if profiler else None
+                try:
+                    for start in range(0, len(rows), INSERT_BATCH_ROWS):
+                        batch = rows[start:start + INSERT_BATCH_ROWS]
+                        await self.conn.executemany(insert_query, batch)
+                        if progress:
+                            progress.add_rows(len(batch))
+                finally:
+                    if profiling:
+                        await profiling
 
             await self.conn.commit()
+            self.data_version += 1
+            self._keep_profile(table_name, profiler or await self._profile_table(table_name))
+            await self._sync_derived_tables([table_name], reset=mode == "replace")
+            if progress:
+                progress.table_done(table_name)
             return {"success": True, "table": table_name}
 
+        except asyncio.CancelledError:
+            await self.abort()
+            raise
+
         except Exception as e:
-            await self.conn.rollback()
+            await self.rollback()
             return {"success": False, "error": str(e)}
 
+    async def get_column_types(self, table_name: str) -> List[Tuple[str, str]]:
+        """(name, declared type) of each column of a table."""
+        # Only the main schema: the attached samples hold copies of the tables under the same names
+        async with self.conn.execute("SELECT name, type FROM pragma_table_info(?, 'main')", (table_name,)) as cursor:
+            return [(name, declared or "") for name, declared in await cursor.fetchall()]
+
+    async def iter_table_rows(self, table_name: str, chunk_rows: int = INSERT_BATCH_ROWS) -> AsyncIterator[List[tuple]]:
+        """
+        Yields a table's rows in chunks straight from a cursor, without materializing the table.
+        The cursor is held on a reader connection when there is one, so writes are not queued behind it.
+        The table is read from main explicitly: on a reader, an unqualified name can resolve to the
+        copy in the attached samples (see _main_snapshot).
+        """
+        query = f'SELECT * FROM main."{table_name}"'
+        if not self._readers:
+            async with self.conn.execute(query) as cursor:
+                while rows := await cursor.fetchmany(chunk_rows):
+                    yield [tuple(row) for row in rows]
+            return
+
+        reader, guard = await self._idle_readers.get()
+        try:
+            async with reader.execute(query) as cursor:
+                while rows := await cursor.fetchmany(chunk_rows):
+                    yield [tuple(row) for row in rows]
+        finally:
+            self._idle_readers.put_nowait((reader, guard))
+
     async def import_from_sql_file(self, file_path: str) -> Dict[str, Any]:
         """Imports SQL commands from a .sql file and executes them."""
         if not self.conn:
@@ -191,18 +1133,23 @@ class LocalSQLiteDatabase:
             with open(file_path, "r", encoding="utf-8") as f:
                 sql_script = f.read()
 
+            # executescript commits as it goes, so even a failing script may have changed data
+            self.data_version += 1
             await self.conn.executescript(sql_script)
             await self.conn.commit()
+            self._forget_profiles([sql_script])
+            await self._sync_derived_tables(reset=True)
             return {"success": True, "message": f"Executed SQL from file '{file_path}'."}
 
         except Exception as e:
-            await self.conn.rollback()
+            await self.rollback()
             return {"success": False, "error": str(e)}
 
-    async def import_from_db_file(self, file_path: str) -> Dict[str, Any]:
+    async def import_from_db_file(self, file_path: str, progress=None) -> Dict[str, Any]:
         if not self.conn:
             return {"success": False, "error": "Database not connected."}
 
+        file_conn = None
         try:
             file_conn = await aiosqlite.connect(file_path)
             file_conn.row_factory = aiosqlite.Row
@@ -211,10 +1158,13 @@ class LocalSQLiteDatabase:
                 "SELECT name FROM sqlite_master WHERE type='table' AND name != 'sqlite_sequence';"
             )
             tables = [row["name"] async for row in tables_result]
+            if progress:
+                progress.tables_total = len(tables)
 
+            profilers = []
+            await self._begin(load=True)
             for table in tables:
                 data_cursor = await file_conn.execute(f"SELECT * FROM {table};")
-                rows = await data_cursor.fetchall()
                 columns = [col[0] for col in data_cursor.description]
 
                 await self.conn.execute(f"DROP TABLE IF EXISTS {table}")
@@ -222,18 +1172,40 @@ class LocalSQLiteDatabase:
                 await self.conn.execute(f"CREATE TABLE {table} ({col_defs})")
 
                 insert_query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?' for _ in columns])})"
-                for row in rows:
-                    await self.conn.execute(insert_query, tuple(str(row[col]) for col in columns))
+                profiler = TableProfiler(table, columns)
+                profilers.append(profiler)
+                while rows := await data_cursor.fetchmany(INSERT_BATCH_ROWS):
+                    rows = [tuple(row) for row in rows]
+                    profiling = asyncio.create_task(asyncio.to_thread(profiler.add_rows, rows))
+                    try:
+                        await self.conn.executemany(insert_query, [tuple(_to_text(v) for v in row) for row in rows])
+                    finally:
+                        await profiling
+                    if progress:
+                        progress.add_rows(len(rows))
+                if progress:
+                    progress.table_done(table)
 
-            await file_conn.close()
             await self.conn.commit()
+            self.data_version += 1
+            for profiler in profilers:
+                self._keep_profile(profiler.table, profiler)
+            await self._sync_derived_tables(tables, reset=True)
 
             return {"success": True, "message": f"Imported tables: {tables}"}
 
+        except asyncio.CancelledError:
+            await self.abort()
+            raise
+
         except Exception as e:
-            await self.conn.rollback()
+            await self.rollback()
             return {"success": False, "error": str(e)}
 
+        finally:
+            if file_conn:
+                await file_conn.close()
+
     async def export_as_sql(self) -> str:
         if not self.conn:
             raise ValueError("Database not connected.")
@@ -255,19 +1227,26 @@ class LocalSQLiteDatabase:
             await self.conn.backup(dest_conn)
             await dest_conn.close()
 
-            async with open(tmp_path, "rb") as f:
-                buffer = io.BytesIO(await f.read())
+            with open(tmp_path, "rb") as f:
+                buffer = io.BytesIO(f.read())
 
             return buffer
 
         except Exception as e:
-            print(f"Error: export_to_db_binary: {e}")
+            log.exception("export_to_db_binary failed")
             return None
 
         finally:
             if tmp_path and os.path.exists(tmp_path):
                 os.remove(tmp_path)
 
+    async def index_report(self) -> Dict[str, Any]:
+        """Indexes created by the advisor and why, plus the candidates it is still counting."""
+        if self.conn:
+            async with self.conn.execute("SELECT name FROM sqlite_master WHERE type='index'") as cursor:
+                self.index_advisor.forget([name for (name,) in await cursor.fetchall()])
+        return self.index_advisor.report()
+
     async def get_table_names(self) -> List[str]:
         result = await self.list_tables()
         if result["success"]:
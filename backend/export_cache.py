@@ -0,0 +1,134 @@
+import io
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Union
+
+# Bytes of export artifacts kept per session; least recently used artifacts are dropped past it
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Artifacts up to this size stay in memory, larger ones are spooled to a temporary file
+EXPORT_CACHE_SPOOL_BYTES = int(os.getenv("EXPORT_CACHE_SPOOL_BYTES", str(1024 * 1024)))
+EXPORT_STREAM_CHUNK_BYTES = 256 * 1024
+
+
+class ExportArtifact:
+    """
+    A generated export held in a spooled temporary file. Several responses may stream it at once,
+    so reads are serialized. Whoever holds it (the request that wrote it, or one that got it from
+    the cache) has acquired it and either streams it with chunks() or calls release(); a file
+    evicted meanwhile is closed by its last holder.
+    """
+
+    def __init__(self, version: int, media_type: str, filename: Optional[str]):
+        self.version = version
+        self.media_type = media_type
+        self.filename = filename
+        self.file = tempfile.SpooledTemporaryFile(max_size=EXPORT_CACHE_SPOOL_BYTES)
+        self.size = 0
+        self.etag = ""
+        self._lock = threading.Lock()
+        self._readers = 0
+        self._evicted = False
+
+    def write(self, content: Union[bytes, str, io.IOBase]):
+        digest = hashlib.blake2b(digest_size=16)
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        if isinstance(content, bytes):
+            content = io.BytesIO(content)
+        while chunk := content.read(EXPORT_STREAM_CHUNK_BYTES):
+            digest.update(chunk)
+            self.file.write(chunk)
+            self.size += len(chunk)
+        self.etag = f'"{digest.hexdigest()}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header names this artifact's ETag."""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == self.etag for tag in tags)
+
+    def acquire(self) -> "ExportArtifact":
+        with self._lock:
+            self._readers += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._readers -= 1
+            if self._evicted and not self._readers:
+                self.file.close()
+
+    def chunks(self) -> Iterator[bytes]:
+        """Streams the content, then releases the artifact."""
+        offset = 0
+        try:
+            while offset < self.size:
+                with self._lock:
+                    self.file.seek(offset)
+                    chunk = self.file.read(EXPORT_STREAM_CHUNK_BYTES)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                yield chunk
+        finally:
+            self.release()
+
+    def evict(self):
+        with self._lock:
+            self._evicted = True
+            if not self._readers:
+                self.file.close()
+
+
+class ExportCache:
+    """
+    Export artifacts of one session, keyed by format and valid for one database data_version.
+    Artifacts larger than the whole budget are still served, but not kept.
+    """
+
+    def __init__(self, max_bytes: int = EXPORT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, ExportArtifact]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: int) -> Optional[ExportArtifact]:
+        artifact = self.entries.get(key)
+        if artifact is not None and artifact.version != version:
+            self._drop(key)
+            artifact = None
+        if artifact is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return artifact.acquire()
+
+    def put(self, key: str, artifact: ExportArtifact):
+        """Caches a written artifact when it fits in the budget. Artifacts of older versions are dropped."""
+        for stale in [k for k, cached in self.entries.items() if k == key or cached.version < artifact.version]:
+            self._drop(stale)
+        if artifact.size > self.max_bytes:
+            artifact.evict()  # not kept; closed once released
+            return
+        while self.entries and self.size_bytes + artifact.size > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+        self.entries[key] = artifact
+        self.size_bytes += artifact.size
+
+    def _drop(self, key: str):
+        artifact = self.entries.pop(key)
+        self.size_bytes -= artifact.size
+        artifact.evict()
+
+    def clear(self):
+        while self.entries:
+            self._drop(next(iter(self.entries)))
+
+    def stats(self) -> Dict[str, int]:
+        return {"artifacts": len(self.entries), "bytes": self.size_bytes, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,27 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library encoder is used without it
+    orjson = None
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Compact UTF-8 JSON. Values JSON cannot represent (blobs, dates) are encoded as strings."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    return dumps_bytes(obj).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps_bytes instead of json.dumps."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
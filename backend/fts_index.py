@@ -0,0 +1,132 @@
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+# Build full-text indexes automatically for free-text columns of loaded tables
+FTS_AUTO = os.getenv("FTS_AUTO", "1") == "1"
+FTS_MIN_ROWS = int(os.getenv("FTS_MIN_ROWS", "10000"))
+# Distinct values per row a column needs to count as free text rather than a category
+FTS_MIN_DISTINCT_RATIO = float(os.getenv("FTS_MIN_DISTINCT_RATIO", "0.2"))
+# Average words per value, measured on the table sample, a column needs to be worth indexing
+FTS_MIN_WORDS = float(os.getenv("FTS_MIN_WORDS", "3"))
+# Schema the indexes are attached as, in a shared in-memory database outside the exported data
+SEARCH_SCHEMA = "search"
+_SAMPLE_ROWS = 1000
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def fts_name(table: str) -> str:
+    return f"{table}_fts"
+
+
+def text_candidates(profile: Dict[str, Any]) -> List[str]:
+    """Text columns of a profiled table with mostly distinct values."""
+    if profile["rows"] < FTS_MIN_ROWS:
+        return []
+    return [col["column"] for col in profile["columns"]
+            if col["type"] == "text"
+            and (not col["distinct_exact"] or col["distinct"] >= FTS_MIN_DISTINCT_RATIO * profile["rows"])]
+
+
+class FullTextIndexes:
+    """
+    Contentless FTS5 indexes over text columns, one per table, named <table>_fts in SEARCH_SCHEMA.
+    Their rowids are the rowids of the table, so a search joins back with
+    `WHERE rowid IN (SELECT rowid FROM <table>_fts WHERE <table>_fts MATCH ...)`. TEMP triggers on
+    the writer connection, the only one that writes, keep them in sync with every insert, update and
+    delete; a table that was dropped and recreated lost its triggers and is indexed again by sync().
+    """
+
+    def __init__(self):
+        self.indexes: Dict[str, List[str]] = {}  # table -> indexed columns
+
+    def _triggers(self, table: str) -> List[str]:
+        return [f"fts_{table}_{event}" for event in ("insert", "delete", "update")]
+
+    def average_words(self, raw_conn: sqlite3.Connection, table: str, columns: List[str],
+                      sample_schema: Optional[str]) -> Dict[str, float]:
+        """Average words per non-null value, from the table sample when there is one."""
+        source = f"{sample_schema}.{_quote(table)}" if sample_schema else f"main.{_quote(table)}"
+        if sample_schema and not raw_conn.execute(f"SELECT 1 FROM {sample_schema}.sqlite_master WHERE name = ?",
+                                                  (table,)).fetchone():
+            source = f"main.{_quote(table)}"
+        words = {}
+        for column in columns:
+            (average,) = raw_conn.execute(
+                f"SELECT avg(length(trim(v)) - length(replace(trim(v), ' ', '')) + 1) "
+                f"FROM (SELECT {_quote(column)} AS v FROM {source} WHERE v IS NOT NULL LIMIT {_SAMPLE_ROWS})").fetchone()
+            words[column] = average or 0.0
+        return words
+
+    def build(self, raw_conn: sqlite3.Connection, table: str, columns: List[str]):
+        """Runs on the writer's connection thread: (re)creates the index of a table and its triggers."""
+        index, base = f"{SEARCH_SCHEMA}.{_quote(fts_name(table))}", f"main.{_quote(table)}"
+        quoted = ", ".join(_quote(column) for column in columns)
+        new = ", ".join(f"new.{_quote(column)}" for column in columns)
+        old = ", ".join(f"old.{_quote(column)}" for column in columns)
+        # Trigger bodies may not qualify table names; the index name resolves to SEARCH_SCHEMA
+        unqualified = _quote(fts_name(table))
+        insert_new = f"INSERT INTO {unqualified}(rowid, {quoted}) VALUES (new.rowid, {new});"
+        delete_old = f"INSERT INTO {unqualified}({unqualified}, rowid, {quoted}) VALUES ('delete', old.rowid, {old});"
+        on_insert, on_delete, on_update = self._triggers(table)
+
+        raw_conn.execute("BEGIN")
+        try:
+            self._drop(raw_conn, table)
+            raw_conn.execute(f"CREATE VIRTUAL TABLE {index} USING fts5({quoted}, content='')")
+            raw_conn.execute(f"INSERT INTO {index}(rowid, {quoted}) SELECT rowid, {quoted} FROM {base}")
+            raw_conn.execute(f"CREATE TEMP TRIGGER {_quote(on_insert)} AFTER INSERT ON {base} BEGIN {insert_new} END")
+            raw_conn.execute(f"CREATE TEMP TRIGGER {_quote(on_delete)} AFTER DELETE ON {base} BEGIN {delete_old} END")
+            raw_conn.execute(f"CREATE TEMP TRIGGER {_quote(on_update)} AFTER UPDATE OF {quoted} ON {base} "
+                             f"BEGIN {delete_old} {insert_new} END")
+            raw_conn.commit()
+        except BaseException:
+            raw_conn.rollback()
+            raise
+        self.indexes[table] = list(columns)
+
+    def _drop(self, raw_conn: sqlite3.Connection, table: str):
+        for trigger in self._triggers(table):
+            raw_conn.execute(f"DROP TRIGGER IF EXISTS temp.{_quote(trigger)}")
+        raw_conn.execute(f"DROP TABLE IF EXISTS {SEARCH_SCHEMA}.{_quote(fts_name(table))}")
+
+    def drop(self, raw_conn: sqlite3.Connection, table: str):
+        """Runs on the writer's connection thread."""
+        self._drop(raw_conn, table)
+        self.indexes.pop(table, None)
+
+    def sync(self, raw_conn: sqlite3.Connection):
+        """
+        Runs on the writer's connection thread after writes: drops the indexes of tables that are
+        gone or lost an indexed column, and rebuilds those of tables that were recreated.
+        """
+        for table, columns in list(self.indexes.items()):
+            present = {row[1] for row in raw_conn.execute("SELECT * FROM main.pragma_table_info(?)", (table,))}
+            if not all(column in present for column in columns):
+                self.drop(raw_conn, table)
+                continue
+            triggers = raw_conn.execute(
+                "SELECT count(*) FROM temp.sqlite_master WHERE type = 'trigger' AND tbl_name = ? AND name IN (?, ?, ?)",
+                (table, *self._triggers(table))).fetchone()[0]
+            if triggers < 3:
+                self.build(raw_conn, table, columns)
+
+    def report(self) -> List[Dict[str, Any]]:
+        return [{"table": table, "index": fts_name(table), "columns": columns} for table, columns in self.indexes.items()]
+
+    def prompt(self, tables: Optional[List[str]] = None) -> str:
+        """Description of the indexes, of the given tables when not None, for the agent prompt."""
+        indexes = {table: columns for table, columns in self.indexes.items() if tables is None or table in tables}
+        if not indexes:
+            return ""
+        lines = [f"- {fts_name(table)}({', '.join(columns)}) indexes {table}" for table, columns in indexes.items()]
+        example_table = next(iter(indexes))
+        example = (f"SELECT * FROM {example_table} WHERE rowid IN "
+                   f"(SELECT rowid FROM {fts_name(example_table)} WHERE {fts_name(example_table)} MATCH 'refund')")
+        return ("Full-text indexes. For keyword searches in these columns use MATCH instead of LIKE '%word%', e.g.\n"
+                f"{example}\n"
+                "MATCH takes words, \"exact phrases\", prefix*, column:word, AND/OR/NOT. The indexes hold no text: "
+                "always join back to the table by rowid as above.\n" + "\n".join(lines))
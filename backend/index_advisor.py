@@ -0,0 +1,183 @@
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+INDEX_MIN_HITS = int(os.getenv("INDEX_ADVISOR_MIN_HITS", "3"))
+INDEX_MIN_ROWS = int(os.getenv("INDEX_ADVISOR_MIN_ROWS", "1000"))
+INDEX_BUDGET_BYTES = int(os.getenv("INDEX_ADVISOR_BUDGET_BYTES", str(32 * 1024 * 1024)))
+
+INDEX_PREFIX = "auto_idx_"
+
+# An SQL identifier, bare or quoted with "", `` or []; shared with query_cost
+IDENTIFIER = r'(?:"[^"]+"|`[^`]+`|\[[^\]]+\]|\w+)'
+_NOT_ALIASES = ("SELECT|WHERE|ON|USING|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|NATURAL|OUTER|GROUP|ORDER|LIMIT|HAVING|"
+                "UNION|EXCEPT|INTERSECT|WINDOW")
+_SOURCE_ITEM = rf'({IDENTIFIER})(?:\s+(?:AS\s+)?(?!(?:{_NOT_ALIASES})\b)({IDENTIFIER}))?'
+_SOURCE = re.compile(rf'\b(?:FROM|JOIN)\s+{_SOURCE_ITEM}', re.IGNORECASE)
+# Further sources of a comma join: FROM a x, b y
+_COMMA_SOURCE = re.compile(rf'\s*,\s*{_SOURCE_ITEM}', re.IGNORECASE)
+_COLUMN = rf'(?:({IDENTIFIER})\s*\.\s*)?({IDENTIFIER})'
+# a.x = b.y: served by the automatic index SQLite reports for the inner table of the join
+_JOIN_EQUALITY = re.compile(rf'{IDENTIFIER}\s*\.\s*{IDENTIFIER}\s*==?\s*{IDENTIFIER}\s*\.\s*{IDENTIFIER}')
+_PREDICATE_LEFT = re.compile(rf'{_COLUMN}\s*(?:=|==|<>|!=|<=|>=|<|>|\bIN\b|\bBETWEEN\b|\bIS\b)', re.IGNORECASE)
+_PREDICATE_RIGHT = re.compile(rf'(?:=|==|<=|>=|<|>)\s*{_COLUMN}', re.IGNORECASE)
+_GROUP_BY = re.compile(r'\bGROUP\s+BY\b(.+?)(?=\bHAVING\b|\bORDER\b|\bLIMIT\b|\bWINDOW\b|\)|;|$)', re.IGNORECASE | re.DOTALL)
+_SCAN = re.compile(rf'^SCAN ({IDENTIFIER})(?: USING|$)')
+_AUTOMATIC = re.compile(rf'^SEARCH ({IDENTIFIER}) USING AUTOMATIC (?:PARTIAL )?COVERING INDEX \((.+)\)')
+
+
+def unquote(name: str) -> str:
+    """Identifier matched by IDENTIFIER without its quotes."""
+    if name[:1] in ('"', "`", "["):
+        return name[1:-1]
+    return name
+
+
+def table_aliases(statement: str) -> Dict[str, str]:
+    """Maps every name a FROM/JOIN source (or comma-joined source) is referred to by, alias or table name, to the table name."""
+    aliases = {}
+    for match in _SOURCE.finditer(statement):
+        while match:
+            table = unquote(match.group(1))
+            aliases[table] = table
+            if match.group(2):
+                aliases[unquote(match.group(2))] = table
+            match = _COMMA_SOURCE.match(statement, match.end())
+    return aliases
+
+
+def referenced_columns(statement: str) -> List[Tuple[Optional[str], str]]:
+    """(qualifier, column) pairs used in comparisons and GROUP BY lists, except equi-join conditions."""
+    refs = []
+    predicates = _JOIN_EQUALITY.sub(" ", statement)
+    for pattern in (_PREDICATE_LEFT, _PREDICATE_RIGHT):
+        for match in pattern.finditer(predicates):
+            qualifier = match.group(1)
+            refs.append((unquote(qualifier) if qualifier else None, unquote(match.group(2))))
+    for match in _GROUP_BY.finditer(statement):
+        for term in match.group(1).split(","):
+            column = re.fullmatch(rf'\s*{_COLUMN}\s*', term)
+            if column:
+                qualifier = column.group(1)
+                refs.append((unquote(qualifier) if qualifier else None, unquote(column.group(2))))
+    return refs
+
+
+def plan_candidates(plan: Iterable[str], statement: str,
+                    table_columns: Dict[str, List[str]]) -> List[Tuple[str, Tuple[str, ...], str]]:
+    """
+    Index candidates for one SELECT from its EXPLAIN QUERY PLAN details, as (table, columns, reason).
+    A full scan of a table yields one single-column candidate per column the statement filters or
+    groups that table by; an automatic index SQLite builds for a join yields that index's columns.
+    table_columns: columns of the user tables the statement may read.
+    """
+    aliases = table_aliases(statement)
+    refs = None
+    candidates = []
+    for detail in plan:
+        match = _AUTOMATIC.match(detail)
+        if match:
+            table = aliases.get(unquote(match.group(1)))
+            columns = tuple(term.split("=")[0].strip() for term in match.group(2).split(" AND "))
+            if table in table_columns and all(col in table_columns[table] for col in columns):
+                candidates.append((table, columns, "automatic index for join"))
+            continue
+
+        match = _SCAN.match(detail)
+        if not match:
+            continue
+        name = unquote(match.group(1))
+        table = aliases.get(name)
+        if table not in table_columns:
+            continue
+        if refs is None:
+            refs = referenced_columns(statement)
+        seen = set()
+        for qualifier, column in refs:
+            if qualifier and qualifier != name and aliases.get(qualifier) != table:
+                continue
+            if column in table_columns[table] and column not in seen:
+                seen.add(column)
+                candidates.append((table, (column,), "full scan filtered or grouped by column"))
+    return candidates
+
+
+def index_name(table: str, columns: Tuple[str, ...]) -> str:
+    return INDEX_PREFIX + re.sub(r'\W', '_', "_".join((table,) + columns))
+
+
+class IndexAdvisor:
+    """
+    Per-session workload statistics deciding which indexes to create. Candidates seen in at least
+    `min_hits` queries are due; created indexes must fit in `budget_bytes` together (0 disables the
+    advisor).
+    """
+
+    def __init__(self, min_hits: int = INDEX_MIN_HITS, min_rows: int = INDEX_MIN_ROWS,
+                 budget_bytes: int = INDEX_BUDGET_BYTES):
+        self.min_hits = min_hits
+        self.min_rows = min_rows
+        self.budget_bytes = budget_bytes
+        self.hits: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+        self.created: Dict[str, Dict[str, Any]] = {}
+        self.rejected: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    @property
+    def bytes_used(self) -> int:
+        return sum(index["bytes"] for index in self.created.values())
+
+    def record(self, candidates: List[Tuple[str, Tuple[str, ...], str]]) -> List[Tuple[str, Tuple[str, ...], str]]:
+        """Counts the candidates of one query and returns those that just became due."""
+        due = []
+        for table, columns, reason in dict.fromkeys(candidates):
+            key = (table, columns)
+            if key in self.rejected:
+                continue
+            self.hits[key] = self.hits.get(key, 0) + 1
+            if self.hits[key] >= self.min_hits:
+                due.append((table, columns, reason))
+        return due
+
+    def add(self, table: str, columns: Tuple[str, ...], reason: str, size: int):
+        self.created[index_name(table, columns)] = {
+            "index": index_name(table, columns),
+            "table": table,
+            "columns": list(columns),
+            "reason": reason,
+            "queries": self.hits.get((table, columns), 0),
+            "bytes": size,
+            "created_at": time.time(),
+        }
+
+    def reject(self, table: str, columns: Tuple[str, ...], why: str):
+        self.rejected[(table, columns)] = why
+
+    def forget(self, existing: Iterable[str]):
+        """Drops created indexes that no longer exist (their table was dropped or replaced)."""
+        existing = set(existing)
+        for name in [name for name in self.created if name not in existing]:
+            index = self.created.pop(name)
+            self.hits.pop((index["table"], tuple(index["columns"])), None)
+
+    def reset(self):
+        self.hits.clear()
+        self.created.clear()
+        self.rejected.clear()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "budget_bytes": self.budget_bytes,
+            "bytes_used": self.bytes_used,
+            "indexes": list(self.created.values()),
+            "rejected": [{"table": table, "columns": list(columns), "reason": why}
+                         for (table, columns), why in self.rejected.items()],
+            "candidates": [{"table": table, "columns": list(columns), "queries": hits}
+                           for (table, columns), hits in sorted(self.hits.items(), key=lambda item: -item[1])
+                           if index_name(table, columns) not in self.created],
+        }
@@ -0,0 +1,331 @@
+import os
+import queue
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+from db_sqlite import LocalSQLiteDatabase
+from json_stream import NDJSON_EXTENSIONS, JSONBatchReader
+from arrow_io import ARROW_EXTENSIONS, open_arrow_file, arrow_import_columns, batch_rows
+
+CSV_CHUNK_ROWS = int(os.getenv("INGEST_CSV_CHUNK_ROWS", "50000"))
+EXCEL_CHUNK_ROWS = int(os.getenv("INGEST_EXCEL_CHUNK_ROWS", "20000"))
+EXCEL_PROCESSES = int(os.getenv("INGEST_EXCEL_PROCESSES", str(min(4, os.cpu_count() or 1))))
+# Parsed chunks buffered per sheet while earlier sheets are still being inserted
+EXCEL_QUEUE_CHUNKS = 4
+
+# Parsing runs here rather than in the default executor, so large uploads cannot starve LLM calls
+ingest_executor = ThreadPoolExecutor(max_workers=int(os.getenv("INGEST_WORKERS", "2")), thread_name_prefix="ingest")
+
+SUPPORTED_EXTENSIONS = (".json", ".csv", ".xlsx", ".xls", ".db") + NDJSON_EXTENSIONS + ARROW_EXTENSIONS
+
+_DONE = object()
+
+_excel_pool: Optional[ProcessPoolExecutor] = None
+_excel_manager = None
+
+
+class UnsupportedFormatError(ValueError):
+    pass
+
+
+class IngestProgress:
+    """Counters updated while a file is parsed and loaded, read by the job status endpoint."""
+
+    def __init__(self, bytes_total: int = 0):
+        self.bytes_total = bytes_total
+        self.bytes_read = 0
+        self.rows_inserted = 0
+        self.tables_total: Optional[int] = None
+        self.tables_done: list[str] = []
+
+    def add_rows(self, count: int):
+        self.rows_inserted += count
+
+    def table_done(self, table: str):
+        self.tables_done.append(table)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bytes_total": self.bytes_total,
+            "bytes_read": self.bytes_read,
+            "rows_inserted": self.rows_inserted,
+            "tables_total": self.tables_total,
+            "tables_done": list(self.tables_done),
+        }
+
+
+async def run_in_ingest_executor(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(ingest_executor, fn, *args)
+
+
+async def iterate_in_executor(iterator):
+    """Pulls items from a blocking iterator on the ingest pool without blocking the event loop."""
+    while True:
+        item = await run_in_ingest_executor(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+def table_name_for(filename: str) -> str:
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+async def _ingest_json(db: LocalSQLiteDatabase, path: str, filename: str, progress: IngestProgress,
+                       mode: str, key: Optional[List[str]]) -> Dict[str, Any]:
+    """JSON / NDJSON: parsed incrementally, one batch of rows in memory at a time."""
+    with open(path, "rb") as f:
+        reader = JSONBatchReader(f, table_name_for(filename), ndjson=filename.lower().endswith(NDJSON_EXTENSIONS))
+
+        async def batches():
+            async for batch in iterate_in_executor(iter(reader)):
+                progress.bytes_read = reader.bytes_read
+                yield batch
+
+        return await db.load_json_batches(batches(), progress=progress, mode=mode, key=key)
+
+
+async def _ingest_csv(db: LocalSQLiteDatabase, path: str, filename: str, progress: IngestProgress,
+                      mode: str, key: Optional[List[str]]) -> Dict[str, Any]:
+    import pandas as pd
+    progress.tables_total = 1
+    with open(path, "rb") as f:
+        # Every value is read as text, as the table stores it: inferring types per chunk would turn
+        # the integers of a chunk with a missing value into floats ('8.0') and not those of the others
+        reader = pd.read_csv(f, chunksize=CSV_CHUNK_ROWS, dtype=str)
+
+        async def chunks():
+            async for chunk in iterate_in_executor(reader):
+                progress.bytes_read = f.tell()
+                yield chunk
+
+        result = await db.load_dataframe_chunks(chunks(), table_name_for(filename), mode=mode, progress=progress, key=key)
+    return {
+        "success": result["success"],
+        "loaded_tables": [result["table"]] if result["success"] else [],
+        "errors": result.get("error") if not result["success"] else None
+    }
+
+
+def _excel_resources():
+    """Process pool and queue manager for Excel parsing, started on first use."""
+    global _excel_pool, _excel_manager
+    if _excel_pool is None:
+        # spawn, not fork: the server process runs SQLite and executor threads
+        context = multiprocessing.get_context("spawn")
+        _excel_manager = context.Manager()
+        _excel_pool = ProcessPoolExecutor(max_workers=EXCEL_PROCESSES, mp_context=context)
+    return _excel_pool, _excel_manager
+
+
+def shutdown_pools():
+    global _excel_pool, _excel_manager
+    if _excel_pool is not None:
+        _excel_pool.shutdown(wait=False, cancel_futures=True)
+        _excel_manager.shutdown()
+        _excel_pool = _excel_manager = None
+
+
+def _column_names(header: tuple) -> list[str]:
+    """Mirrors pandas: blank headers become 'Unnamed: i' and duplicates get a '.n' suffix."""
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _stream_sheet(path: str, sheet: str, out_queue, stop_event, chunk_rows: int):
+    """
+    Runs in a worker process: reads one sheet with openpyxl's read-only streaming reader and sends
+    ("header", names), ("rows", [tuple, ...])..., then ("done", None) or ("error", message).
+    """
+    import openpyxl
+
+    def put(item) -> bool:
+        while not stop_event.is_set():
+            try:
+                out_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    workbook = None
+    try:
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        rows = workbook[sheet].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not put(("header", _column_names(header or ()))):
+            return
+        width = len(header or ())
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(batch) >= chunk_rows:
+                if not put(("rows", batch)):
+                    return
+                batch = []
+        if batch and not put(("rows", batch)):
+            return
+        put(("done", None))
+    except Exception as e:
+        put(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        if workbook is not None:
+            workbook.close()
+
+
+async def _sheet_chunks(sheet_queue, sheet: str):
+    import pandas as pd
+    columns = None
+    while True:
+        kind, payload = await run_in_ingest_executor(sheet_queue.get)
+        if kind == "header":
+            columns = payload
+        elif kind == "rows":
+            yield await run_in_ingest_executor(lambda: pd.DataFrame.from_records(payload, columns=columns))
+        elif kind == "error":
+            raise ValueError(f"Sheet '{sheet}': {payload}")
+        else:
+            if columns is None:
+                return
+            if not columns:
+                raise ValueError(f"Sheet '{sheet}' is empty")
+            # Header-only sheets still produce an (empty) table
+            yield pd.DataFrame(columns=columns)
+            return
+
+
+def _excel_load_result(results: list) -> Dict[str, Any]:
+    return {
+        "success": all(r["success"] for r in results),
+        "loaded_tables": [r["table"] for r in results if r["success"]],
+        "errors": [r.get("error") for r in results if not r["success"]],
+    }
+
+
+async def _ingest_legacy_excel(db: LocalSQLiteDatabase, path: str, progress: IngestProgress,
+                               mode: str, key: Optional[List[str]]) -> Dict[str, Any]:
+    # .xls is not readable by openpyxl's streaming reader; parse it whole off the event loop
+    import pandas as pd
+    excel_data = await run_in_ingest_executor(lambda: pd.read_excel(path, sheet_name=None))
+    progress.bytes_read = progress.bytes_total
+    progress.tables_total = len(excel_data)
+    return _excel_load_result([await db.load_dataframe(df, table_name=sheet, mode=mode, progress=progress, key=key)
+                               for sheet, df in excel_data.items()])
+
+
+async def _ingest_excel(db: LocalSQLiteDatabase, path: str, filename: str, progress: IngestProgress,
+                        mode: str, key: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    Parses every sheet in parallel worker processes and inserts each sheet's rows as they arrive.
+    Sheets are loaded one after another on the user's connection; the other sheets keep parsing
+    into small bounded queues meanwhile.
+    """
+    if filename.lower().endswith(".xls"):
+        return await _ingest_legacy_excel(db, path, progress, mode, key)
+
+    def sheet_names():
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            return workbook.sheetnames
+        finally:
+            workbook.close()
+
+    def start_workers():
+        # Starting processes and creating manager proxies blocks, so it stays off the event loop
+        pool, manager = _excel_resources()
+        stop_event = manager.Event()
+        queues = {sheet: manager.Queue(maxsize=EXCEL_QUEUE_CHUNKS) for sheet in sheets}
+        futures = [pool.submit(_stream_sheet, path, sheet, queues[sheet], stop_event, EXCEL_CHUNK_ROWS)
+                   for sheet in sheets]
+        return stop_event, queues, futures
+
+    sheets = await run_in_ingest_executor(sheet_names)
+    progress.tables_total = len(sheets)
+    stop_event, queues, futures = await run_in_ingest_executor(start_workers)
+    workers = [asyncio.wrap_future(future) for future in futures]
+
+    results = []
+    try:
+        for i, sheet in enumerate(sheets):
+            results.append(await db.load_dataframe_chunks(_sheet_chunks(queues[sheet], sheet), sheet,
+                                                          mode=mode, progress=progress, key=key))
+            progress.bytes_read = progress.bytes_total * (i + 1) // len(sheets)
+    finally:
+        # Unblocks workers still waiting on a full queue after a failure or cancellation
+        await run_in_ingest_executor(stop_event.set)
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    return _excel_load_result(results)
+
+
+async def _ingest_arrow(db: LocalSQLiteDatabase, path: str, filename: str, progress: IngestProgress,
+                        mode: str, key: Optional[List[str]]) -> Dict[str, Any]:
+    """Parquet / Arrow IPC: record batches (Parquet row groups) go straight into typed SQLite columns."""
+    schema, batches, total_rows = await run_in_ingest_executor(open_arrow_file, path, filename)
+    progress.tables_total = 1
+
+    async def row_chunks():
+        rows_read = 0
+        async for batch in iterate_in_executor(batches):
+            rows = await run_in_ingest_executor(batch_rows, batch)
+            rows_read += len(rows)
+            if total_rows:
+                progress.bytes_read = progress.bytes_total * rows_read // total_rows
+            yield rows
+        progress.bytes_read = progress.bytes_total
+
+    result = await db.load_rows(table_name_for(filename), arrow_import_columns(schema), row_chunks(),
+                                mode=mode, progress=progress, key=key)
+    return {
+        "success": result["success"],
+        "loaded_tables": [result["table"]] if result["success"] else [],
+        "errors": result.get("error") if not result["success"] else None
+    }
+
+
+async def _ingest_db(db: LocalSQLiteDatabase, path: str, progress: IngestProgress) -> Dict[str, Any]:
+    result = await db.import_from_db_file(path, progress=progress)
+    progress.bytes_read = progress.bytes_total
+    return {
+        "success": result["success"],
+        "loaded_tables": await db.get_table_names(),
+        "errors": result.get("error"),
+    }
+
+
+async def ingest_file(db: LocalSQLiteDatabase, path: str, filename: str,
+                      progress: Optional[IngestProgress] = None, mode: str = "replace",
+                      key: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Parses an uploaded file saved at `path` and loads it into the user's database.
+    mode and key (see db_sqlite.LOAD_MODES) apply to every table of the file except for .db files,
+    which always replace the tables they contain.
+    Returns {"success", "loaded_tables", "errors"}; raises UnsupportedFormatError for unknown types.
+    """
+    progress = progress or IngestProgress(os.path.getsize(path))
+    lower = filename.lower()
+
+    if lower.endswith((".json",) + NDJSON_EXTENSIONS):
+        return await _ingest_json(db, path, filename, progress, mode, key)
+    if lower.endswith(".csv"):
+        return await _ingest_csv(db, path, filename, progress, mode, key)
+    if lower.endswith((".xlsx", ".xls")):
+        return await _ingest_excel(db, path, filename, progress, mode, key)
+    if lower.endswith(".db"):
+        return await _ingest_db(db, path, progress)
+    if lower.endswith(ARROW_EXTENSIONS):
+        return await _ingest_arrow(db, path, filename, progress, mode, key)
+    raise UnsupportedFormatError("Unsupported file format")
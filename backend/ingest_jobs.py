@@ -0,0 +1,131 @@
+import os
+import time
+import uuid
+import asyncio
+import weakref
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from db_sqlite import LocalSQLiteDatabase
+from ingest import IngestProgress, ingest_file
+from app_logging import get_logger
+
+log = get_logger("ingest")
+
+
+class IngestJob:
+    def __init__(self, user_id: str, filename: str, path: str, size: int, mode: str = "replace",
+                 key: Optional[List[str]] = None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.filename = filename
+        self.path = path
+        self.mode = mode
+        self.key = key
+        self.status = "queued"  # queued -> running -> completed | failed | cancelled
+        self.progress = IngestProgress(size)
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "mode": self.mode,
+            "status": self.status,
+            "progress": self.progress.to_dict(),
+            "loaded_tables": (self.result or {}).get("loaded_tables", []),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestJobManager:
+    """
+    Runs uploads in the background with at most `max_running` jobs loading at once.
+    Jobs (and synchronous uploads) for the same database are serialized by a per-database lock.
+    """
+
+    def __init__(self, max_running: int = 2, max_finished: int = 200):
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self.max_finished = max_finished
+        self._slots = asyncio.Semaphore(max_running)
+        self._db_locks: "weakref.WeakKeyDictionary[LocalSQLiteDatabase, asyncio.Lock]" = weakref.WeakKeyDictionary()
+        # Unfinished jobs per database, see busy
+        self._active: "weakref.WeakKeyDictionary[LocalSQLiteDatabase, int]" = weakref.WeakKeyDictionary()
+
+    def lock_for(self, db: LocalSQLiteDatabase) -> asyncio.Lock:
+        if db not in self._db_locks:
+            self._db_locks[db] = asyncio.Lock()
+        return self._db_locks[db]
+
+    def busy(self, db: LocalSQLiteDatabase) -> bool:
+        """Whether an upload is queued for or loading into the database, which must stay open until it ends."""
+        lock = self._db_locks.get(db)
+        return self._active.get(db, 0) > 0 or (lock is not None and lock.locked())
+
+    def submit(self, user_id: str, db: LocalSQLiteDatabase, path: str, filename: str, mode: str = "replace",
+               key: Optional[List[str]] = None) -> IngestJob:
+        job = IngestJob(user_id, filename, path, os.path.getsize(path), mode, key)
+        self.jobs[job.id] = job
+        self._active[db] = self._active.get(db, 0) + 1
+        job.task = asyncio.create_task(self._run(job, db))
+        # A callback rather than _run's finally, which never runs for a task cancelled before it starts
+        job.task.add_done_callback(lambda _: self._done(db))
+        self._trim()
+        return job
+
+    def get(self, job_id: str, user_id: str) -> Optional[IngestJob]:
+        job = self.jobs.get(job_id)
+        return job if job and job.user_id == user_id else None
+
+    def cancel(self, job_id: str, user_id: str) -> Optional[IngestJob]:
+        job = self.get(job_id, user_id)
+        if job and not job.finished and job.task:
+            job.task.cancel()
+        return job
+
+    def _done(self, db: LocalSQLiteDatabase):
+        self._active[db] -= 1
+
+    async def _run(self, job: IngestJob, db: LocalSQLiteDatabase):
+        try:
+            async with self._slots, self.lock_for(db):
+                job.status = "running"
+                job.result = await ingest_file(db, job.path, job.filename, job.progress, job.mode, job.key)
+            if job.result["success"]:
+                job.status = "completed"
+            else:
+                job.status = "failed"
+                job.error = str(job.result.get("errors") or job.result.get("error") or "Unknown error")
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            log.info("upload job finished", extra={"fields": {
+                "job_id": job.id, "status": job.status, "seconds": round(job.finished_at - job.created_at, 3),
+                "rows": job.progress.rows_inserted, "error": job.error}})
+            if os.path.exists(job.path):
+                os.remove(job.path)
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self.jobs[job_id]
+
+
+job_manager = IngestJobManager(
+    max_running=int(os.getenv("INGEST_MAX_JOBS", "2")),
+    max_finished=int(os.getenv("INGEST_JOB_HISTORY", "200")),
+)
@@ -0,0 +1,194 @@
+import os
+import json
+import codecs
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+JSON_READ_BYTES = int(os.getenv("INGEST_JSON_READ_BYTES", str(1024 * 1024)))
+JSON_BATCH_ROWS = int(os.getenv("INGEST_JSON_BATCH_ROWS", "5000"))
+
+NDJSON_EXTENSIONS = (".jsonl", ".ndjson")
+
+_WHITESPACE = " \t\r\n"
+# Characters before the end of the buffer within which a parse error may be a value cut short ("tru", "\\u00")
+_TRUNCATED_TAIL = 8
+
+
+class JSONBatchReader:
+    """
+    Incremental reader for the JSON shapes ByeDB accepts, holding at most one read buffer and one
+    batch of rows in memory:
+
+    - {"table": [row, ...], ...}  (the format produced by the JSON export)
+    - [row, ...]                  (rows of a single table named after the file)
+    - NDJSON, one row per line    (.jsonl / .ndjson)
+
+    Iterating yields (table, rows) with up to `batch_rows` row dicts; batches of the same table are
+    consecutive. A table whose value is not a list is yielded once as (table, None), an empty list
+    as (table, []).
+    """
+
+    def __init__(self, f: BinaryIO, default_table: str, ndjson: bool = False, batch_rows: int = JSON_BATCH_ROWS):
+        self.f = f
+        self.default_table = default_table
+        self.ndjson = ndjson
+        self.batch_rows = batch_rows
+        self.bytes_read = 0
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    # ---- buffer ----
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self.f.read(JSON_READ_BYTES)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self._eof = True
+            self._buf = self._buf[self._pos:] + self._text.decode(b"", final=True)
+        else:
+            self._buf = self._buf[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character without consuming it, or "" at the end of the file."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            self._error(f"Expecting '{char}'")
+        self._pos += 1
+
+    def _error(self, message: str):
+        raise json.JSONDecodeError(message, self._buf, self._pos)
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                # Only a value cut off by the end of the buffer may parse with more input; anything
+                # else is malformed, and reading on would hold the rest of the file in the buffer
+                if self._truncated(e) and self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _truncated(self, error: json.JSONDecodeError) -> bool:
+        return error.msg.startswith("Unterminated string") or len(self._buf) - error.pos < _TRUNCATED_TAIL
+
+    # ---- structure ----
+
+    def _rows(self, table: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Elements of the array at the current position, in batches."""
+        self._expect("[")
+        batch: List[Dict[str, Any]] = []
+        empty = True
+        if self._peek() == "]":
+            self._pos += 1
+        else:
+            while True:
+                batch.append(self._row(table, self._value()))
+                empty = False
+                if len(batch) >= self.batch_rows:
+                    yield table, batch
+                    batch = []
+                char = self._peek()
+                self._pos += 1
+                if char == "]":
+                    break
+                if char != ",":
+                    self._pos -= 1
+                    self._error("Expecting ',' delimiter")
+        if batch or empty:
+            yield table, batch
+
+    @staticmethod
+    def _row(table: str, value: Any) -> Dict[str, Any]:
+        if not isinstance(value, dict):
+            raise ValueError(f"Rows of table '{table}' must be JSON objects")
+        return value
+
+    def _tables(self) -> Iterator[Tuple[str, Optional[List[Dict[str, Any]]]]]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            table = self._value()
+            if not isinstance(table, str):
+                self._error("Expecting table name")
+            self._expect(":")
+            if self._peek() == "[":
+                yield from self._rows(table)
+            else:
+                self._value()
+                yield table, None
+            char = self._peek()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                self._pos -= 1
+                self._error("Expecting ',' delimiter")
+
+    def _lines(self) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        batch: List[Dict[str, Any]] = []
+        while self._peek():
+            batch.append(self._row(self.default_table, self._value()))
+            if len(batch) >= self.batch_rows:
+                yield self.default_table, batch
+                batch = []
+        if batch:
+            yield self.default_table, batch
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[List[Dict[str, Any]]]]]:
+        if self.ndjson:
+            yield from self._lines()
+            return
+        first = self._peek()
+        if first == "{":
+            yield from self._tables()
+        elif first == "[":
+            yield from self._rows(self.default_table)
+        else:
+            self._error("Expecting an object of tables or an array of rows")
+        if self._peek():
+            self._error("Extra data")
+
+
+def infer_sqlite_type(values) -> str:
+    """Declared type for a column from sample values: INTEGER, REAL, or TEXT for anything else."""
+    column_type = None
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, (bool, int)):
+            column_type = column_type or "INTEGER"
+        elif isinstance(value, float):
+            column_type = "REAL"
+        else:
+            return "TEXT"
+    return column_type or "TEXT"
+
+
+def record_value(value: Any) -> Any:
+    """Nested objects and arrays are stored as JSON text."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
@@ -1,14 +1,17 @@
 import os
+import json
+import time
+import random
 import asyncio
 
-from openai import OpenAI
-from openai import RateLimitError as OpenAIRateLimit, AuthenticationError as OpenAIAuth, APIError
-import google.generativeai as genai
-from google.api_core.exceptions import PermissionDenied as GooglePermissionDenied, ResourceExhausted, GoogleAPIError
 from dotenv import load_dotenv
 
+from app_logging import get_logger
+
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+log = get_logger("llm")
+
 class LLMUsage:
     def __init__(self, token_prompt: int, token_total: int):
         self.token_prompt = token_prompt
@@ -28,11 +31,18 @@ class LLMResponse:
 class LLMBase:
     def __init__(self, api_key: str):
         self.total_token_used = 0
+        self.in_flight = 0
         self.api_key = api_key
 
     def get_weight(self) -> float:
         return 1.0
 
+    def warm_up(self):
+        """Imports the provider SDK and builds its client ahead of the first request."""
+
+    def describe_error(self, e: Exception) -> str:
+        return str(e)
+
     def _generate_response(self, prompt: str) -> LLMResponse:
         raise NotImplementedError("Unimplemented generate_response")
 
@@ -49,15 +59,31 @@ class LLMBase:
 class LLMOpenAI(LLMBase):
     def __init__(self, api_key):
         super().__init__(api_key)
-        self.client = OpenAI(
-            base_url=os.getenv("OPENAI_BASE_URL", "https://models.github.ai/inference"),
-            api_key=api_key
-        )
+        self.client = None
 
     def get_weight(self) -> float:
         return 10.0  # GPT is expensive
 
+    def warm_up(self):
+        if self.client is None:
+            from openai import OpenAI
+            self.client = OpenAI(
+                base_url=os.getenv("OPENAI_BASE_URL", "https://models.github.ai/inference"),
+                api_key=self.api_key
+            )
+
+    def describe_error(self, e: Exception) -> str:
+        from openai import RateLimitError, AuthenticationError, APIError
+        if isinstance(e, RateLimitError):
+            return f"Rate limit reached: {e}"
+        if isinstance(e, AuthenticationError):
+            return f"API access denied: {e}"
+        if isinstance(e, APIError):
+            return f"API Error: {e}"
+        return str(e)
+
     def _generate_response(self, prompt: str) -> LLMResponse:
+        self.warm_up()
         response = self.client.chat.completions.create(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}]
@@ -73,13 +99,29 @@ class LLMOpenAI(LLMBase):
 class LLMGemini(LLMBase):
     def __init__(self, api_key):
         super().__init__(api_key)
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model = None
 
     def get_weight(self) -> float:
         return 1.0
 
+    def warm_up(self):
+        if self.model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self.model = genai.GenerativeModel('gemini-2.5-flash')
+
+    def describe_error(self, e: Exception) -> str:
+        from google.api_core.exceptions import PermissionDenied, ResourceExhausted, GoogleAPIError
+        if isinstance(e, ResourceExhausted):
+            return f"Rate limit reached: {e}"
+        if isinstance(e, PermissionDenied):
+            return f"API access denied: {e}"
+        if isinstance(e, GoogleAPIError):
+            return f"API Error: {e}"
+        return str(e)
+
     def _generate_response(self, prompt: str) -> LLMResponse:
+        self.warm_up()
         response = self.model.generate_content(prompt)
         return LLMResponse(
             response.text,
@@ -89,10 +131,111 @@ class LLMGemini(LLMBase):
             )
         )
 
+class LLMReplay(LLMBase):
+    """
+    Deterministic stand-in for a real provider, used for offline benchmarks and load tests.
+
+    Responses are looked up by the current question in the prompt and by how many function calls
+    the agent has already made for it, so replay stays deterministic under concurrent sessions.
+    Simulated latency is spent in a worker thread, like the blocking SDK calls of real providers.
+    """
+
+    QUESTION_MARKER = "Current question: "
+    FUNCTION_MARKER = "\nFunction call: "
+    FALLBACK_RESPONSE = "I have no recorded answer for this question."
+
+    def __init__(self, transcript_path: str = "", latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        super().__init__("replay")
+        self.transcript_path = transcript_path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self.transcripts: dict[str, list[dict]] = {}
+        self.default_responses: list[dict] = [{"text": self.FALLBACK_RESPONSE}]
+        if transcript_path:
+            self.load_transcript(transcript_path)
+
+    @classmethod
+    def from_env(cls) -> "LLMReplay":
+        return cls(
+            transcript_path=os.getenv("LLM_REPLAY_FILE", ""),
+            latency_ms=float(os.getenv("LLM_REPLAY_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("LLM_REPLAY_JITTER_MS", "0")),
+            seed=int(os.getenv("LLM_REPLAY_SEED", "0")),
+        )
+
+    @staticmethod
+    def _normalise_step(step) -> dict:
+        if isinstance(step, str):
+            return {"text": step}
+        if "text" in step:
+            return step
+        # A bare function call object is scripted as the JSON the model would have written
+        return {"text": json.dumps(step)}
+
+    def load_transcript(self, path: str):
+        """
+        Load a scripted transcript (.json) or a recording made with LLM_RECORD_FILE (.jsonl).
+
+        Scripted format: {"transcripts": [{"question": str, "responses": [str | dict, ...]}], "default": [...]}
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                recorded: dict[str, dict[int, dict]] = {}
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        recorded.setdefault(entry["question"], {})[entry["step"]] = entry
+                for question, steps in recorded.items():
+                    self.transcripts[question] = [steps[i] for i in sorted(steps)]
+                return
+
+            script = json.load(f)
+
+        for item in script.get("transcripts", []):
+            self.transcripts[item["question"].strip()] = [self._normalise_step(s) for s in item["responses"]]
+        if script.get("default"):
+            self.default_responses = [self._normalise_step(s) for s in script["default"]]
+
+    @classmethod
+    def locate(cls, prompt: str) -> tuple[str, int]:
+        """Returns the current question and the number of function calls already made for it."""
+        idx = prompt.rfind(cls.QUESTION_MARKER)
+        if idx == -1:
+            return "", 0
+        tail = prompt[idx + len(cls.QUESTION_MARKER):]
+        question = tail.split("\n", 1)[0].strip()
+        return question, tail.count(cls.FUNCTION_MARKER)
+
+    def _simulate_latency(self, step: dict):
+        latency = step.get("latency_ms", self.latency_ms)
+        if self.jitter_ms:
+            latency += self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def _generate_response(self, prompt: str) -> LLMResponse:
+        question, step_idx = self.locate(prompt)
+        steps = self.transcripts.get(question, self.default_responses)
+        step = steps[min(step_idx, len(steps) - 1)]
+        self._simulate_latency(step)
+
+        text = step["text"]
+        usage = step.get("usage") or {}
+        token_prompt = usage.get("token_prompt", len(prompt) // 4)
+        token_total = usage.get("token_total", token_prompt + len(text) // 4)
+        return LLMResponse(text, LLMUsage(token_prompt, token_total))
+
+
 class LLMCentralised(LLMBase):
     def __init__(self):
         super().__init__("Undefined")
         self.models: list[LLMBase] = []
+        self.record_path = os.getenv("LLM_RECORD_FILE", "")
+
+        if os.getenv("LLM_BACKEND", "live").lower() == "replay":
+            self.models.append(LLMReplay.from_env())
+            return
 
         for key in os.getenv("GEMINI_API_KEY_LIST", "").split(","):
             if key.strip():
@@ -102,14 +245,23 @@ class LLMCentralised(LLMBase):
             if key.strip():
                 self.models.append(LLMOpenAI(key.strip()))
 
+    def _record(self, prompt: str, output: LLMResponse):
+        """Append a prompt/response pair to LLM_RECORD_FILE so it can be replayed by LLMReplay."""
+        question, step = LLMReplay.locate(prompt)
+        entry = {"question": question, "step": step, "text": output.text, "usage": output.usage}
+        with open(self.record_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
     async def generate_response(self, prompt: str) -> LLMResponse:
         attempts = 1
         tried = set()
         error_str = "No available models"
 
         while attempts <= 3 and len(tried) < len(self.models):
+            # Concurrent calls (batch questions) go to the key with the fewest requests in flight first
             available_models = sorted(
-                [(i, m, m.total_token_used * m.get_weight()) for i, m in enumerate(self.models) if i not in tried],
+                [(i, m, (m.in_flight, m.total_token_used * m.get_weight())) for i, m in enumerate(self.models)
+                 if i not in tried],
                 key=lambda x: x[2]
             )
 
@@ -119,26 +271,33 @@ class LLMCentralised(LLMBase):
             idx, model, _ = available_models[0]
             tried.add(idx)
 
-            print(f"[LLMCentral] Using model {idx}: {model}")
+            log.debug("using model %d: %s", idx, model)
+            model.in_flight += 1
             try:
                 output = await model.generate_response(prompt)
                 total_tokens = output.usage["token_total"]
                 model.total_token_used += total_tokens
                 self.total_token_used += total_tokens
+                if self.record_path:
+                    self._record(prompt, output)
                 return output
-            except (OpenAIRateLimit, ResourceExhausted) as e:
-                error_str = f"Rate limit reached: {e}"
-            except (OpenAIAuth, GooglePermissionDenied) as e:
-                error_str = f"API access denied: {e}"
-            except (APIError, GoogleAPIError) as e:
-                error_str = f"API Error: {e}"
             except Exception as e:
-                error_str = str(e)
-            print(f"[Model {idx}] {error_str}")
+                error_str = model.describe_error(e)
+            finally:
+                model.in_flight -= 1
+            log.warning("model %d failed: %s", idx, error_str)
             attempts += 1
 
         raise RuntimeError(error_str)
 
+    def warm_up(self):
+        """Builds every provider client; run in the background at startup so no request pays for it."""
+        for model in self.models:
+            try:
+                model.warm_up()
+            except Exception as e:
+                log.warning("warm-up of %s failed: %s", model, e)
+
     @property
     def total_models(self) -> int:
         return len(self.models)
@@ -3,13 +3,23 @@ import os
 import json
 from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
-from collections import deque
 from chart_manager import cm
+from fast_json import dumps
+from column_profile import profile_prompt
+from conversation_memory import ConversationMemory
+from question_cache import QUESTION_REUSE_DIRECT, REUSE_FUNCTIONS, QuestionCache
+from index_advisor import table_aliases
 from llm_centralised import llmCentral
+from app_logging import get_logger
 
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+log = get_logger("agent")
+
+# Result rows shown in an answer given from the question cache
+REUSE_ANSWER_ROWS = 20
+
 
 class ExecutionContext:
     """Context class to manage execution state and conversation flow"""
@@ -20,6 +30,11 @@ class ExecutionContext:
         self.function_called: List[Dict] = []
         self.pending_function_call: Optional[Dict] = None
         self.user_question: str = ""
+        # Prompt note about a previous similar question, see SQLAgent._reuse_answer
+        self.reuse_hint: str = ""
+        # Last successful query or plot, and whether the database was written, for the question cache
+        self.answered_by: Optional[Dict[str, Any]] = None
+        self.modified: bool = False
 
     def add_user_message(self, content: str):
         """Add user message to conversation"""
@@ -33,20 +48,26 @@ class ExecutionContext:
     def add_function_call(self, name: str, args: Dict[str, Any], result: Dict[str, Any] = None):
         """Add function call to context"""
         self.session_context += f"\nFunction call: {name}({args})\n"
+        content = dumps(result) if result else None
         if result:
-            self.session_context += f"Result: {json.dumps(result)}\n"
+            self.session_context += f"Result: {content}\n"
             self.current_conversation.append({
                 "role": "function",
                 "name": name,
-                "content": json.dumps(result)
+                "content": content
             })
 
+        if name == "execute_sql":
+            self.modified = True
+        elif name in REUSE_FUNCTIONS and result and result.get("success"):
+            self.answered_by = {"call": name, "args": args}
+
         function_entry = {
             "call": name,
             "args": args
         }
         if result:
-            function_entry["content"] = json.dumps(result)
+            function_entry["content"] = content
 
         self.function_called.append(function_entry)
 
@@ -64,14 +85,35 @@ class ExecutionContext:
 
 
 class SQLAgent:
-    def __init__(self, database_client):
+    def __init__(self, database_client, question_cache: Optional[QuestionCache] = None):
         self.database_client = database_client
 
-        self.conversation_memory = deque(maxlen=5)
+        self.conversation_memory = ConversationMemory()
+        # Answered questions and their SQL, for rewordings of them; may be shared by several agents
+        self.question_cache = question_cache if question_cache is not None else QuestionCache()
         self.mode: str = "agent"  # used for system prompt
+        # "rows": query results as row objects; "columnar": column names once plus value lists
+        self.result_format: str = "rows"
+        # Batch questions run unattended: execute_sql is refused instead of waiting for approval
+        self.read_only: bool = False
 
         # used to continue execution
         self.previous_context: Optional[ExecutionContext] = None
+        # Tables whose schema the last prompt showed, kept for follow-up questions naming none
+        self.schema_tables: List[str] = []
+
+    @property
+    def columnar(self) -> bool:
+        return self.result_format == "columnar"
+
+    def _result_data(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Rows of a query result in the agent's result format, for the prompt and the API response."""
+        if not self.columnar:
+            return {"data": result.get("data", [])}
+        selects = [{"columns": r["columns"], "rows": r["rows"]} for r in result["results"] if r["type"] == "SELECT"]
+        if len(selects) == 1:
+            return selects[0]
+        return {"results": selects}
 
     async def _func_get_schema(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         table_name = arguments.get("table")
@@ -80,7 +122,7 @@ class SQLAgent:
 
         try:
             sql = f"SELECT * FROM {table_name} LIMIT 1"
-            result = await self.database_client.execute_sql(sql)
+            result = await self.database_client.query_sql(sql)
 
             if not result.get("success"):
                 return {"success": False, "error": result.get("error", "Failed to retrieve table schema.")}
@@ -96,8 +138,8 @@ class SQLAgent:
 
     async def _func_execute_sql(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         sql = arguments["text"]
-        print(f"[EXECUTE SQL]: {sql}")
-        result = await self.database_client.execute_sql(sql)
+        log.info("execute_sql", extra={"fields": {"sql": sql}})
+        result = await self.database_client.execute_sql(sql, columnar=self.columnar)
 
         if not result.get("success"):
             return {
@@ -105,33 +147,62 @@ class SQLAgent:
                 "error": result.get("error", "Unknown error")
             }
         try:
-            tables_result = await self.database_client.execute_sql("SELECT name FROM sqlite_master WHERE type='table'")
+            tables_result = await self.database_client.query_sql("SELECT name FROM sqlite_master WHERE type='table'", internal=True)
             if tables_result.get("success") and tables_result.get("data"):
                 return {
                     "success": True,
                     "result": f"Successfully executed: {sql}",
-                    "data": result.get("data", [])
+                    **self._result_data(result)
                 }
         except Exception as e:
-            print(f"Warning: Could not fetch updated table state: {e}")
+            log.warning("could not fetch updated table state: %s", e)
 
         return {
             "success": True,
             "result": f"Successfully executed multiple statements",
-            "data": result.get("data", [])
+            **self._result_data(result)
         }
 
+    @staticmethod
+    def _cost_hint(plan: Dict[str, Any]) -> Dict[str, Any]:
+        """The estimates and rewrite hints of a query cost review, as shown to the model."""
+        return {key: plan[key] for key in ("estimated_row_visits", "estimated_rows", "issues", "limit_added")
+                if key in plan}
+
+    def _refused_by_cost(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": "Query not run: its estimated cost is too high. Rewrite it following the hints in 'cost'.",
+            "cost": self._cost_hint(plan)
+        }
+
+    def _add_cost_hint(self, response: Dict[str, Any], plan: Dict[str, Any]):
+        if plan.get("limit_added"):
+            note = (f"LIMIT {plan['limit_added']} was added; the query may return up to {plan['estimated_rows']} rows. "
+                    "Aggregate, filter or add your own LIMIT to see a specific part of it.")
+            response["warning"] = f"{response['warning']} {note}" if "warning" in response else note
+        if plan["issues"] or plan.get("limit_added"):
+            response["cost"] = self._cost_hint(plan)
+
     async def _func_query_sql(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         sql = arguments["text"]
-        print(f"[QUERY SQL]: {sql}")
-        result = await self.database_client.execute_sql(sql)
+        log.info("query_sql", extra={"fields": {"sql": sql}})
+        plan = await self.database_client.plan_query(sql)
+        if not plan["allowed"]:
+            return self._refused_by_cost(plan)
+        sql = plan["sql"]
+        result = await self.database_client.query_sql(sql, columnar=self.columnar)
 
         if result.get("success"):
-            return {
+            response = {
                 "success": True,
                 "result": f"Query executed: {sql}",
-                "data": result.get("data", [])
+                **self._result_data(result)
             }
+            if result.get("truncated"):
+                response["warning"] = result["message"]
+            self._add_cost_hint(response, plan)
+            return response
         else:
             return {
                 "success": False,
@@ -141,17 +212,24 @@ class SQLAgent:
     async def _func_plot_graph(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         title = arguments["title"]
         sql = arguments["text"]
-        print(f"[PLOT {name.upper()}]: {title} | SQL: {sql}")
+        log.info(name, extra={"fields": {"title": title, "sql": sql}})
 
         # Execute the query
-        result = await self.database_client.execute_sql(sql)
+        plan = await self.database_client.plan_query(sql)
+        if not plan["allowed"]:
+            return self._refused_by_cost(plan)
+        result = await self.database_client.query_sql(plan["sql"], columnar=self.columnar)
         if not result.get("success"):
             return {
                 "success": False,
                 "error": result.get("error", "SQL execution failed")
             }
 
-        data = result.get("data", [])
+        if self.columnar:
+            selects = [r for r in result["results"] if r["type"] == "SELECT"]
+            data = [dict(zip(r["columns"], row)) for r in selects for row in r["rows"]]
+        else:
+            data = result.get("data", [])
         if not data or len(data[0]) < 2:
             return {
                 "success": False,
@@ -164,22 +242,46 @@ class SQLAgent:
         else:
             image_path_or_url = await cm.plot_bar_chart(title, data)
 
-        return {
+        response = {
             "success": True,
             "result": f"Chart plotted: {title}",
             "image": image_path_or_url,
-            "data": data
+            **self._result_data(result)
+        }
+        self._add_cost_hint(response, plan)
+        return response
+
+    async def _func_approx_stats(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        table, column, kind = arguments.get("table"), arguments.get("column"), arguments.get("kind")
+        log.info(name, extra={"fields": {"table": table, "column": column, "kind": kind}})
+        sketch = getattr(self.database_client, "table_sketches", {}).get(table)
+        if sketch is None or column not in sketch.columns:
+            return {"success": False, "error": f"No sketch for {table}.{column}. Use query_sql for an exact answer."}
+        try:
+            answer = sketch.columns[column].answer(kind, q=arguments.get("q"), k=int(arguments.get("k", 10)))
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        return {
+            "success": True,
+            "result": f"Approximate {kind} of {table}.{column} over {sketch.rows} rows, from sketches built at load time",
+            "approximate": True,
+            **answer
         }
 
     async def execute_function(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Execute function calls using the actual database"""
         try:
             if name == "execute_sql":
+                if self.read_only:
+                    return {"success": False, "error": "Read-only session: the database cannot be modified. "
+                                                       "Answer with query_sql only."}
                 return await self._func_execute_sql(name, arguments)
             elif name == "query_sql":
                 return await self._func_query_sql(name, arguments)
             elif name in ["plot_bar", "plot_pie"]:
                 return await self._func_plot_graph(name, arguments)
+            elif name == "approx_stats":
+                return await self._func_approx_stats(name, arguments)
             return {"success": False, "error": f"Function {name} not recognized."}
         except Exception as e:
             return {"success": False, "error": f"Error executing {name}: {str(e)}"}
@@ -210,8 +312,11 @@ Guidelines:
 - You must always use `query_sql` to get actual schema before executing functions, unless its already known.
 - Repeating known queries is prohibited.
 - Be proactive, exploring alternative if something fails.
+- If a query result has `cost` issues, rewrite the query as their hints suggest.
 - Provide context using markdown tables whenever possible.
 - For large tables, by default, query and show only the first, last or sample 5 rows。
+  First rows: `SELECT * FROM t ORDER BY rowid LIMIT 5`; last rows: `ORDER BY rowid DESC LIMIT 5`;
+  random sample: `SELECT * FROM samples.t LIMIT 5`. Never use ORDER BY RANDOM() or OFFSET for this.
 - Prioritize calling `plot_bar` and `plot_pie` whenever suitable.
   Always include the plotted chart returned from the function ![](api/charts/bar_chart_xxx.png)
 - You cannot call functions after starting to respond. Call all necessary functions before responding.
@@ -226,6 +331,49 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
         "arguments": {{"parameter": "value"}}
     }}
 }}
+"""
+            if self.read_only:
+                prompt += "\nThis session is read-only: execute_sql is not available, answer with query_sql only.\n"
+            tables = None
+            schema_index = getattr(self.database_client, "schema_index", None)
+            if schema_index is not None and schema_index.docs:
+                tables = schema_index.select(context.user_question, previous=self.schema_tables)
+                self.schema_tables = tables
+                if len(tables) < len(schema_index.docs):
+                    prompt += f"""
+The database has {len(schema_index.docs)} tables. The ones most relevant to the question (list the others with
+`SELECT name FROM sqlite_master WHERE type = 'table'` if these are not enough):
+"""
+                else:
+                    prompt += "\nTables:\n"
+                prompt += f"{schema_index.prompt(tables)}\n\n"
+            profiles = getattr(self.database_client, "table_profiles", None)
+            if profiles and tables is not None:
+                profiles = {table: profile for table, profile in profiles.items() if table in tables}
+            if profiles:
+                prompt += f"""
+Table profiles, computed when the data was loaded (column types, null ratio, distinct values, range,
+most frequent values). Use them instead of exploratory queries such as SELECT DISTINCT or MIN/MAX:
+{profile_prompt(profiles)}
+
+"""
+            text_indexes = getattr(self.database_client, "text_indexes", None)
+            search = text_indexes.prompt(tables) if text_indexes is not None else ""
+            if search:
+                prompt += f"\n{search}\n\n"
+            sketches = getattr(self.database_client, "table_sketches", None)
+            if sketches and tables is not None:
+                sketches = {table: sketch for table, sketch in sketches.items() if table in tables}
+            if sketches:
+                columns = "; ".join(f"{sketch.table}: {', '.join(sketch.columns)}" for sketch in sketches.values())
+                prompt += f"""
+5. approx_stats(table, column, kind, q, k): Approximate answers in milliseconds from sketches built when
+   large tables were loaded. kind "distinct": distinct count; "quantiles": values at fractions q
+   (e.g. [0.5] for the median, numeric columns only); "top": the k most frequent values with counts.
+   Use it only when the user accepts an approximate answer (asks roughly, about, estimate, ...), and
+   state that the answer is approximate together with its error bound.
+   Sketched columns: {columns}
+
 """
         else:  # ask mode
             prompt = """You are an expert SQL assistant and an AI Agent from ByeDB.AI. Your job is to help write SQL queries and explain database operations.
@@ -239,13 +387,10 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
 """
 
         # Add previous memory if any
-        for i, conversation in enumerate(self.conversation_memory):
-            prompt += f"Conversation {i + 1}:\n"
-            for message in conversation:
-                role = message["role"]
-                content = message["content"]
-                prompt += f"{role}: {content}\n"
-            prompt += "\n"
+        prompt += self.conversation_memory.render()
+
+        if context.reuse_hint:
+            prompt += context.reuse_hint
 
         prompt += f"Current question: {context.user_question}"
 
@@ -300,7 +445,7 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
 
         for i in range(max_depth):
             prompt = self.build_messages_with_memory(context)
-            print(f"Loop {i + 1}: Generating response...")
+            log.debug("loop %d: generating response", i + 1)
 
             try:
                 response = await llmCentral.generate_response(prompt)
@@ -319,9 +464,9 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
                     fn_name = fn_call["name"]
                     fn_args = fn_call["arguments"]
 
-                    print(f"Loop {i + 1}: Function call detected: {fn_name}")
+                    log.debug("loop %d: function call %s", i + 1, fn_name)
 
-                    if fn_name == "execute_sql":
+                    if fn_name == "execute_sql" and not self.read_only:
                         context.set_pending_function(fn_call)
                         self.previous_context = context  # Store for continue_respond
                         return {
@@ -353,7 +498,8 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
                 # Direct response - we're done
                 final_response = parsed_response["content"]
                 context.add_assistant_message(final_response)
-                self.conversation_memory.append(context.current_conversation.copy())
+                self._remember(context)
+                self._keep_solved(context)
                 return {
                     "success": True,
                     "response": final_response,
@@ -362,10 +508,10 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
                 }
 
             except Exception as e:
-                print(f"Error in loop {i + 1}: {str(e)}")
+                log.exception("error in loop %d", i + 1)
                 final_response = f"Error occurred: {str(e)}"
                 context.add_assistant_message(final_response)
-                self.conversation_memory.append(context.current_conversation.copy())
+                self._remember(context)
                 return {
                     "success": False,
                     "response": final_response,
@@ -376,7 +522,7 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
         # If we reach here, it means MAX_LOOPS were hit without a final direct response
         final_response = "Maximum function call iterations reached. Please refine your query or try again."
         context.add_assistant_message(final_response)
-        self.conversation_memory.append(context.current_conversation.copy())
+        self._remember(context)
         return {
             "success": False,
             "response": final_response,
@@ -384,6 +530,102 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
             "usage": {"note": "Unknown"}
         }
 
+    def _remember(self, context: ExecutionContext):
+        """Keeps the question, final SQL and answer of a finished turn; function results are not kept."""
+        answer = next((message["content"] for message in reversed(context.current_conversation)
+                       if message["role"] == "assistant"), "(no answer: the SQL was not confirmed)")
+        self.conversation_memory.add(context.user_question, context.function_called, answer)
+
+    def _tables_schema(self, sql: str) -> Dict[str, List[List[str]]]:
+        """Columns and declared types of the tables a statement reads, from the schema index."""
+        schema_index = getattr(self.database_client, "schema_index", None)
+        docs = schema_index.docs if schema_index is not None else {}
+        return {table: [list(column) for column in docs[table].columns]
+                for table in sorted(set(table_aliases(sql).values())) if table in docs}
+
+    def _keep_solved(self, context: ExecutionContext):
+        """Adds a turn answered from a successful query or plot, without writes, to the question cache."""
+        if self.mode != "agent" or context.modified or not context.answered_by:
+            return
+        call = context.answered_by
+        self.question_cache.add(context.user_question, call["call"], call["args"],
+                                self._tables_schema(call["args"].get("text", "")))
+
+    @staticmethod
+    def _result_table(result: Dict[str, Any], max_rows: int = REUSE_ANSWER_ROWS) -> str:
+        """Markdown table(s) of a query_sql or plot result, in either result format."""
+        if "results" in result:
+            selects = result["results"]
+        elif "columns" in result:
+            selects = [result]
+        else:
+            data = result.get("data", [])
+            selects = [{"columns": list(data[0]) if data else [], "rows": [list(row.values()) for row in data]}]
+
+        def cell(value: Any) -> str:
+            return "" if value is None else str(value).replace("|", "\\|")
+
+        tables = []
+        for select in selects:
+            columns, rows = select["columns"], select["rows"]
+            if not columns or not rows:
+                continue
+            lines = ["| " + " | ".join(map(cell, columns)) + " |", "|" + "---|" * len(columns)]
+            lines += ["| " + " | ".join(map(cell, row)) + " |" for row in rows[:max_rows]]
+            if len(rows) > max_rows:
+                lines.append(f"\n({len(rows) - max_rows} more rows)")
+            tables.append("\n".join(lines))
+        return "\n\n".join(tables) or "The query returned no rows."
+
+    async def _reuse_answer(self, context: ExecutionContext) -> Optional[Dict[str, Any]]:
+        """
+        Looks the question up in the question cache. When the tables its SQL reads are unchanged, the
+        SQL runs again first: with QUESTION_REUSE_DIRECT, a question worded the same that opens a
+        conversation is answered from the result without an LLM call, and any other question gets the
+        result in its context so the model can answer in one call. When the tables changed, the SQL is
+        only shown to the model as an example.
+        """
+        if self.mode != "agent" or not self.question_cache.enabled:
+            return None
+        match = self.question_cache.match(context.user_question)
+        if match is None:
+            return None
+        entry, similarity = match
+        unchanged = entry.schema == self._tables_schema(entry.arguments.get("text", ""))
+        log.info("question reuse", extra={"fields": {"similarity": round(similarity, 2), "unchanged": unchanged,
+                                                     "previous": entry.question}})
+        call = f"{entry.function}({dumps(entry.arguments)})"
+
+        if unchanged:
+            result = await self.execute_function(entry.function, entry.arguments)
+            if result.get("success"):
+                entry.hits += 1
+                context.add_function_call(entry.function, entry.arguments, result)
+                if similarity == 1.0 and QUESTION_REUSE_DIRECT and not self.conversation_memory.entries():
+                    answer = self._result_table(result)
+                    if result.get("image"):
+                        answer = f"![]({result['image']})\n\n{answer}"
+                    answer = f"Answered with the query of the earlier question \"{entry.question}\":\n\n{answer}"
+                    context.add_assistant_message(answer)
+                    self._remember(context)
+                    return {
+                        "success": True,
+                        "response": answer,
+                        "function_called": context.function_called.copy(),
+                        "reused": {"question": entry.question, "similarity": similarity},
+                        "usage": {"note": "Answered from the question cache, no LLM call"}
+                    }
+                context.reuse_hint = (
+                    f"A previous question, \"{entry.question}\", was answered with {call}; it was run again "
+                    "for this question (result below). If that result answers the current question, respond "
+                    "directly from it; otherwise write a new query.\n\n")
+                return None
+        reason = "it now fails" if unchanged else "its tables have changed since"
+        context.reuse_hint = (
+            f"A previous similar question, \"{entry.question}\", was answered with {call}, but {reason}. "
+            "Use it as an example only.\n\n")
+        return None
+
     def _dismiss_previous_context(self):
         if not self.previous_context:
             return
@@ -398,7 +640,7 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
                     "error": "Not confirmed by User"
                 }
             )
-        self.conversation_memory.append(self.previous_context.current_conversation.copy())
+        self._remember(self.previous_context)
         self.previous_context = None
 
     async def generate_sql_response(self, user_question: str) -> Dict[str, Any]:
@@ -407,6 +649,9 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
         context = ExecutionContext()
         context.add_user_message(user_question)
         try:
+            reused = await self._reuse_answer(context)
+            if reused:
+                return reused
             return await self._generate_response_in_loop(context, 20)
         except Exception as e:
             return {
@@ -430,7 +675,7 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
                 fn_name = fn_call["name"]
                 fn_args = fn_call["arguments"]
 
-                print(f"[CONFIRM EXECUTION] {fn_name} with args {fn_args}")
+                log.info("confirmed execution", extra={"fields": {"function": fn_name, "args": fn_args}})
 
                 # Execute the function
                 function_result = await self.execute_function(fn_name, fn_args)
@@ -466,13 +711,14 @@ When you need to call a function, instead of a tool call, respond with a JSON ob
         """Clear conversation memory"""
         self.conversation_memory.clear()
         self.previous_context = None
+        self.schema_tables = []
 
     def get_memory_summary(self) -> List[str]:
         """Get a summary of stored conversations"""
-        summaries = []
-        for i, conversation in enumerate(self.conversation_memory):
-            summaries.append(json.dumps(conversation, indent=2))
-        return summaries
+        return [json.dumps(entry, indent=2) for entry in self.conversation_memory.entries()]
+
+    def memory_bytes(self) -> int:
+        return self.conversation_memory.size_bytes
 
 
 # Usage example
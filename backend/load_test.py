@@ -0,0 +1,218 @@
+"""
+HTTP load generator for the ByeDB API.
+
+Simulates concurrent users, each with its own user_id header, doing a mix of uploads, questions,
+approvals through /api/continue-execution and exports. Without --url the app is driven in-process
+with the replay LLM backend; with --url the target server should run with LLM_BACKEND=replay.
+
+Usage:
+    python load_test.py --concurrency 1,8,32,64 --users-per-worker 2 --ops 20
+    python load_test.py --url http://localhost:8000 --concurrency 4,16
+"""
+import io
+import os
+import csv
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+
+import httpx
+
+DEFAULT_TRANSCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_transcript.json")
+
+READ_QUESTIONS = [
+    "How many orders are there per region?",
+    "Show the 5 largest orders",
+    "What is the average order amount by product?",
+]
+WRITE_QUESTION = "Create a table with the revenue of each region"
+
+# Relative weights of the operations a simulated user performs after its initial upload
+OPERATION_MIX = {
+    "question": 60,
+    "approval": 15,
+    "export": 20,
+    "upload": 5,
+}
+
+
+def build_orders_csv(rows: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "region", "product", "amount", "order_date"])
+    for i in range(rows):
+        writer.writerow([
+            i + 1,
+            rng.choice(["North", "South", "East", "West", "Central"]),
+            rng.choice(["Laptop", "Phone", "Tablet", "Monitor", "Keyboard", "Mouse"]),
+            round(rng.uniform(5, 2500), 2),
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, op: str, seconds: float, ok: bool):
+        self.latencies[op].append(seconds)
+        if not ok:
+            self.errors[op] += 1
+
+    @staticmethod
+    def percentile(values: list, pct: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    @property
+    def total_ops(self) -> int:
+        return sum(len(v) for v in self.latencies.values())
+
+    @property
+    def total_errors(self) -> int:
+        return sum(self.errors.values())
+
+    def all_latencies(self) -> list:
+        return [v for values in self.latencies.values() for v in values]
+
+
+class SimulatedUser:
+    def __init__(self, client: httpx.AsyncClient, user_id: str, csv_payload: bytes, stats: LoadStats, rng: random.Random):
+        self.client = client
+        self.headers = {"user-id": user_id}
+        self.csv_payload = csv_payload
+        self.stats = stats
+        self.rng = rng
+
+    async def _timed(self, op: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            ok = response.status_code < 400 and not (
+                response.headers.get("content-type", "").startswith("application/json")
+                and response.json().get("success") is False
+            )
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.stats.record(op, time.perf_counter() - start, ok)
+        return response
+
+    async def upload(self):
+        files = {"file": ("orders.csv", self.csv_payload, "text/csv")}
+        await self._timed("upload", "POST", "/api/upload-db", files=files)
+
+    async def question(self):
+        payload = {"question": self.rng.choice(READ_QUESTIONS), "mode": "agent"}
+        await self._timed("question", "POST", "/api/sql-question", json=payload)
+
+    async def approval(self):
+        response = await self._timed("question", "POST", "/api/sql-question",
+                                     json={"question": WRITE_QUESTION, "mode": "agent"})
+        if response is not None and response.status_code == 200 and response.json()["meta"].get("requires_approval"):
+            await self._timed("approval", "POST", "/api/continue-execution", json={"approve": True})
+
+    async def export(self):
+        file_type = self.rng.choice(["json", "csv"])
+        await self._timed(f"export_{file_type}", "GET", "/api/export-db", params={"file_type": file_type})
+
+    async def run(self, ops: int):
+        await self.upload()
+        names = list(OPERATION_MIX)
+        weights = list(OPERATION_MIX.values())
+        for _ in range(ops):
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+async def fetch_server_stats(client: httpx.AsyncClient) -> dict:
+    response = await client.get("/api/stats")
+    response.raise_for_status()
+    return response.json()
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, users: int, ops: int, csv_payload: bytes, level: int) -> dict:
+    stats = LoadStats()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_user(idx: int):
+        async with semaphore:
+            user = SimulatedUser(client, f"load-{level}-{idx}", csv_payload, stats, random.Random(idx))
+            await user.run(ops)
+
+    before = await fetch_server_stats(client)
+    start = time.perf_counter()
+    await asyncio.gather(*(run_user(i) for i in range(users)))
+    elapsed = time.perf_counter() - start
+    after = await fetch_server_stats(client)
+
+    latencies = stats.all_latencies()
+    return {
+        "concurrency": concurrency,
+        "users": users,
+        "ops": stats.total_ops,
+        "errors": stats.total_errors,
+        "throughput": stats.total_ops / elapsed if elapsed else 0.0,
+        "p50": LoadStats.percentile(latencies, 50),
+        "p95": LoadStats.percentile(latencies, 95),
+        "p99": LoadStats.percentile(latencies, 99),
+        "evictions": after["evictions"] - before["evictions"],
+        "sessions": after["sessions"],
+        "memory_growth_kb": after["memory_kb"] - before["memory_kb"],
+        "per_op": {
+            op: (len(values), LoadStats.percentile(values, 50), LoadStats.percentile(values, 95), stats.errors[op])
+            for op, values in sorted(stats.latencies.items())
+        },
+    }
+
+
+def print_level(result: dict):
+    print(f"\n== concurrency={result['concurrency']} users={result['users']} ==")
+    print(f"ops={result['ops']} errors={result['errors']} throughput={result['throughput']:.1f} ops/s "
+          f"p50={result['p50'] * 1000:.1f}ms p95={result['p95'] * 1000:.1f}ms p99={result['p99'] * 1000:.1f}ms")
+    print(f"sessions={result['sessions']} evictions={result['evictions']} "
+          f"memory growth={result['memory_growth_kb'] / 1024:.1f} MiB")
+    for op, (count, p50, p95, errors) in result["per_op"].items():
+        print(f"  {op:<12} n={count:<6} p50={p50 * 1000:>8.1f}ms p95={p95 * 1000:>8.1f}ms errors={errors}")
+
+
+def build_client(args) -> httpx.AsyncClient:
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        return httpx.AsyncClient(base_url=args.url, timeout=timeout)
+
+    # The replay backend must be selected before main imports llm_centralised
+    os.environ.setdefault("LLM_BACKEND", "replay")
+    os.environ.setdefault("LLM_REPLAY_FILE", DEFAULT_TRANSCRIPT)
+    os.environ.setdefault("LLM_REPLAY_LATENCY_MS", str(args.latency_ms))
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://byedb.local", timeout=timeout)
+
+
+async def run(args):
+    csv_payload = build_orders_csv(args.rows, seed=7)
+    async with build_client(args) as client:
+        for level, concurrency in enumerate(int(c) for c in args.concurrency.split(",")):
+            users = max(concurrency * args.users_per_worker, 1)
+            print_level(await run_level(client, concurrency, users, args.ops, csv_payload, level))
+
+    if not args.url:
+        from main import user_context
+        await user_context.close_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the ByeDB API with simulated users.")
+    parser.add_argument("--url", default="", help="Target server; omit to drive the app in-process")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma separated concurrency levels")
+    parser.add_argument("--users-per-worker", type=int, default=2, help="Distinct users per concurrent worker")
+    parser.add_argument("--ops", type=int, default=20, help="Operations per user after the initial upload")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows in the uploaded CSV")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Simulated LLM latency (in-process only)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    asyncio.run(run(parser.parse_args()))
@@ -1,37 +1,77 @@
+import asyncio
 from collections import OrderedDict
+from typing import Dict
+
 from db_sqlite import LocalSQLiteDatabase
 from llm_sql_agent import SQLAgent
+from export_cache import ExportCache
+from question_cache import session_cache
+from ingest_jobs import job_manager
+from app_logging import get_logger
+
+log = get_logger("session")
 
 
 class UserSession:
     def __init__(self, database: LocalSQLiteDatabase, agent: SQLAgent):
         self.database = database
         self.agent = agent
+        self.export_cache = ExportCache()
 
     @classmethod
-    async def create(cls):
+    async def create(cls, user_id: str):
         db = LocalSQLiteDatabase(db_path=":memory:")
         await db.connect()
-        agent = SQLAgent(db)
+        agent = SQLAgent(db, session_cache(user_id))
         return cls(db, agent)
 
+    async def close(self):
+        self.export_cache.clear()
+        await self.database.close()
+
+    def memory_bytes(self) -> int:
+        return self.agent.memory_bytes()
+
 
 class LRUUserContext:
     def __init__(self, capacity=50):
         self.capacity = capacity
         self.sessions = OrderedDict()  # {user_id: UserSession}
+        # Held while a user's session is being created, so concurrent first requests share one
+        self._creating: Dict[str, asyncio.Lock] = {}
+        self.created = 0
+        self.evictions = 0
 
     async def get_session(self, user_id: str) -> UserSession:
-        print(f"get_session:User id: {user_id}")
         if user_id in self.sessions:
             self.sessions.move_to_end(user_id)
-        else:
-            if len(self.sessions) >= self.capacity:
-                evicted_user, _ = self.sessions.popitem(last=False)
-                print(f"Evicted user: {evicted_user}")
-            self.sessions[user_id] = await UserSession.create()
+            return self.sessions[user_id]
+        lock = self._creating.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            if user_id not in self.sessions:
+                await self._evict()
+                self.sessions[user_id] = await UserSession.create(user_id)
+                log.info("session created", extra={"fields": {"user_id": user_id}})
+                self.created += 1
+            self._creating.pop(user_id, None)
         return self.sessions[user_id]
 
+    async def _evict(self):
+        """
+        Closes least recently used sessions down to capacity. Sessions with an upload in progress are
+        skipped; when every session has one, the context stays over capacity until they finish.
+        """
+        while len(self.sessions) >= self.capacity:
+            idle = next((user for user, session in self.sessions.items()
+                         if not job_manager.busy(session.database)), None)
+            if idle is None:
+                log.warning("sessions over capacity: every session has an upload in progress")
+                return
+            evicted = self.sessions.pop(idle)
+            await evicted.close()
+            self.evictions += 1
+            log.info("session evicted", extra={"fields": {"user_id": idle}})
+
     async def get_user_database(self, user_id: str) -> LocalSQLiteDatabase:
         session = await self.get_session(user_id)
         return session.database
@@ -40,10 +80,24 @@ class LRUUserContext:
         session = await self.get_session(user_id)
         return session.agent
 
-    def delete_user(self, user_id: str):
+    async def delete_user(self, user_id: str):
         if user_id in self.sessions:
-            del self.sessions[user_id]
-            print(f"Deleted user: {user_id}")
-
+            session = self.sessions.pop(user_id)
+            session.agent.question_cache.clear()
+            await session.close()
+            log.info("session deleted", extra={"fields": {"user_id": user_id}})
 
+    async def close_all(self):
+        while self.sessions:
+            _, session = self.sessions.popitem()
+            await session.close()
 
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "capacity": self.capacity,
+            "created": self.created,
+            "evictions": self.evictions,
+            "conversation_memory_bytes": sum(session.memory_bytes() for session in self.sessions.values()),
+            "export_cache_bytes": sum(session.export_cache.size_bytes for session in self.sessions.values()),
+        }
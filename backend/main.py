@@ -1,26 +1,39 @@
 import json
 import os
+import logging
+import asyncio
 import io
 import csv
 import zipfile
 import tempfile
 import traceback
 
-import pandas as pd
-
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header
-from fastapi.responses import StreamingResponse
+import startup  # first, so startup timings include the imports below
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
-from db_sqlite import LocalSQLiteDatabase
+from db_sqlite import LOAD_MODES, LocalSQLiteDatabase
 from llm_sql_agent import SQLAgent
 from lru_usr_context import LRUUserContext
 from chart_manager import cm
+from ingest import SUPPORTED_EXTENSIONS, ingest_file, shutdown_pools
+from ingest_jobs import job_manager
+from batch_questions import BATCH_MAX_QUESTIONS, answer_batch
+from arrow_io import EXPORT_FORMATS, export_tables
+from fast_json import FastJSONResponse, dumps_bytes
+from export_cache import ExportArtifact
+from app_logging import get_logger, setup_logging, shutdown_logging
+
+setup_logging()
+log = get_logger("api")
+startup.mark("imported")
 
-app = FastAPI(title="ByeDB API", description="Natural Language to SQL API", version="1.0.0")
+app = FastAPI(title="ByeDB API", description="Natural Language to SQL API", version="1.0.0",
+              default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +45,8 @@ app.add_middleware(
 app.mount("/api/charts", StaticFiles(directory=cm.output_dir), name="charts")
 # Global user context
 user_context = LRUUserContext(capacity=50)
+DISCONNECT_POLL_SECONDS = 0.5
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
 async def get_user_database(user_id: str) -> LocalSQLiteDatabase:
     return await user_context.get_user_database(user_id)
@@ -39,11 +54,47 @@ async def get_user_database(user_id: str) -> LocalSQLiteDatabase:
 async def get_user_agent(user_id: str) -> SQLAgent:
     return await user_context.get_user_agent(user_id)
 
+async def run_until_disconnected(http_request: Request, coro) -> dict:
+    """
+    Runs an agent call, cancelling it if the client disconnects first.
+    Cancellation interrupts any SQL statement the agent is running on the user's database.
+    """
+    task = asyncio.create_task(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            task.cancel()
+            return {"success": False, "error": "Client disconnected."}
+
+async def save_upload(file: UploadFile) -> str:
+    """Spools an upload to a temporary file in chunks, so parsing can happen outside the request."""
+    suffix = os.path.splitext(file.filename)[1].lower()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            tmp_file.write(chunk)
+    return tmp_file.name
+
+def process_memory_kb() -> int:
+    """Current resident set size, falling back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return 0
+
 # Models
 class SQLQuestionRequest(BaseModel):
     question: str
     context: Optional[str] = None
     mode: Optional[str] = "agent"
+    result_format: Optional[str] = None  # "rows" (default) or "columnar"
 
 class SQLQuestionResponse(BaseModel):
     success: bool
@@ -51,10 +102,37 @@ class SQLQuestionResponse(BaseModel):
     response: Optional[str] = None
     error: Optional[str] = None
 
+class BatchQuestionRequest(BaseModel):
+    questions: List[str]
+    mode: Optional[str] = "agent"
+    result_format: Optional[str] = None
+    concurrency: Optional[int] = None
+
+class TextIndexRequest(BaseModel):
+    table: str
+    columns: Optional[List[str]] = None
+
+
 class ContinueRequest(BaseModel):
     approve: bool
     context: Optional[str] = None
 
+def question_response(result: dict) -> FastJSONResponse:
+    """
+    SQLQuestionResponse for an agent result, encoded directly: validating and re-encoding `meta`
+    through the response model would copy every result row again.
+    """
+    log.info("agent result", extra={"fields": {"success": result["success"],
+                                               "function_calls": len(result.get("function_called", []))}})
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("agent result payload", extra={"fields": {"result": result}})
+    return FastJSONResponse({
+        "success": result["success"],
+        "meta": result,
+        "response": result.get("response"),
+        "error": result.get("error"),
+    })
+
 # API Endpoints
 @app.get("/")
 async def root():
@@ -64,8 +142,12 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "ByeDB API"}
 
+@app.get("/api/stats")
+async def stats():
+    return {**user_context.stats(), "memory_kb": process_memory_kb(), "startup_ms": startup.timings}
+
 @app.post("/api/sql-question", response_model=SQLQuestionResponse)
-async def ask_sql_question(request: SQLQuestionRequest, user_id: str = Header(...)):
+async def ask_sql_question(request: SQLQuestionRequest, http_request: Request, user_id: str = Header(...)):
     try:
         sql_expert = await get_user_agent(user_id)
         if not request.question.strip():
@@ -73,83 +155,82 @@ async def ask_sql_question(request: SQLQuestionRequest, user_id: str = Header(..
 
         if request.mode:
             sql_expert.mode = request.mode
-        print(f"Question: {request.question}")
-        result = await sql_expert.generate_sql_response(request.question)
-        print(json.dumps(result, indent=2))
-        return SQLQuestionResponse(
-            success=result["success"],
-            meta=result,
-            response=result.get("response"),
-            error=result.get("error")
-        )
+        if request.result_format:
+            sql_expert.result_format = request.result_format
+        log.info("question", extra={"fields": {"user_id": user_id, "question": request.question}})
+        result = await run_until_disconnected(http_request, sql_expert.generate_sql_response(request.question))
+        return question_response(result)
     except Exception as e:
         return SQLQuestionResponse(success=False, meta={}, error=str(e))
 
 
+@app.post("/api/sql-question-batch")
+async def ask_sql_question_batch(request: BatchQuestionRequest, user_id: str = Header(...)):
+    """
+    Answers several questions about the user's database concurrently, each by its own read-only
+    agent. Streams one JSON line per question as it finishes, with its index in the request.
+    """
+    questions = [question.strip() for question in request.questions]
+    if not questions or not all(questions):
+        raise HTTPException(status_code=400, detail="Questions cannot be empty")
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+
+    db = await get_user_database(user_id)
+    question_cache = (await get_user_agent(user_id)).question_cache
+    log.info("question batch", extra={"fields": {"user_id": user_id, "questions": len(questions)}})
+
+    async def lines():
+        async for result in answer_batch(db, questions, request.mode or "agent", request.result_format or "rows",
+                                         request.concurrency, question_cache):
+            yield dumps_bytes(result) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.post("/api/continue-execution", response_model=SQLQuestionResponse)
-async def continue_execution(request: ContinueRequest, user_id: str = Header(...)):
+async def continue_execution(request: ContinueRequest, http_request: Request, user_id: str = Header(...)):
     try:
         sql_expert = await get_user_agent(user_id)
 
         if request.approve:
-            result = await sql_expert.continue_sql_respond()
+            result = await run_until_disconnected(http_request, sql_expert.continue_sql_respond())
         else:
-            result = await sql_expert.cancel_sql_execution()
-        print(json.dumps(result, indent=2))
-        return SQLQuestionResponse(
-            success=result["success"],
-            meta=result,
-            response=result.get("response"),
-            error=result.get("error")
-        )
+            result = await run_until_disconnected(http_request, sql_expert.cancel_sql_execution())
+        return question_response(result)
     except Exception as e:
         return SQLQuestionResponse(success=False, meta={}, error=str(e))
 
 
 @app.post("/api/upload-db")
-async def upload_database(file: UploadFile = File(...), truncate: bool = Form(True), user_id: str = Header(...)):
+async def upload_database(file: UploadFile = File(...), truncate: bool = Form(True), background: bool = Form(False),
+                          mode: Optional[str] = Form(None), key: Optional[str] = Form(None),
+                          user_id: str = Header(...)):
+    """
+    mode: "replace" (the default, or truncate=true), "append" (truncate=false) or "upsert", which
+    needs `key`, the comma-separated columns identifying a row.
+    """
+    tmp_path = None
     try:
         db = await get_user_database(user_id)
-        filename = file.filename.lower()
-        contents = await file.read()
-
-        if filename.endswith(".json"):
-            data = json.loads(contents.decode("utf-8"))
-            load_result = await db.load_all_data(data)
-
-        elif filename.endswith(".csv"):
-            df = pd.read_csv(io.BytesIO(contents))
-            table_name = os.path.splitext(file.filename)[0]
-            result = await db.load_dataframe(df, table_name=table_name)
-            load_result = {
-                "success": result["success"],
-                "loaded_tables": [result["table"]] if result["success"] else [],
-                "errors": result.get("error") if not result["success"] else None
-            }
-
-        elif filename.endswith((".xlsx", ".xls")):
-            excel_data = pd.read_excel(io.BytesIO(contents), sheet_name=None)
-            results = [await db.load_dataframe(df, table_name=sheet)
-                       for sheet, df in excel_data.items()]
-            load_result = {
-                "success": all(r["success"] for r in results),
-                "loaded_tables": [r["table"] for r in results if r["success"]],
-                "errors": [r.get("error") for r in results if not r["success"]],
-            }
-
-        elif filename.endswith(".db"):
-            tmp_file = None
-            try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".db") as tmp_file:
-                    tmp_file.write(contents)
-                    results = await db.import_from_db_file(tmp_file.name)
-            finally:
-                if tmp_file:
-                    os.unlink(tmp_file.name)
-            load_result = {"success": True, "loaded_tables": db.get_table_names(), "error": results.get("error")}
-
-        else:
+        if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
             raise HTTPException(status_code=400, detail="Unsupported file format")
+        mode = mode or ("replace" if truncate else "append")
+        key_columns = [name.strip() for name in (key or "").split(",") if name.strip()] or None
+        if mode not in LOAD_MODES:
+            raise HTTPException(status_code=400, detail=f"Unknown mode, expected one of {', '.join(LOAD_MODES)}")
+        if mode == "upsert" and not key_columns:
+            raise HTTPException(status_code=400, detail="Upsert needs the key columns that identify a row")
+
+        tmp_path = await save_upload(file)
+
+        if background:
+            job = job_manager.submit(user_id, db, tmp_path, file.filename, mode, key_columns)
+            tmp_path = None  # owned by the job from now on
+            return {"success": True, "message": "Upload accepted.", **job.to_dict()}
+
+        async with job_manager.lock_for(db):
+            load_result = await ingest_file(db, tmp_path, file.filename, mode=mode, key=key_columns)
 
         if not load_result["success"]:
             raise HTTPException(status_code=400, detail=str(load_result.get("errors", "Unknown error")))
@@ -159,97 +240,198 @@ async def upload_database(file: UploadFile = File(...), truncate: bool = Form(Tr
             "loaded_tables": load_result["loaded_tables"]
         }
 
+    except HTTPException:
+        raise
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON format.")
     except Exception as e:
-        print(f"Upload database error: {e}")
+        log.exception("upload failed")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 
-@app.get("/api/export-db")
-async def export_database(file_type: str = "json", user_id: str = Header(...)):
+@app.get("/api/upload-jobs/{job_id}")
+async def upload_job_status(job_id: str, user_id: str = Header(...)):
+    job = job_manager.get(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found.")
+    return {"success": True, **job.to_dict()}
+
+
+@app.post("/api/upload-jobs/{job_id}/cancel")
+async def cancel_upload_job(job_id: str, user_id: str = Header(...)):
+    job = job_manager.cancel(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found.")
+    return {"success": True, "message": "Cancellation requested.", **job.to_dict()}
+
+
+@app.get("/api/indexes")
+async def list_indexes(user_id: str = Header(...)):
     db = await get_user_database(user_id)
-    try:
-        if file_type == "db":
-            output = await db.export_to_db_binary()
-            return StreamingResponse(output, media_type="application/octet-stream", headers={
-                "Content-Disposition": "attachment; filename=byedb_export.db"
-            })
-        elif file_type == "sql":
-            output = await db.export_as_sql()
-            return StreamingResponse(output, media_type="application/octet-stream", headers={
-                "Content-Disposition": "attachment; filename=byedb_export.db"
-            })
-
-        export_result = await db.export_all_data()
-        if not export_result["success"]:
-            raise HTTPException(status_code=500, detail=export_result["error"])
-
-        data = export_result["data"]
-
-        if file_type == "json":
-            return {"success": True, "data": data}
-
-        if file_type == "csv":
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-                for table_name, rows in data.items():
-                    if not rows:
-                        continue
-                    df = pd.DataFrame(rows)
-                    csv_buffer = io.StringIO()
-                    df.to_csv(csv_buffer, index=False)
-                    zip_file.writestr(f"{table_name}.csv", csv_buffer.getvalue())
-            zip_buffer.seek(0)
-            return StreamingResponse(zip_buffer, media_type="application/zip", headers={
-                "Content-Disposition": "attachment; filename=exported_tables.zip"
-            })
-
-        if file_type == "excel":
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-                for table_name, rows in data.items():
-                    if not rows:
-                        continue
-                    df = pd.DataFrame(rows)
-                    df.to_excel(writer, sheet_name=table_name[:31], index=False)
-            output.seek(0)
-            return StreamingResponse(output,
-                                     media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                     headers={"Content-Disposition": "attachment; filename=exported_tables.xlsx"})
+    return {"success": True, **await db.index_report()}
 
-        raise HTTPException(status_code=400, detail="Unsupported file type.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/text-indexes")
+async def list_text_indexes(user_id: str = Header(...)):
+    db = await get_user_database(user_id)
+    return {"success": True, "indexes": db.text_indexes.report()}
 
-@app.get("/api/export-csv")
-async def export_csv(user_id: str = Header(...)):
+
+@app.post("/api/text-indexes")
+async def create_text_index(request: TextIndexRequest, user_id: str = Header(...)):
     db = await get_user_database(user_id)
-    try:
-        tables_result = await db.list_tables()
-        if not tables_result["success"]:
-            raise HTTPException(status_code=500, detail=tables_result["error"])
+    result = await db.create_text_index(request.table, request.columns)
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+
+@app.delete("/api/text-indexes/{table}")
+async def drop_text_index(table: str, user_id: str = Header(...)):
+    db = await get_user_database(user_id)
+    result = await db.drop_text_index(table)
+    if not result["success"]:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
 
-        table_names = [row["name"] for row in tables_result["data"]]
 
+@app.get("/api/table-samples")
+async def table_samples(user_id: str = Header(...)):
+    db = await get_user_database(user_id)
+    return {"success": True, "samples": db.table_samples.report()}
+
+
+@app.get("/api/schema-tables")
+async def schema_tables(question: str, user_id: str = Header(...)):
+    db = await get_user_database(user_id)
+    return {"success": True, "tables": db.schema_index.select(question),
+            "ranking": [{"table": table, "score": round(score, 3)} for table, score in db.schema_index.rank(question)]}
+
+
+@app.get("/api/table-profiles")
+async def table_profiles(user_id: str = Header(...)):
+    db = await get_user_database(user_id)
+    return {"success": True, "profiles": list(db.table_profiles.values()),
+            "sketches": [sketch.report() for sketch in db.table_sketches.values()]}
+
+
+EXPORT_FILE_TYPES = ("json", "csv", "excel", "db", "sql") + tuple(EXPORT_FORMATS)
+
+
+async def build_export(db: LocalSQLiteDatabase, file_type: str):
+    """Generates an export of the whole database. Returns (content, media type, download filename)."""
+    if file_type == "db":
+        output = await db.export_to_db_binary()
+        if output is None:
+            raise HTTPException(status_code=500, detail="Failed to export the database file.")
+        return output, "application/octet-stream", "byedb_export.db"
+    if file_type in EXPORT_FORMATS:
+        return await export_tables(db, file_type), "application/zip", f"exported_tables_{file_type}.zip"
+    if file_type == "sql":
+        return await db.export_as_sql(), "application/octet-stream", "byedb_export.db"
+
+    export_result = await db.export_all_data()
+    if not export_result["success"]:
+        raise HTTPException(status_code=500, detail=export_result["error"])
+
+    data = export_result["data"]
+
+    if file_type == "json":
+        return dumps_bytes({"success": True, "data": data}), "application/json", None
+
+    import pandas as pd
+
+    if file_type == "csv":
         zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for table in table_names:
-                query_result = await db.execute_sql(f"SELECT * FROM {table}")
-                if not query_result["success"]:
+        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for table_name, rows in data.items():
+                if not rows:
                     continue
-                output = io.StringIO()
-                writer = csv.DictWriter(output,
-                                        fieldnames=query_result["data"][0].keys() if query_result["data"] else [])
-                writer.writeheader()
-                writer.writerows(query_result["data"])
-                zipf.writestr(f"{table}.csv", output.getvalue())
-
+                df = pd.DataFrame(rows)
+                csv_buffer = io.StringIO()
+                df.to_csv(csv_buffer, index=False)
+                zip_file.writestr(f"{table_name}.csv", csv_buffer.getvalue())
         zip_buffer.seek(0)
-        return StreamingResponse(zip_buffer, media_type="application/x-zip-compressed", headers={
-            "Content-Disposition": "attachment; filename=exported_tables.zip"
-        })
+        return zip_buffer, "application/zip", "exported_tables.zip"
+
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        for table_name, rows in data.items():
+            if not rows:
+                continue
+            df = pd.DataFrame(rows)
+            df.to_excel(writer, sheet_name=table_name[:31], index=False)
+    output.seek(0)
+    return output, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "exported_tables.xlsx"
+
+
+async def build_csv_export(db: LocalSQLiteDatabase):
+    tables_result = await db.list_tables()
+    if not tables_result["success"]:
+        raise HTTPException(status_code=500, detail=tables_result["error"])
+
+    table_names = [row["name"] for row in tables_result["data"]]
+
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for table in table_names:
+            query_result = await db.query_sql(f"SELECT * FROM {table}", internal=True, columnar=True)
+            if not query_result["success"]:
+                continue
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(query_result["columns"])
+            writer.writerows(query_result["results"][0]["rows"])
+            zipf.writestr(f"{table}.csv", output.getvalue())
+
+    zip_buffer.seek(0)
+    return zip_buffer, "application/x-zip-compressed", "exported_tables.zip"
+
+
+async def cached_export(http_request: Request, user_id: str, key: str, build):
+    """
+    Serves an export from the session's cache while the database's data_version is unchanged and
+    builds it otherwise. Answers 304 Not Modified when If-None-Match names the export's ETag.
+    """
+    session = await user_context.get_session(user_id)
+    version = session.database.data_version
+    artifact = session.export_cache.get(key, version)
+    if artifact is None:
+        content, media_type, filename = await build(session.database)
+        artifact = ExportArtifact(version, media_type, filename).acquire()
+        await asyncio.to_thread(artifact.write, content)
+        session.export_cache.put(key, artifact)
+
+    headers = {"ETag": artifact.etag}
+    if artifact.matches(http_request.headers.get("if-none-match")):
+        artifact.release()
+        return Response(status_code=304, headers=headers)
+    headers["Content-Length"] = str(artifact.size)
+    if artifact.filename:
+        headers["Content-Disposition"] = f"attachment; filename={artifact.filename}"
+    return StreamingResponse(artifact.chunks(), media_type=artifact.media_type, headers=headers)
+
+
+@app.get("/api/export-db")
+async def export_database(http_request: Request, file_type: str = "json", user_id: str = Header(...)):
+    if file_type not in EXPORT_FILE_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type.")
+    try:
+        return await cached_export(http_request, user_id, f"export-db:{file_type}",
+                                   lambda db: build_export(db, file_type))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/export-csv")
+async def export_csv(http_request: Request, user_id: str = Header(...)):
+    try:
+        return await cached_export(http_request, user_id, "export-csv", build_csv_export)
     except Exception as e:
         raise HTTPException(status_code=500, detail=traceback.format_exception(e))
 
@@ -264,6 +446,19 @@ async def clear_memory(user_id: str = Header(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/question-cache")
+async def list_question_cache(user_id: str = Header(...)):
+    sql_expert = await get_user_agent(user_id)
+    return {"success": True, "questions": sql_expert.question_cache.report()}
+
+
+@app.delete("/api/question-cache")
+async def clear_question_cache(user_id: str = Header(...)):
+    sql_expert = await get_user_agent(user_id)
+    sql_expert.question_cache.clear()
+    return {"success": True, "message": "Question cache cleared."}
+
+
 @app.post("/api/clear-database")
 async def clear_database(user_id: str = Header(...)):
     try:
@@ -274,10 +469,29 @@ async def clear_database(user_id: str = Header(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+_warm_up_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    global _warm_up_task
+    startup.mark("ready")
+    log.info("server ready", extra={"fields": {"ms": startup.timings["ready"]}})
+    if startup.STARTUP_WARM_UP:
+        _warm_up_task = asyncio.create_task(asyncio.to_thread(startup.warm_up))
+
+
+@app.on_event("shutdown")
+async def close_sessions():
+    await user_context.close_all()
+    shutdown_pools()
+    shutdown_logging()
+
+
 @app.post("/api/delete-account")
 async def delete_account(user_id: str = Header(...)):
     try:
-        user_context.delete_user(user_id)
+        await user_context.delete_user(user_id)
         return {"success": True, "message": "User account and database deleted."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,142 @@
+import os
+import re
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from index_advisor import IDENTIFIER, table_aliases, unquote
+
+# Estimated row visits above which an agent query is not run (0 disables the cost guard)
+SQL_COST_MAX_ROWS = int(os.getenv("SQL_COST_MAX_ROWS", "50000000"))
+# Estimated row visits above which the query runs with a warning; joins without a usable
+# join condition above it are not run
+SQL_COST_WARN_ROWS = int(os.getenv("SQL_COST_WARN_ROWS", "5000000"))
+# LIMIT added to row-returning SELECTs estimated to return more rows than this (0 disables it)
+SQL_AUTO_LIMIT_ROWS = int(os.getenv("SQL_AUTO_LIMIT_ROWS", "1000"))
+
+_TABLE_STEP = re.compile(rf'^(SCAN|SEARCH) ({IDENTIFIER})(?: AS {IDENTIFIER})?(?: (.*))?$')
+_DERIVED = re.compile(rf'^(?:MATERIALIZE|CO-ROUTINE) ({IDENTIFIER})')
+_TEMP_B_TREE = re.compile(r'^USE TEMP B-TREE FOR')
+_LIMITED = re.compile(r'\bLIMIT\s+[^\s;]+(?:\s*(?:,|\bOFFSET\b)\s*[^\s;]+)?\s*;?\s*$', re.IGNORECASE)
+# Statements that return one row per group or value rather than per scanned row
+_SUMMARIZING = re.compile(r'\bGROUP\s+BY\b|\bDISTINCT\b|\b(?:COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT)\s*\(',
+                          re.IGNORECASE)
+_SELECT = re.compile(r'^\s*(?:SELECT|WITH|VALUES)\b', re.IGNORECASE)
+
+
+class CostEstimate:
+    """Estimated work of one SELECT from its EXPLAIN QUERY PLAN and the row counts of its tables."""
+
+    def __init__(self):
+        self.row_visits = 0
+        self.output_rows = 0
+        self.scans: List[Dict[str, Any]] = []
+        self.cartesian: List[Dict[str, Any]] = []
+
+
+def estimate_cost(plan: List[Tuple[int, int, str]], statement: str, table_rows: Dict[str, int]) -> CostEstimate:
+    """
+    Walks the plan tree. Table steps under one node are nested loops: a SCAN visits every row of its
+    table once per outer row and multiplies the rows flowing on, a SEARCH costs an index lookup per
+    outer row and keeps them (filters are not estimated, so output is an upper bound for scans).
+    Correlated subqueries run once per outer row. A SCAN that is not the outermost loop means SQLite
+    found no equality join condition to build an automatic index from: a cartesian join.
+    plan: (id, parent, notused, detail) rows; table_rows: row counts of the tables the statement reads.
+    """
+    aliases = table_aliases(statement)
+    children: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+    for node_id, parent, _, detail in plan:
+        children[parent].append((node_id, detail))
+    derived_rows: Dict[str, int] = {}
+    estimate = CostEstimate()
+
+    def rows_of(name: str) -> int:
+        name = unquote(name)
+        if name in derived_rows:
+            return derived_rows[name]
+        return table_rows.get(aliases.get(name, name), 1)
+
+    def walk(node: int) -> Tuple[int, int]:
+        visits, loops, outer_tables = 0, 1, []
+        nested, compound_rows = [], 0
+        for child, detail in children.get(node, []):
+            step = _TABLE_STEP.match(detail)
+            if step and step.group(2) != "CONSTANT":
+                kind, name = step.group(1), unquote(step.group(2))
+                rows = rows_of(name)
+                table = aliases.get(name, name)
+                if kind == "SCAN":
+                    visits += loops * rows
+                    if outer_tables and loops > 1 and rows > 1:
+                        estimate.cartesian.append({"tables": outer_tables + [table], "rows": loops * rows})
+                    estimate.scans.append({"table": table, "rows": rows, "times": loops})
+                    loops *= max(rows, 1)
+                else:
+                    if "AUTOMATIC" in (step.group(3) or ""):
+                        visits += rows  # the automatic index is built from a full scan first
+                    visits += loops * (int(math.log2(rows + 1)) + 1)
+                outer_tables.append(table)
+                continue
+            derived = _DERIVED.match(detail)
+            sub_visits, sub_rows = walk(child)
+            if derived:
+                derived_rows[unquote(derived.group(1))] = sub_rows
+                visits += sub_visits
+            elif _TEMP_B_TREE.match(detail):
+                visits += loops * (int(math.log2(loops + 1)) + 1)
+            elif detail.startswith("CORRELATED"):
+                nested.append(sub_visits)
+            else:
+                visits += sub_visits
+                if detail.startswith(("COMPOUND", "LEFT-MOST", "UNION", "INTERSECT", "EXCEPT")):
+                    compound_rows += sub_rows
+        if compound_rows and not outer_tables:
+            loops = compound_rows
+        visits += loops * sum(nested)
+        return visits, loops
+
+    estimate.row_visits, estimate.output_rows = walk(0)
+    return estimate
+
+
+def is_select(statement: str) -> bool:
+    return bool(_SELECT.match(statement))
+
+
+def add_limit(statement: str, output_rows: int, limit: int = SQL_AUTO_LIMIT_ROWS) -> Optional[str]:
+    """The statement with a LIMIT when it returns rows one by one, has none and may return more than limit rows."""
+    if not limit or output_rows <= limit or not is_select(statement):
+        return None
+    if _LIMITED.search(statement) or _SUMMARIZING.search(statement):
+        return None
+    return f"{statement.rstrip().rstrip(';').rstrip()}\nLIMIT {limit}"
+
+
+def review(estimate: CostEstimate, max_rows: int = SQL_COST_MAX_ROWS,
+           warn_rows: int = SQL_COST_WARN_ROWS) -> Tuple[bool, List[Dict[str, Any]]]:
+    """Whether the query may run, and the issues to report back to the model as rewrite hints."""
+    issues = []
+    allowed = True
+    for join in estimate.cartesian:
+        if join["rows"] <= warn_rows:
+            continue
+        allowed = False
+        issues.append({
+            "issue": "cartesian_join",
+            "tables": join["tables"],
+            "estimated_rows": join["rows"],
+            "hint": f"{join['tables'][-1]} is scanned in full for every row of {', '.join(join['tables'][:-1])}. "
+                    "Join on an equality condition (a.key = b.key), or aggregate each side before joining.",
+        })
+    if estimate.row_visits > warn_rows:
+        largest = sorted(estimate.scans, key=lambda scan: -scan["rows"] * scan["times"])[:3]
+        issues.append({
+            "issue": "expensive_query",
+            "estimated_row_visits": estimate.row_visits,
+            "full_scans": largest,
+            "hint": "Filter on indexed columns, aggregate instead of returning rows, or query a sample "
+                    "(e.g. WHERE rowid % 100 = 0) first.",
+        })
+        if estimate.row_visits > max_rows:
+            allowed = False
+    return allowed, issues
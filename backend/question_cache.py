@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from schema_index import terms, _stem
+from app_logging import get_logger
+
+log = get_logger("agent")
+
+# Answered questions kept per session for reuse (0 disables reuse)
+QUESTION_CACHE_SIZE = int(os.getenv("QUESTION_CACHE_SIZE", "200"))
+# Word overlap (Jaccard) with a previous question above which its SQL is offered to the model
+QUESTION_REUSE_SIMILARITY = float(os.getenv("QUESTION_REUSE_SIMILARITY", "0.6"))
+# Answer a question worded like a previous one by running its SQL again, without the LLM; only
+# the first question of a conversation, since a follow-up may depend on the turns before it
+QUESTION_REUSE_DIRECT = os.getenv("QUESTION_REUSE_DIRECT", "0") == "1"
+# Directory where each user's answered questions are kept across sessions (empty: memory only)
+QUESTION_CACHE_DIR = os.getenv("QUESTION_CACHE_DIR", "")
+
+REUSE_FUNCTIONS = ("query_sql", "plot_bar", "plot_pie")
+_WORD = re.compile(r'[a-z0-9]+')
+# Words that never change what a question asks
+_FILLER = frozenset("please the a an me can you could would kindly".split())
+
+
+def question_key(question: str) -> str:
+    """The question's words, lowercased and crudely stemmed, without punctuation or filler words."""
+    return " ".join(_stem(word) for word in _WORD.findall(question.lower()) if word not in _FILLER)
+
+
+def similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class SolvedQuestion:
+    __slots__ = ("question", "key", "terms", "function", "arguments", "schema", "created", "hits")
+
+    def __init__(self, question: str, function: str, arguments: Dict[str, Any], schema: Dict[str, List[List[str]]],
+                 created: Optional[float] = None, hits: int = 0):
+        self.question = question
+        self.key = question_key(question)
+        self.terms = set(terms(question))
+        self.function = function
+        self.arguments = arguments
+        self.schema = schema  # {table: [[column, declared type], ...]} of the tables the SQL reads
+        self.created = created or time.time()
+        self.hits = hits
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"question": self.question, "function": self.function, "arguments": self.arguments,
+                "schema": self.schema, "created": self.created, "hits": self.hits}
+
+
+class QuestionCache:
+    """
+    Questions a session answered with a successful read-only query, with that query and the columns of
+    the tables it reads. A new question worded the same (see question_key) on unchanged tables can be
+    answered by running the query again; a similar one gets the query as a worked example. Oldest
+    entries are dropped past `size`. With a `path`, entries are appended to a JSON lines file and
+    loaded back when the user's session is created again.
+    """
+
+    def __init__(self, path: Optional[str] = None, size: int = QUESTION_CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self.entries: "OrderedDict[str, SolvedQuestion]" = OrderedDict()
+        if path and self.enabled:
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            log.warning("question cache not loaded: %s", e)
+            return
+        for line in lines:
+            try:
+                self._keep(SolvedQuestion(**json.loads(line)))
+            except (ValueError, TypeError):
+                continue
+        if len(lines) > 2 * self.size:
+            self._rewrite()
+
+    def _keep(self, entry: SolvedQuestion):
+        self.entries.pop(entry.key, None)
+        self.entries[entry.key] = entry
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def _rewrite(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry.to_dict()) + "\n" for entry in self.entries.values())
+
+    def add(self, question: str, function: str, arguments: Dict[str, Any], schema: Dict[str, List[List[str]]]):
+        if not self.enabled or not question_key(question):
+            return
+        previous = self.entries.get(question_key(question))
+        entry = SolvedQuestion(question, function, arguments, schema, hits=previous.hits if previous else 0)
+        self._keep(entry)
+        if self.path:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry.to_dict()) + "\n")
+            except OSError as e:
+                log.warning("question cache not saved: %s", e)
+
+    def match(self, question: str) -> Optional[Tuple[SolvedQuestion, float]]:
+        """The entry worded the same (similarity 1.0), or else the most similar one above QUESTION_REUSE_SIMILARITY."""
+        if not self.entries:
+            return None
+        key = question_key(question)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key], 1.0
+        words = set(terms(question))
+        best, score = None, 0.0
+        for entry in self.entries.values():
+            current = similarity(words, entry.terms)
+            if current > score:
+                best, score = entry, current
+        if best is None or score < QUESTION_REUSE_SIMILARITY:
+            return None
+        return best, min(score, 0.99)  # the same words in another order or with other filler
+
+    def clear(self):
+        self.entries.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def report(self) -> List[Dict[str, Any]]:
+        return [entry.to_dict() for entry in reversed(self.entries.values())]
+
+
+def session_cache(user_id: str) -> QuestionCache:
+    """The question cache of a user, persisted under QUESTION_CACHE_DIR when it is set."""
+    if not QUESTION_CACHE_DIR:
+        return QuestionCache()
+    os.makedirs(QUESTION_CACHE_DIR, exist_ok=True)
+    name = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+    return QuestionCache(os.path.join(QUESTION_CACHE_DIR, f"{name}.jsonl"))
@@ -0,0 +1,280 @@
+"""
+Multi-process front router for the ByeDB API.
+
+Every user's database and agent live in the memory of one worker process, so requests are routed
+by consistent hashing of the user-id header: a user always reaches the same worker while the set
+of healthy workers is unchanged. Workers are uvicorn processes of main:app on local ports; the
+router restarts a worker that exits and takes it off the ring while it is down, which moves only
+that worker's users (their in-memory data does not move with them). Requires `httpx`.
+
+Usage:
+    python router.py --workers 4 --port 8000
+"""
+import os
+import sys
+import time
+import bisect
+import asyncio
+import hashlib
+import argparse
+import subprocess
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from fast_json import FastJSONResponse
+from app_logging import get_logger, setup_logging, shutdown_logging
+
+ROUTER_WORKERS = int(os.getenv("ROUTER_WORKERS", str(os.cpu_count() or 1)))
+ROUTER_WORKER_BASE_PORT = int(os.getenv("ROUTER_WORKER_BASE_PORT", "8100"))
+# Points per worker on the hash ring; more points spread users more evenly
+ROUTER_VNODES = int(os.getenv("ROUTER_VNODES", "64"))
+ROUTER_HEALTH_SECONDS = float(os.getenv("ROUTER_HEALTH_SECONDS", "2"))
+ROUTER_TIMEOUT_SECONDS = float(os.getenv("ROUTER_TIMEOUT_SECONDS", "300"))
+
+USER_HEADER = "user-id"
+# Connection-level headers that must not be forwarded
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "te", "upgrade", "host",
+               "proxy-authenticate", "proxy-authorization", "trailer"}
+
+log = get_logger("router")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring; adding or removing a node only remaps the keys of that node."""
+
+    def __init__(self, vnodes: int = ROUTER_VNODES):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: List[str] = []
+
+    def add(self, node: str):
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str):
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def nodes(self) -> set:
+        return set(self._owners)
+
+    def get(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class Worker:
+    def __init__(self, worker_id: int, host: str, port: int):
+        self.name = f"worker-{worker_id}"
+        self.worker_id = worker_id
+        self.host = host
+        self.port = port
+        self.process: Optional[subprocess.Popen] = None
+        self.client = httpx.AsyncClient(base_url=f"http://{host}:{port}",
+                                        timeout=httpx.Timeout(ROUTER_TIMEOUT_SECONDS, connect=5))
+        self.healthy = False
+        self.started_at = 0.0
+        self.restarts = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = 0
+
+    def start(self):
+        env = {**os.environ, "WORKER_ID": str(self.worker_id)}
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", self.host, "--port", str(self.port)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+        self.started_at = time.time()
+
+    def exited(self) -> bool:
+        return self.process is None or self.process.poll() is not None
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def stats(self) -> dict:
+        return {
+            "worker": self.name,
+            "port": self.port,
+            "pid": self.process.pid if self.process else None,
+            "healthy": self.healthy,
+            "restarts": self.restarts,
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+        }
+
+
+class Router:
+    def __init__(self, workers: int, host: str = "127.0.0.1", base_port: int = ROUTER_WORKER_BASE_PORT):
+        self.workers: Dict[str, Worker] = {}
+        for i in range(workers):
+            worker = Worker(i, host, base_port + i)
+            self.workers[worker.name] = worker
+        self.ring = HashRing()
+        self._monitor: Optional[asyncio.Task] = None
+
+    async def start(self):
+        for worker in self.workers.values():
+            worker.start()
+        await self.check_workers()
+        self._monitor = asyncio.create_task(self._monitor_loop())
+
+    async def stop(self):
+        if self._monitor:
+            self._monitor.cancel()
+        for worker in self.workers.values():
+            await worker.client.aclose()
+            worker.stop()
+
+    def _set_healthy(self, worker: Worker, healthy: bool):
+        if healthy == worker.healthy:
+            return
+        worker.healthy = healthy
+        if healthy:
+            self.ring.add(worker.name)
+            log.info("worker joined the ring", extra={"fields": {"worker": worker.name}})
+        else:
+            self.ring.remove(worker.name)
+            log.warning("worker left the ring", extra={"fields": {"worker": worker.name}})
+
+    async def _check(self, worker: Worker):
+        if worker.exited():
+            self._set_healthy(worker, False)
+            if worker.process is not None:
+                log.warning("worker exited, restarting", extra={"fields": {
+                    "worker": worker.name, "code": worker.process.returncode}})
+                worker.restarts += 1
+            worker.start()
+            return
+        try:
+            response = await worker.client.get("/health", timeout=ROUTER_HEALTH_SECONDS)
+            self._set_healthy(worker, response.status_code == 200)
+        except httpx.HTTPError:
+            self._set_healthy(worker, False)
+
+    async def check_workers(self):
+        await asyncio.gather(*(self._check(worker) for worker in self.workers.values()))
+
+    async def _monitor_loop(self):
+        while True:
+            await asyncio.sleep(ROUTER_HEALTH_SECONDS)
+            await self.check_workers()
+
+    def pick(self, user_id: Optional[str]) -> Optional[Worker]:
+        """Worker owning the user on the ring; requests without a user go to the least busy worker."""
+        if user_id:
+            name = self.ring.get(user_id)
+            return self.workers[name] if name else None
+        healthy = [worker for worker in self.workers.values() if worker.healthy]
+        return min(healthy, key=lambda worker: worker.in_flight) if healthy else None
+
+    async def forward(self, request: Request):
+        user_id = request.headers.get(USER_HEADER)
+        headers = [(key, value) for key, value in request.headers.items() if key.lower() not in HOP_HEADERS]
+        # Uploads are streamed through. A refused connection never reached the worker and has not
+        # read the body yet, so the request is safe to route again
+        for _ in range(2):
+            worker = self.pick(user_id)
+            if worker is None:
+                return FastJSONResponse({"success": False, "error": "No worker available."}, status_code=503)
+            upstream = worker.client.build_request(request.method, request.url.path, params=request.url.query,
+                                                   headers=headers, content=request.stream())
+            worker.requests += 1
+            worker.in_flight += 1
+            try:
+                response = await worker.client.send(upstream, stream=True)
+            except httpx.ConnectError:
+                worker.in_flight -= 1
+                worker.errors += 1
+                self._set_healthy(worker, False)
+                continue
+            except httpx.HTTPError as e:
+                worker.in_flight -= 1
+                worker.errors += 1
+                return FastJSONResponse({"success": False, "error": f"Worker error: {e}"}, status_code=502)
+
+            async def release(response=response, worker=worker):
+                await response.aclose()
+                worker.in_flight -= 1
+
+            response_headers = {key: value for key, value in response.headers.items()
+                                if key.lower() not in HOP_HEADERS}
+            return StreamingResponse(response.aiter_raw(), status_code=response.status_code,
+                                     headers=response_headers, background=BackgroundTask(release))
+        return FastJSONResponse({"success": False, "error": "No worker available."}, status_code=503)
+
+    async def stats(self) -> dict:
+        """Router counters per worker, with each healthy worker's own /api/stats."""
+        async def worker_stats(worker: Worker) -> dict:
+            entry = worker.stats()
+            if worker.healthy:
+                try:
+                    entry["server"] = (await worker.client.get("/api/stats", timeout=ROUTER_HEALTH_SECONDS)).json()
+                except (httpx.HTTPError, ValueError):
+                    entry["server"] = None
+            return entry
+
+        workers = await asyncio.gather(*(worker_stats(worker) for worker in self.workers.values()))
+        return {"workers": workers, "ring": sorted(self.ring.nodes())}
+
+
+def create_app(workers: int = ROUTER_WORKERS, base_port: int = ROUTER_WORKER_BASE_PORT) -> FastAPI:
+    router = Router(workers, base_port=base_port)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        setup_logging()
+        await router.start()
+        yield
+        await router.stop()
+        shutdown_logging()
+
+    app = FastAPI(title="ByeDB Router", lifespan=lifespan, default_response_class=FastJSONResponse)
+    app.state.router = router
+
+    @app.get("/api/workers")
+    async def worker_stats():
+        return await router.stats()
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
+    async def proxy(request: Request):
+        return await router.forward(request)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=ROUTER_WORKERS, help="Worker processes to run")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--worker-port", type=int, default=ROUTER_WORKER_BASE_PORT,
+                        help="Port of the first worker; the others use the following ports")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.workers, args.worker_port), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os
+import re
+import math
+import sqlite3
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Tables whose schema goes into the agent prompt per question; smaller databases are listed whole
+SCHEMA_TOP_K = int(os.getenv("SCHEMA_TOP_K", "8"))
+# Columns listed per table in the prompt
+SCHEMA_PROMPT_COLUMNS = int(os.getenv("SCHEMA_PROMPT_COLUMNS", "40"))
+_VALUES_PER_COLUMN = 20
+_MAX_VALUE_CHARS = 64
+# Term weights of the parts of a table's document
+_NAME_WEIGHT, _COLUMN_WEIGHT, _VALUE_WEIGHT = 3, 2, 1
+# BM25 parameters
+_K1, _B = 1.2, 0.75
+
+_WORD = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+')
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from give has have how i in is it its list many me much my "
+    "of on or per show that the their them there these this to total was were what when where which who "
+    "with all each every get find".split())
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _stem(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def terms(text: str) -> List[str]:
+    """Lowercased, crudely stemmed words of a text; snake_case and camelCase identifiers are split."""
+    words = (_stem(word.lower()) for word in _WORD.findall(text))
+    return [word for word in words if word not in _STOPWORDS]
+
+
+class _TableDoc:
+    def __init__(self, columns: List[Tuple[str, str]], references: List[str], counts: Counter):
+        self.columns = columns
+        self.references = references
+        self.counts = counts
+        self.length = sum(counts.values())
+
+
+class SchemaIndex:
+    """
+    BM25 index over the tables of one database, for picking the tables a question needs so the prompt
+    stays about the same size however many tables there are. Each table is a document of its name,
+    column names and a few text values from its sample, weighted in that order. update() re-reads
+    only the tables a write touched; document frequencies are adjusted as documents come and go.
+    """
+
+    def __init__(self):
+        self.docs: Dict[str, _TableDoc] = {}
+        self.df: Counter = Counter()
+        self._total_length = 0
+
+    def _remove(self, table: str):
+        doc = self.docs.pop(table, None)
+        if doc is None:
+            return
+        for term in doc.counts:
+            self.df[term] -= 1
+            if not self.df[term]:
+                del self.df[term]
+        self._total_length -= doc.length
+
+    def _values(self, raw_conn: sqlite3.Connection, table: str, columns: List[str],
+                sample_schema: Optional[str]) -> List[str]:
+        source = f"main.{_quote(table)}"
+        if sample_schema and raw_conn.execute(f"SELECT 1 FROM {sample_schema}.sqlite_master WHERE name = ?",
+                                              (table,)).fetchone():
+            source = f"{sample_schema}.{_quote(table)}"
+        values = []
+        for column in columns:
+            values.extend(value for (value,) in raw_conn.execute(
+                f"SELECT DISTINCT {_quote(column)} FROM (SELECT {_quote(column)} FROM {source} LIMIT 200) "
+                f"WHERE typeof({_quote(column)}) = 'text' AND length({_quote(column)}) <= {_MAX_VALUE_CHARS} "
+                f"LIMIT {_VALUES_PER_COLUMN}"))
+        return values
+
+    def _index_table(self, raw_conn: sqlite3.Connection, table: str, sample_schema: Optional[str]):
+        self._remove(table)
+        columns = [(row[1], row[2] or "") for row in
+                   raw_conn.execute("SELECT * FROM pragma_table_info(?, 'main')", (table,))]
+        if not columns or table.startswith("sqlite_"):
+            return
+        references = list(dict.fromkeys(row[2] for row in
+                                         raw_conn.execute("SELECT * FROM pragma_foreign_key_list(?, 'main')", (table,))))
+        counts = Counter()
+        for term in terms(table):
+            counts[term] += _NAME_WEIGHT
+        for name, _ in columns:
+            for term in terms(name):
+                counts[term] += _COLUMN_WEIGHT
+        for value in self._values(raw_conn, table, [name for name, _ in columns], sample_schema):
+            for term in terms(value):
+                counts[term] += _VALUE_WEIGHT
+        doc = self.docs[table] = _TableDoc(columns, references, counts)
+        self.df.update(counts.keys())
+        self._total_length += doc.length
+
+    def update(self, raw_conn: sqlite3.Connection, tables: Optional[Iterable[str]] = None,
+               sample_schema: Optional[str] = None):
+        """
+        Runs on the connection thread after writes: re-indexes the given tables, or every table when
+        None, dropping those that no longer exist. sample_schema: where table samples are kept.
+        """
+        if tables is None:
+            for table in list(self.docs):
+                self._remove(table)
+            tables = [name for (name,) in raw_conn.execute(
+                "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        for table in tables:
+            self._index_table(raw_conn, table, sample_schema)
+
+    def rank(self, question: str) -> List[Tuple[str, float]]:
+        """(table, BM25 score) of the tables matching any word of the question, best first."""
+        docs = list(self.docs.items())
+        if not docs:
+            return []
+        average = max(self._total_length / len(docs), 1)
+        scores = []
+        query = set(terms(question))
+        for table, doc in docs:
+            score = 0.0
+            for term in query:
+                count = doc.counts.get(term)
+                if not count:
+                    continue
+                df = self.df[term]
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * count * (_K1 + 1) / (count + _K1 * (1 - _B + _B * doc.length / average))
+            if score > 0:
+                scores.append((table, score))
+        return sorted(scores, key=lambda item: -item[1])
+
+    def select(self, question: str, k: int = SCHEMA_TOP_K, previous: Iterable[str] = ()) -> List[str]:
+        """
+        Tables for the prompt: all of them when there are at most k, otherwise the k best ranked plus
+        the tables they reference by foreign key. A question matching no table (a follow-up such as
+        "and last year?") keeps the previous selection.
+        """
+        if len(self.docs) <= k:
+            return list(self.docs)
+        selected = [table for table, _ in self.rank(question)[:k]]
+        if not selected:
+            selected = [table for table in previous if table in self.docs] or list(self.docs)[:k]
+        for table in list(selected):
+            doc = self.docs.get(table)
+            for referenced in doc.references if doc else []:
+                if referenced in self.docs and referenced not in selected:
+                    selected.append(referenced)
+        return selected
+
+    def prompt(self, tables: List[str], max_columns: int = SCHEMA_PROMPT_COLUMNS) -> str:
+        """One line per table: name(column type, ...)."""
+        lines = []
+        for table in tables:
+            doc = self.docs.get(table)
+            if doc is None:
+                continue
+            columns = [f"{name} {declared}".rstrip() for name, declared in doc.columns[:max_columns]]
+            if len(doc.columns) > max_columns:
+                columns.append(f"... {len(doc.columns) - max_columns} more")
+            line = f"- {table}({', '.join(columns)})"
+            if doc.references:
+                line += f" references {', '.join(doc.references)}"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,286 @@
+import os
+import math
+import random
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Column sketches built while tables are loaded, for approximate answers in milliseconds
+SKETCHES_ENABLED = os.getenv("SKETCHES_ENABLED", "1") == "1"
+# Smaller tables are not sketched: exact queries on them are fast enough
+SKETCH_MIN_ROWS = int(os.getenv("SKETCH_MIN_ROWS", "100000"))
+# HyperLogLog registers are 2^precision; relative standard error 1.04 / sqrt(2^precision)
+SKETCH_HLL_PRECISION = int(os.getenv("SKETCH_HLL_PRECISION", "14"))
+# Items per level of the quantile sketch; more items per level means smaller rank errors
+SKETCH_QUANTILE_K = int(os.getenv("SKETCH_QUANTILE_K", "1000"))
+# Count-min counters per row (overcount at most e / width of all values) and rows (failure odds e^-depth)
+SKETCH_CM_WIDTH = int(os.getenv("SKETCH_CM_WIDTH", "2048"))
+SKETCH_CM_DEPTH = int(os.getenv("SKETCH_CM_DEPTH", "4"))
+SKETCH_HEAVY_CANDIDATES = int(os.getenv("SKETCH_HEAVY_CANDIDATES", "64"))
+
+SKETCH_KINDS = ("distinct", "quantiles", "top")
+# Odd multipliers giving the count-min rows independent views of one 64-bit hash
+_CM_SALTS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+             0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9)
+
+
+def _hash(values: "pd.Index") -> "np.ndarray":
+    """64-bit hashes of values, stable across chunks and loads."""
+    import pandas as pd
+    try:
+        return pd.util.hash_array(values.to_numpy())
+    except TypeError:
+        return pd.util.hash_array(values.astype(str).to_numpy())
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = SKETCH_HLL_PRECISION):
+        import numpy as np
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: "np.ndarray"):
+        import numpy as np
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        # Rank: position of the first 1 bit in the 32 bits after the register index
+        window = ((hashes >> np.uint64(32 - self.precision)) & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        _, bit_length = np.frexp(window)
+        np.maximum.at(self.registers, index, (33 - bit_length).astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog"):
+        import numpy as np
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    @property
+    def relative_error(self) -> float:
+        """Two standard errors, about a 95% interval."""
+        return 2 * 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self) -> float:
+        import numpy as np
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / float(np.sum(np.exp2(-self.registers.astype(np.float64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # linear counting is more accurate for small cardinalities
+        return raw
+
+
+class QuantileSketch:
+    """
+    KLL-style compactor levels: an item at level h stands for 2^h values. A level over k items is
+    sorted and every other item (random offset) moves up. Each compaction at level h moves the rank
+    of any value by at most 2^h, so their sum bounds the rank error of every answer.
+    """
+
+    def __init__(self, k: int = SKETCH_QUANTILE_K):
+        import numpy as np
+        self.k = k
+        self.levels: List["np.ndarray"] = [np.empty(0)]
+        self.count = 0
+        self.error_weight = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, values: "np.ndarray"):
+        import numpy as np
+        if not len(values):
+            return
+        self.count += len(values)
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+
+    def _compact(self):
+        import numpy as np
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.k:
+                level = np.sort(level)
+                odd = len(level) % 2
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], level[:len(level) - odd][random.randint(0, 1)::2]])
+                self.levels[h] = level[len(level) - odd:]
+                self.error_weight += 1 << h
+            h += 1
+
+    def merge(self, other: "QuantileSketch"):
+        import numpy as np
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.count += other.count
+        self.error_weight += other.error_weight
+        for bound, pick in (("min", min), ("max", max)):
+            values = [v for v in (getattr(self, bound), getattr(other, bound)) if v is not None]
+            setattr(self, bound, pick(values) if values else None)
+        self._compact()
+
+    @property
+    def rank_error(self) -> float:
+        return self.error_weight / self.count if self.count else 0.0
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        import numpy as np
+        if not self.count:
+            return [None for _ in qs]
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 1 << h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        answers = []
+        for q in qs:
+            if q <= 0:
+                answers.append(self.min)
+            elif q >= 1:
+                answers.append(self.max)
+            else:
+                index = min(int(np.searchsorted(cumulative, q * cumulative[-1])), len(order) - 1)
+                answers.append(float(values[order[index]]))
+        return answers
+
+
+class CountMin:
+    """Count-min sketch of value frequencies, with the most frequent values seen kept as candidates."""
+
+    def __init__(self, width: int = SKETCH_CM_WIDTH, depth: int = SKETCH_CM_DEPTH,
+                 candidates: int = SKETCH_HEAVY_CANDIDATES):
+        import numpy as np
+        self.width = width
+        self.depth = min(depth, len(_CM_SALTS))
+        self.table = np.zeros((self.depth, width), dtype=np.int64)
+        self.total = 0
+        self.max_candidates = candidates
+        self.candidates: Dict[Any, int] = {}  # value -> hash
+
+    def _cells(self, hashes: "np.ndarray") -> List["np.ndarray"]:
+        import numpy as np
+        return [((hashes * np.uint64(salt)) >> np.uint64(32)) % np.uint64(self.width) for salt in _CM_SALTS[:self.depth]]
+
+    def add_counts(self, counts: "pd.Series", hashes: "np.ndarray"):
+        """counts: occurrences of each distinct value of a chunk; hashes: the hashes of counts.index."""
+        import numpy as np
+        weights = counts.to_numpy().astype(np.int64)
+        for row, cells in enumerate(self._cells(hashes)):
+            np.add.at(self.table[row], cells.astype(np.int64), weights)
+        self.total += int(weights.sum())
+        top = np.argsort(-weights, kind="stable")[:self.max_candidates]
+        for i in top:
+            self.candidates[counts.index[i]] = int(hashes[i])
+        self._trim()
+
+    def _estimates(self, hashes: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+        return np.min([self.table[row][cells.astype(np.int64)] for row, cells in enumerate(self._cells(hashes))], axis=0)
+
+    def _trim(self):
+        import numpy as np
+        if len(self.candidates) <= self.max_candidates:
+            return
+        values = list(self.candidates)
+        estimates = self._estimates(np.array(list(self.candidates.values()), dtype=np.uint64))
+        keep = np.argsort(-estimates, kind="stable")[:self.max_candidates]
+        self.candidates = {values[i]: self.candidates[values[i]] for i in keep}
+
+    def merge(self, other: "CountMin"):
+        self.table += other.table
+        self.total += other.total
+        self.candidates.update(other.candidates)
+        self._trim()
+
+    @property
+    def max_overcount(self) -> int:
+        return math.ceil(math.e / self.width * self.total)
+
+    def top(self, k: int) -> List[List[Any]]:
+        import numpy as np
+        if not self.candidates:
+            return []
+        values = list(self.candidates)
+        estimates = self._estimates(np.array(list(self.candidates.values()), dtype=np.uint64))
+        order = np.argsort(-estimates, kind="stable")[:k]
+        return [[values[i].item() if hasattr(values[i], "item") else values[i], int(estimates[i])] for i in order]
+
+
+class ColumnSketch:
+    """Distinct count, quantile and heavy hitter sketches of one column, fed chunk by chunk."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.values = 0
+        self.distinct = HyperLogLog()
+        self.heavy = CountMin()
+        # Dropped at the first chunk that is not numeric
+        self.quantiles: Optional[QuantileSketch] = QuantileSketch()
+
+    def add(self, counts: "pd.Series", numeric: Optional["pd.Series"]):
+        """counts: value_counts() of the chunk's non-null values; numeric: their numeric view, if any."""
+        import numpy as np
+        hashes = _hash(counts.index)
+        self.values += int(counts.sum())
+        self.distinct.add_hashes(hashes)
+        self.heavy.add_counts(counts, hashes)
+        if numeric is None:
+            self.quantiles = None
+        elif self.quantiles is not None:
+            self.quantiles.add(numeric.to_numpy(dtype=np.float64))
+
+    def merge(self, other: "ColumnSketch"):
+        self.values += other.values
+        self.distinct.merge(other.distinct)
+        self.heavy.merge(other.heavy)
+        if self.quantiles is None or other.quantiles is None:
+            self.quantiles = None
+        else:
+            self.quantiles.merge(other.quantiles)
+
+    def answer(self, kind: str, q: Optional[List[float]] = None, k: int = 10) -> Dict[str, Any]:
+        """Approximate statistic with its error bound. Raises ValueError for kinds the column cannot answer."""
+        if kind == "distinct":
+            estimate = self.distinct.estimate()
+            error = self.distinct.relative_error
+            return {"distinct": round(estimate), "low": math.floor(estimate * (1 - error)),
+                    "high": math.ceil(estimate * (1 + error)),
+                    "error": f"within ±{error:.1%} with about 95% confidence"}
+        if kind == "quantiles":
+            if self.quantiles is None:
+                raise ValueError(f"Column {self.name} is not numeric; quantiles are not available.")
+            q = q or [0.25, 0.5, 0.75]
+            if any(not 0 <= p <= 1 for p in q):
+                raise ValueError("Quantiles must be between 0 and 1.")
+            rank_error = self.quantiles.rank_error
+            return {"quantiles": [{"q": p, "value": v} for p, v in zip(q, self.quantiles.quantiles(q))],
+                    "min": self.quantiles.min, "max": self.quantiles.max,
+                    "error": f"each value's rank is within ±{rank_error:.2%} of the requested quantile (guaranteed)"}
+        if kind == "top":
+            overcount = self.heavy.max_overcount
+            return {"top": self.heavy.top(k), "values": self.values,
+                    "error": f"counts are at most {overcount} too high, with probability "
+                             f"{1 - math.exp(-self.heavy.depth):.0%}; never too low"}
+        raise ValueError(f"Unknown kind '{kind}', expected one of {', '.join(SKETCH_KINDS)}.")
+
+    def nbytes(self) -> int:
+        size = self.distinct.registers.nbytes + self.heavy.table.nbytes
+        if self.quantiles is not None:
+            size += sum(level.nbytes for level in self.quantiles.levels)
+        return size
+
+
+class TableSketch:
+    """Column sketches of one table, valid until the table is written."""
+
+    def __init__(self, table: str, columns: Dict[str, ColumnSketch], rows: int):
+        self.table = table
+        self.columns = columns
+        self.rows = rows
+
+    def report(self) -> Dict[str, Any]:
+        return {"table": self.table, "rows": self.rows, "columns": list(self.columns),
+                "bytes": sum(sketch.nbytes() for sketch in self.columns.values())}
@@ -0,0 +1,113 @@
+"""
+Startup timing and background warm-up for the API.
+
+Heavy modules (pandas, matplotlib, the LLM SDKs, pyarrow) are imported on first use so the server
+answers /health quickly after a cold start; warm_up() then loads them in a thread after startup.
+
+Run as a script to get the import time of each package and check it against a budget:
+    python startup.py --budget-ms 1500
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from app_logging import get_logger
+
+_started = time.perf_counter()
+
+STARTUP_WARM_UP = os.getenv("STARTUP_WARM_UP", "1") == "1"
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+log = get_logger("api")
+
+timings: Dict[str, float] = {}
+
+
+def mark(step: str):
+    """Records the milliseconds from the first import of this module to the named step."""
+    timings[step] = round((time.perf_counter() - _started) * 1000, 1)
+
+
+def _import_pandas():
+    import pandas  # noqa: F401
+
+
+def _warm_charts():
+    from chart_manager import cm
+    cm.warm_up()
+
+
+def _warm_llm():
+    from llm_centralised import llmCentral
+    llmCentral.warm_up()
+
+
+WARM_UP_STEPS = [("pandas", _import_pandas), ("charts", _warm_charts), ("llm", _warm_llm)]
+
+
+def warm_up():
+    """Loads what the first requests would otherwise pay for. Runs in a worker thread after startup."""
+    for name, step in WARM_UP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            log.warning("warm-up step %s failed: %s", name, e)
+        timings[f"warm_up_{name}"] = round((time.perf_counter() - start) * 1000, 1)
+    mark("warm")
+    log.info("warm-up finished", extra={"fields": dict(timings)})
+
+
+# ---- Import time report ----
+
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)')
+
+
+def import_times(module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Imports the module in a fresh interpreter with -X importtime. Returns its total import time and
+    the self time of every top-level package it pulled in, both in milliseconds.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    per_package: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        per_package[name.split(".")[0]] += int(self_us) / 1000
+        if name == module and len(indent) == 1:
+            total = int(cumulative_us) / 1000
+    return total, sorted(per_package.items(), key=lambda item: -item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Fail above this import time")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    args = parser.parse_args()
+
+    total, packages = import_times(args.module)
+    print(f"{'package':<32}{'ms':>10}")
+    print("-" * 42)
+    for name, ms in packages[:args.top]:
+        print(f"{name:<32}{ms:>10.1f}")
+    print("-" * 42)
+    print(f"{'import ' + args.module:<32}{total:>10.1f}   budget {args.budget_ms:.0f} ms")
+    if total > args.budget_ms:
+        print("Over budget.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
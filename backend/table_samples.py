@@ -0,0 +1,154 @@
+import os
+import re
+import math
+import random
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+# Rows kept in the random sample of each table (0 disables samples)
+TABLE_SAMPLE_ROWS = int(os.getenv("TABLE_SAMPLE_ROWS", "100"))
+# Schema the samples are attached as: SELECT * FROM samples."orders"
+SAMPLES_SCHEMA = "samples"
+ROWID_CHUNK = 10_000
+
+_CREATES_OR_DROPS = re.compile(r'\b(?:CREATE|DROP)\s+TABLE\b', re.IGNORECASE)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _unit() -> float:
+    """Uniform in (0, 1)."""
+    return random.random() or 0.5
+
+
+class Reservoir:
+    """
+    Uniform random sample of the row ids of one table (reservoir sampling, Algorithm L). Row ids are
+    offered in increasing order as rows are appended; last_rowid is the tail bookmark new rows are
+    read from, and skips are drawn ahead so most offered row ids cost nothing.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.rowids: List[int] = []
+        self.seen = 0
+        self.first_rowid: Optional[int] = None
+        self.last_rowid = 0
+        self._w = 1.0
+        self._next = 0
+
+    def _skip(self):
+        self._w *= math.exp(math.log(_unit()) / self.size)
+        self._next += math.floor(math.log(_unit()) / math.log(1 - self._w)) + 1
+
+    def offer(self, rowids: List[int]):
+        start = 0
+        while len(self.rowids) < self.size and start < len(rowids):
+            self.rowids.append(rowids[start])
+            start += 1
+            if len(self.rowids) == self.size:
+                self._next = self.seen + start - 1
+                self._skip()
+        while len(self.rowids) == self.size and self._next < self.seen + len(rowids):
+            self.rowids[random.randrange(self.size)] = rowids[self._next - self.seen]
+            self._skip()
+        self.seen += len(rowids)
+        if rowids:
+            self.last_rowid = rowids[-1]
+
+    def discard(self, rowids: Iterable[int]):
+        gone = set(rowids)
+        self.rowids = [rowid for rowid in self.rowids if rowid not in gone]
+
+
+class TableSamples:
+    """
+    Per-database random samples and head/tail bookmarks of every table, kept as small copies in the
+    attached SAMPLES_SCHEMA so queries for example rows never scan or sort the table. After each
+    write, sync() reads only the row ids appended past each table's tail bookmark, drops sampled
+    rows that were deleted and re-copies the sampled rows (also picking up updates); a table whose
+    sample lost rows it could replace is sampled again from scratch.
+    """
+
+    def __init__(self, size: int = TABLE_SAMPLE_ROWS):
+        self.size = size
+        self.tables: Dict[str, Reservoir] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def touched(self, raw_conn: sqlite3.Connection, statements: List[str], known: Iterable[str] = ()) -> Dict[str, bool]:
+        """
+        Tables the statements may have written, and whether they may have been dropped or recreated.
+        known: other table names that existed before the statements ran.
+        """
+        names = {name for (name,) in raw_conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+        touched = {}
+        for table in names | set(self.tables) | set(known):
+            pattern = re.compile(rf'\b{re.escape(table)}\b', re.IGNORECASE)
+            matching = [statement for statement in statements if pattern.search(statement)]
+            if matching:
+                touched[table] = any(_CREATES_OR_DROPS.search(statement) for statement in matching)
+        return touched
+
+    def all_tables(self, raw_conn: sqlite3.Connection) -> List[str]:
+        names = [name for (name,) in raw_conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        return list(dict.fromkeys(names + list(self.tables)))
+
+    def sync(self, raw_conn: sqlite3.Connection, tables: Dict[str, bool]):
+        """Runs on the connection thread, in one transaction. tables: {table: reset}."""
+        raw_conn.execute("BEGIN")
+        try:
+            for table, reset in tables.items():
+                if reset:
+                    self.tables.pop(table, None)
+                self._sync_table(raw_conn, table)
+            raw_conn.commit()
+        except BaseException:
+            raw_conn.rollback()
+            raise
+
+    def _sync_table(self, raw_conn: sqlite3.Connection, table: str):
+        source, sample = f"main.{_quote(table)}", f"{SAMPLES_SCHEMA}.{_quote(table)}"
+        exists = raw_conn.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                                  (table,)).fetchone()
+        if not exists or table.startswith("sqlite_"):
+            self.tables.pop(table, None)
+            raw_conn.execute(f"DROP TABLE IF EXISTS {sample}")
+            return
+
+        reservoir = self.tables.get(table)
+        if reservoir is not None and reservoir.rowids:
+            kept = {rowid for (rowid,) in raw_conn.execute(
+                f"SELECT rowid FROM {source} WHERE rowid IN ({','.join(map(str, reservoir.rowids))})")}
+            if len(kept) < len(reservoir.rowids):
+                reservoir.discard([rowid for rowid in reservoir.rowids if rowid not in kept])
+                outside = raw_conn.execute(
+                    f"SELECT 1 FROM {source} WHERE rowid NOT IN ({','.join(map(str, kept)) or 'NULL'}) LIMIT 1")
+                if outside.fetchone():
+                    reservoir = None  # the deleted rows have to be replaced by others: sample again
+        if reservoir is None:
+            reservoir = self.tables[table] = Reservoir(self.size)
+        try:
+            cursor = raw_conn.execute(f"SELECT rowid FROM {source} WHERE rowid > ? ORDER BY rowid",
+                                      (reservoir.last_rowid,))
+        except sqlite3.OperationalError:
+            self.tables.pop(table, None)  # WITHOUT ROWID table
+            raw_conn.execute(f"DROP TABLE IF EXISTS {sample}")
+            return
+        while chunk := cursor.fetchmany(ROWID_CHUNK):
+            reservoir.offer([rowid for (rowid,) in chunk])
+        reservoir.first_rowid = raw_conn.execute(f"SELECT min(rowid) FROM {source}").fetchone()[0]
+
+        raw_conn.execute(f"DROP TABLE IF EXISTS {sample}")
+        raw_conn.execute(f"CREATE TABLE {sample} AS SELECT * FROM {source} "
+                         f"WHERE rowid IN ({','.join(map(str, reservoir.rowids)) or 'NULL'}) ORDER BY rowid")
+
+    def report(self) -> Dict[str, Any]:
+        return {table: {"sample_rows": len(reservoir.rowids), "rows_seen": reservoir.seen,
+                        "first_rowid": reservoir.first_rowid, "last_rowid": reservoir.last_rowid}
+                for table, reservoir in self.tables.items()}
@@ -0,0 +1,47 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_sqlite import LocalSQLiteDatabase
+
+
+@pytest.fixture
+def run():
+    """Runs a coroutine function against a fresh in-memory database: run(scenario) calls scenario(db)."""
+    def run_with_db(scenario, **kwargs):
+        async def main():
+            db = LocalSQLiteDatabase(**kwargs)
+            await db.connect()
+            try:
+                return await scenario(db)
+            finally:
+                await db.close()
+        return asyncio.run(main())
+    return run_with_db
+
+
+@pytest.fixture
+def seed_events():
+    """Coroutine creating events(id, name, kind) with ids 1..rows, names 'event <id>' and ten kinds 'kind <id % 10>'."""
+    async def seed(db, rows):
+        await db.execute_sql("CREATE TABLE events (id INTEGER, name TEXT, kind TEXT)")
+        await db.execute_sql("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < %d) "
+                             "INSERT INTO events SELECT i, 'event ' || i, 'kind ' || (i %% 10) FROM n" % rows)
+    return seed
+
+
+@pytest.fixture
+def row_chunks():
+    """Async iterator over the given row batches for load_rows; with error=, raised after the last batch."""
+    def chunks(*batches, error=None):
+        async def iterate():
+            for batch in batches:
+                yield batch
+            if error is not None:
+                raise error
+        return iterate()
+    return chunks
@@ -0,0 +1,18 @@
+import ingest
+from ingest import ingest_file
+
+
+def test_missing_value_in_a_later_chunk_keeps_the_column_text_alike(run, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CSV_CHUNK_ROWS", 3)
+    path = tmp_path / "orders.csv"
+    path.write_text("id,qty,price\n1,5,1.50\n2,6,2\n3,7,3\n4,,4\n5,8,5\n")
+
+    async def scenario(db):
+        result = await ingest_file(db, str(path), "orders.csv")
+        rows = await db.query_sql("SELECT qty, price FROM orders ORDER BY id", internal=True)
+        return result, rows
+
+    result, rows = run(scenario)
+    assert result["success"], result
+    assert [row["qty"] for row in rows["data"]] == ["5", "6", "7", None, "8"]
+    assert rows["data"][0]["price"] == "1.50"
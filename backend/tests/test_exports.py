@@ -0,0 +1,79 @@
+import io
+import csv
+import zipfile
+
+import pytest
+
+from db_sqlite import QueryLimits
+
+
+def test_csv_export_is_not_cut_by_the_row_limit(run, seed_events):
+    import main
+
+    async def scenario(db):
+        await seed_events(db, 300)
+        buffer, _, _ = await main.build_csv_export(db)
+        with zipfile.ZipFile(buffer) as archive:
+            return list(csv.reader(io.StringIO(archive.read("events.csv").decode())))
+
+    rows = run(scenario, limits=QueryLimits(max_result_rows=100))
+    assert rows[0] == ["id", "name", "kind"]
+    assert len(rows) == 301
+
+
+def test_export_all_data_is_not_cut_by_the_row_limit(run, seed_events):
+    async def scenario(db):
+        await seed_events(db, 300)
+        return await db.export_all_data()
+
+    result = run(scenario, limits=QueryLimits(max_result_rows=100))
+    assert len(result["data"]["events"]) == 300
+
+
+def test_failed_load_invalidates_cached_exports(run, seed_events, row_chunks):
+    async def scenario(db):
+        await seed_events(db, 10)
+        version = db.data_version
+        result = await db.load_rows("events", [("id", "INTEGER"), ("name", "TEXT")],
+                                    row_chunks([(1, "new 1")], error=ValueError("upload interrupted")))
+        return result, version, db.data_version
+
+    result, before, after = run(scenario)
+    assert not result["success"]
+    assert after != before
+
+
+def test_failed_statement_that_wrote_nothing_keeps_cached_exports(run, seed_events):
+    async def scenario(db):
+        await seed_events(db, 10)
+        version = db.data_version
+        result = await db.execute_sql("SELEC * FROM events")
+        return result, version, db.data_version
+
+    result, before, after = run(scenario)
+    assert not result["success"]
+    assert after == before
+
+def test_table_rows_are_read_from_the_table_not_its_sample(run, seed_events):
+    async def scenario(db):
+        await seed_events(db, 5000)
+        counts = []
+        for _ in range(2):
+            counts.append(sum([len(rows) async for rows in db.iter_table_rows("events", 1000)]))
+        return counts
+
+    assert run(scenario, readers=2) == [5000, 5000]
+
+
+def test_parquet_export_has_every_row(run, seed_events):
+    pq = pytest.importorskip("pyarrow.parquet")
+    import arrow_io
+
+    async def scenario(db):
+        await seed_events(db, 5000)
+        buffer = await arrow_io.export_tables(db, "parquet")
+        with zipfile.ZipFile(buffer) as archive:
+            return pq.read_table(io.BytesIO(archive.read("events.parquet"))).num_rows
+
+    assert run(scenario, readers=2) == 5000
+
@@ -0,0 +1,37 @@
+import asyncio
+
+from index_advisor import IndexAdvisor
+
+
+def test_reader_queries_queue_the_index_for_the_writer(run, seed_events):
+    async def scenario(db):
+        db.index_advisor = IndexAdvisor(min_hits=2, min_rows=100)
+        await seed_events(db, 500)
+        for _ in range(2):
+            result = await db.query_sql("SELECT * FROM events WHERE kind = 'kind 3'")
+            assert len(result["data"]) == 50
+        await db._index_task
+        indexes = await db.query_sql("SELECT name FROM sqlite_master WHERE type = 'index'", internal=True)
+        return [row["name"] for row in indexes["data"]], db.index_advisor.report()
+
+    names, report = run(scenario, readers=2)
+    assert len(names) == 1
+    assert report["indexes"][0]["columns"] == ["kind"]
+
+
+def test_index_waits_for_the_writer_transaction(run, seed_events):
+    async def scenario(db):
+        db.index_advisor = IndexAdvisor(min_hits=1, min_rows=100)
+        await seed_events(db, 500)
+        await db.conn.execute("BEGIN")
+        await db.conn.execute("INSERT INTO events VALUES (501, 'event 501', 'kind 3')")
+        await db.query_sql("SELECT * FROM events WHERE kind = 'kind 3'")
+        await asyncio.sleep(0.2)
+        waiting = db.index_advisor.report()["indexes"]
+        await db.conn.commit()
+        await db._index_task
+        return waiting, db.index_advisor.report()["indexes"]
+
+    waiting, created = run(scenario, readers=2)
+    assert waiting == []
+    assert [index["columns"] for index in created] == [["kind"]]
@@ -0,0 +1,55 @@
+import io
+import json
+
+import pytest
+
+from ingest import ingest_file
+from json_stream import JSONBatchReader
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_keys_differing_in_case_load_into_the_existing_columns(run, tmp_path):
+    first = _write(tmp_path, "people.json", json.dumps([{"id": 1, "name": "Ann"}]))
+    second = _write(tmp_path, "people.ndjson", '{"ID": 2, "Name": "Bob", "City": "Ipoh"}\n')
+
+    async def scenario(db):
+        assert (await ingest_file(db, first, "people.json", mode="append"))["success"]
+        result = await ingest_file(db, second, "people.ndjson", mode="append")
+        rows = await db.query_sql("SELECT * FROM people ORDER BY id", internal=True)
+        return result, rows
+
+    result, rows = run(scenario)
+    assert result["success"], result
+    assert rows["data"] == [{"id": 1, "name": "Ann", "City": None}, {"id": 2, "name": "Bob", "City": "Ipoh"}]
+
+
+def test_failed_json_load_reports_its_errors(run, tmp_path):
+    path = _write(tmp_path, "people.json", '[{"id": 1}, {"id": 2,, }]')
+
+    async def scenario(db):
+        return await ingest_file(db, path, "people.json")
+
+    result = run(scenario)
+    assert not result["success"]
+    assert result["errors"] and "Expecting" in str(result["errors"])
+
+
+def test_malformed_json_fails_without_reading_the_rest_of_the_file(monkeypatch):
+    monkeypatch.setattr("json_stream.JSON_READ_BYTES", 1024)
+    text = '[{"id": 1}, {"id": 2 "name": "x"}, ' + ", ".join('{"id": %d}' % i for i in range(100_000)) + "]"
+    reader = JSONBatchReader(io.BytesIO(text.encode()), "t")
+    with pytest.raises(json.JSONDecodeError):
+        list(reader)
+    assert reader.bytes_read <= 2 * 1024
+
+
+def test_values_split_across_reads_still_parse(monkeypatch):
+    monkeypatch.setattr("json_stream.JSON_READ_BYTES", 7)
+    rows = [{"id": i, "flag": True, "note": "café \\u00e9 %d" % i, "n": -12.5e3} for i in range(50)]
+    reader = JSONBatchReader(io.BytesIO(json.dumps(rows).encode()), "t", batch_rows=10)
+    assert [row for _, batch in reader for row in batch] == rows
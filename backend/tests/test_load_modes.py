@@ -0,0 +1,69 @@
+COLUMNS = [("id", "INTEGER"), ("name", "TEXT")]
+
+
+async def _rows(db, table="people"):
+    result = await db.query_sql(f"SELECT * FROM {table} ORDER BY id", internal=True)
+    return result["data"]
+
+
+def test_append_adds_rows_and_new_columns(run, row_chunks):
+    async def scenario(db):
+        await db.load_rows("people", COLUMNS, row_chunks([(1, "Ann")]))
+        result = await db.load_rows("people", [("id", "INTEGER"), ("city", "TEXT")], row_chunks([(2, "Ipoh")]),
+                                    mode="append")
+        return result, await _rows(db)
+
+    result, rows = run(scenario)
+    assert result["success"], result
+    assert rows == [{"id": 1, "name": "Ann", "city": None}, {"id": 2, "name": None, "city": "Ipoh"}]
+
+
+def test_upsert_updates_matching_keys_and_inserts_the_rest(run, row_chunks):
+    async def scenario(db):
+        await db.load_rows("people", COLUMNS, row_chunks([(1, "Ann"), (2, "Bob")]))
+        result = await db.load_rows("people", COLUMNS, row_chunks([(2, "Bea"), (3, "Cid")]), mode="upsert", key=["id"])
+        return result, await _rows(db)
+
+    result, rows = run(scenario)
+    assert result["success"], result
+    assert rows == [{"id": 1, "name": "Ann"}, {"id": 2, "name": "Bea"}, {"id": 3, "name": "Cid"}]
+
+
+def test_upsert_creates_a_missing_table(run, row_chunks):
+    async def scenario(db):
+        result = await db.load_rows("people", COLUMNS, row_chunks([(1, "Ann"), (1, "Amy")]), mode="upsert", key=["id"])
+        return result, await _rows(db)
+
+    result, rows = run(scenario)
+    assert result["success"], result
+    assert rows == [{"id": 1, "name": "Amy"}]
+
+
+def test_upsert_needs_a_key_in_the_data(run, row_chunks):
+    async def scenario(db):
+        without_key = await db.load_rows("people", COLUMNS, row_chunks([(1, "Ann")]), mode="upsert")
+        unknown_key = await db.load_rows("people", COLUMNS, row_chunks([(1, "Ann")]), mode="upsert", key=["email"])
+        return without_key, unknown_key
+
+    without_key, unknown_key = run(scenario)
+    assert not without_key["success"] and "key" in without_key["error"]
+    assert not unknown_key["success"] and "email" in unknown_key["error"]
+
+
+def test_upsert_into_rows_with_duplicate_keys_fails_and_keeps_them(run, row_chunks):
+    async def scenario(db):
+        await db.load_rows("people", COLUMNS, row_chunks([(1, "Ann"), (1, "Amy")]))
+        result = await db.load_rows("people", COLUMNS, row_chunks([(1, "Bob")]), mode="upsert", key=["id"])
+        return result, await _rows(db)
+
+    result, rows = run(scenario)
+    assert not result["success"] and "duplicate keys" in result["error"]
+    assert [row["name"] for row in rows] == ["Ann", "Amy"]
+
+
+def test_unknown_mode_is_rejected(run, row_chunks):
+    async def scenario(db):
+        return await db.load_rows("people", COLUMNS, row_chunks([(1, "Ann")]), mode="merge")
+
+    result = run(scenario)
+    assert not result["success"] and "Unknown load mode" in result["error"]
@@ -0,0 +1,37 @@
+COLUMNS = [("id", "INTEGER"), ("city", "TEXT")]
+
+
+def _column(profile, name):
+    return next(column for column in profile["columns"] if column["column"] == name)
+
+
+def test_append_keeps_a_profile_of_all_rows(run, row_chunks):
+    async def scenario(db):
+        await db.load_rows("people", COLUMNS, row_chunks([(1, "Ipoh"), (2, "Ipoh")]))
+        await db.load_rows("people", COLUMNS, row_chunks([(3, "Penang")]), mode="append")
+        return db.table_profiles.get("people")
+
+    profile = run(scenario)
+    assert profile["rows"] == 3
+    assert _column(profile, "city")["top_values"] == [["Ipoh", 2], ["Penang", 1]]
+
+
+def test_upsert_profiles_the_updated_rows(run, row_chunks):
+    async def scenario(db):
+        await db.load_rows("people", COLUMNS, row_chunks([(1, "Ipoh"), (2, "Ipoh")]))
+        await db.load_rows("people", COLUMNS, row_chunks([(2, "Penang"), (3, "Penang")]), mode="upsert", key=["id"])
+        return db.table_profiles.get("people")
+
+    profile = run(scenario)
+    assert profile["rows"] == 3
+    assert _column(profile, "city")["top_values"] == [["Penang", 2], ["Ipoh", 1]]
+    assert _column(profile, "id")["max"] == 3
+
+
+def test_append_without_readers_profiles_on_the_writer(run, row_chunks):
+    async def scenario(db):
+        await db.load_rows("people", COLUMNS, row_chunks([(1, "Ipoh")]), mode="append")
+        return db.table_profiles.get("people")
+
+    profile = run(scenario, readers=0)
+    assert profile["rows"] == 1
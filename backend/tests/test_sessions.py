@@ -0,0 +1,37 @@
+import asyncio
+
+from ingest_jobs import job_manager
+from lru_usr_context import LRUUserContext
+
+
+def test_concurrent_first_requests_share_one_session():
+    async def scenario():
+        context = LRUUserContext(capacity=2)
+        try:
+            first, second = await asyncio.gather(context.get_session("ann"), context.get_session("ann"))
+            return first is second, context.created
+        finally:
+            await context.close_all()
+
+    assert asyncio.run(scenario()) == (True, 1)
+
+
+def test_eviction_skips_sessions_with_an_upload_in_progress():
+    async def scenario():
+        context = LRUUserContext(capacity=2)
+        try:
+            ann = await context.get_session("ann")
+            await context.get_session("bob")
+            async with job_manager.lock_for(ann.database):
+                await context.get_session("cid")
+                kept = list(context.sessions)
+                await context.get_session("dan")
+                still_open = await ann.database.query_sql("SELECT 1 AS one", internal=True)
+            return kept, list(context.sessions), still_open["data"]
+        finally:
+            await context.close_all()
+
+    kept, after, rows = asyncio.run(scenario())
+    assert kept == ["ann", "cid"]
+    assert after == ["ann", "dan"]
+    assert rows == [{"one": 1}]
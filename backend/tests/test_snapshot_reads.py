@@ -0,0 +1,49 @@
+async def _count(db):
+    result = await db.query_sql("SELECT count(*) AS n FROM events")
+    return result["data"][0]["n"] if result["success"] else result["error"]
+
+
+def _failing_load(db, seen):
+    async def chunks():
+        yield [(i, f"new {i}") for i in range(1000, 1050)]
+        seen.append(await _count(db))
+        raise ValueError("upload interrupted")
+    return chunks()
+
+
+def test_readers_do_not_see_rows_of_a_failing_replace(run, seed_events):
+    async def scenario(db):
+        await seed_events(db, 100)
+        seen = []
+        result = await db.load_rows("events", [("id", "INTEGER"), ("name", "TEXT")], _failing_load(db, seen))
+        return result, seen, await _count(db)
+
+    result, seen, after = run(scenario, readers=2)
+    assert not result["success"]
+    assert seen == [100]
+    assert after == 100
+
+
+def test_readers_do_not_see_rows_of_a_failing_append(run, seed_events):
+    async def scenario(db):
+        await seed_events(db, 100)
+        seen = []
+        result = await db.load_rows("events", [("id", "INTEGER"), ("name", "TEXT")], _failing_load(db, seen),
+                                    mode="append")
+        return result, seen, await _count(db)
+
+    result, seen, after = run(scenario, readers=2)
+    assert not result["success"]
+    assert seen == [100]
+    assert after == 100
+
+
+def test_session_file_is_removed_on_close(run, seed_events):
+    import os
+
+    async def scenario(db):
+        await seed_events(db, 10)
+        return db._snapshot_file
+
+    path = run(scenario, readers=1)
+    assert path and not os.path.exists(path)
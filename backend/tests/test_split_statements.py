@@ -0,0 +1,27 @@
+from db_sqlite import split_statements
+
+
+def test_single_statement_keeps_its_text():
+    assert split_statements("  SELECT 1  ") == ["SELECT 1"]
+    assert split_statements("SELECT 1;") == ["SELECT 1;"]
+
+
+def test_statements_are_split_on_semicolons():
+    assert split_statements("SELECT 1; SELECT 2;\nSELECT 3") == ["SELECT 1;", "SELECT 2;", "SELECT 3"]
+
+
+def test_semicolons_in_strings_and_comments_do_not_split():
+    sql = "SELECT 'a;b'; -- one; two\nSELECT \"x;y\" FROM t; /* c; d */ SELECT 2"
+    assert split_statements(sql) == ["SELECT 'a;b';", "-- one; two\nSELECT \"x;y\" FROM t;", "/* c; d */ SELECT 2"]
+
+
+def test_trigger_bodies_stay_in_one_statement():
+    trigger = ("CREATE TRIGGER log_insert AFTER INSERT ON t BEGIN "
+               "INSERT INTO log VALUES (new.id); UPDATE t SET seen = 1; END;")
+    assert split_statements(f"{trigger} SELECT 1;") == [trigger, "SELECT 1;"]
+
+
+def test_comment_only_parts_are_dropped():
+    assert split_statements("-- nothing here") == []
+    assert split_statements("SELECT 1; -- done\n/* end */") == ["SELECT 1;"]
+    assert split_statements(";;") == []